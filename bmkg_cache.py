@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Conditional-GET cache for the BMKG endpoints
+Persists the last response of every port/area (keyed by slug) in SQLite
+with its ETag, Last-Modified and body hash. Refreshes send If-None-Match /
+If-Modified-Since; a 304, or a 200 whose body hashes the same as before, is
+a hit: the stored body is reused and `changed` is False, so callers can also
+reuse what they derived from it (see derived / store_derived) instead of
+parsing and serializing the port again.
+
+Usage:
+    from bmkg_cache import get_response_cache
+    cache = get_response_cache()
+    result = cache.get(client, slug, url, timeout=30)
+    if result.ok and not result.changed:
+        ...reuse cache.derived(slug, input_key)...
+    cache.print_report()
+
+The database lives in bmkg_cache.sqlite at the project root
+(BMKG_CACHE_PATH overrides it).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.environ.get('BMKG_CACHE_PATH', os.path.join(PROJECT_ROOT, 'bmkg_cache.sqlite'))
+
+# Outcomes of a cached GET
+NOT_MODIFIED = 'not_modified'  # 304 from the server
+UNCHANGED = 'unchanged'        # 200 with the same body as last time
+CHANGED = 'changed'            # 200 with a new body
+NEW = 'new'                    # first response for this key
+FAILED = 'failed'              # error status or transport error
+HIT_OUTCOMES = (NOT_MODIFIED, UNCHANGED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    body_hash TEXT NOT NULL,
+    body BLOB NOT NULL,
+    fetched_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    derived_key TEXT,
+    derived TEXT
+)
+"""
+
+
+class CachedResponse:
+    """Result of ResponseCache.get: status, body and whether it changed"""
+
+    def __init__(self, outcome, status_code, content=b'', content_type='', changed=True):
+        self.outcome = outcome
+        self.status_code = status_code
+        self.content = content
+        self.content_type = content_type
+        self.changed = changed
+
+    @property
+    def ok(self):
+        return self.outcome != FAILED
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    @property
+    def headers(self):
+        return {'content-type': self.content_type}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SerializedRecord(dict):
+    """
+    Summary fields of a record whose full JSON text was reused from the
+    cache; json_writer writes `json_text` instead of serializing it again
+    """
+
+    def __init__(self, json_text, **summary):
+        super().__init__(summary)
+        self.json_text = json_text
+
+
+def record_json(record):
+    """A record as it appears in the collectors' output files"""
+    return json.dumps(record, indent=2, ensure_ascii=False)
+
+
+class ResponseCache:
+    """SQLite-backed conditional-GET cache, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self.counts = {outcome: 0 for outcome in (NOT_MODIFIED, UNCHANGED, CHANGED, NEW, FAILED)}
+        self.bytes_downloaded = 0
+        self.bytes_reused = 0
+
+    def _entry(self, key):
+        with self._lock:
+            return self._db.execute(
+                'SELECT etag, last_modified, body_hash, body, content_type FROM responses WHERE key = ?',
+                (key,)).fetchone()
+
+    def _count(self, outcome, downloaded=0, reused=0):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.bytes_downloaded += downloaded
+            self.bytes_reused += reused
+
+    def get(self, client, key, url, **kwargs):
+        """
+        Conditional GET of `url` through a BMKGClient, cached under `key`.
+        Transport errors are raised as by client.get.
+        """
+        entry = self._entry(key)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            etag, last_modified = entry[0], entry[1]
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        try:
+            response = client.get(url, headers=headers, **kwargs)
+        except Exception:
+            self._count(FAILED)
+            raise
+        now = time.time()
+
+        if response.status_code == 304 and entry:
+            self._touch(key, response, now)
+            body = zlib.decompress(entry[3])
+            self._count(NOT_MODIFIED, reused=len(body))
+            return CachedResponse(NOT_MODIFIED, 304, body, entry[4], changed=False)
+        if response.status_code != 200:
+            self._count(FAILED, downloaded=len(response.content))
+            return CachedResponse(FAILED, response.status_code, response.content,
+                                  response.headers.get('content-type', ''))
+
+        body = response.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        content_type = response.headers.get('content-type', '')
+        if entry and entry[2] == body_hash:
+            # Server ignored the validators (or has none) but nothing changed
+            self._touch(key, response, now)
+            self._count(UNCHANGED, downloaded=len(body))
+            return CachedResponse(UNCHANGED, 200, body, content_type, changed=False)
+
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO responses (key, url, etag, last_modified, content_type, body_hash, '
+                'body, fetched_at, checked_at, derived_key, derived) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL)',
+                (key, url, response.headers.get('ETag'), response.headers.get('Last-Modified'), content_type,
+                 body_hash, zlib.compress(body), now, now))
+            self._db.commit()
+        self._count(CHANGED if entry else NEW, downloaded=len(body))
+        return CachedResponse(CHANGED if entry else NEW, 200, body, content_type)
+
+    def _touch(self, key, response, now):
+        with self._lock:
+            self._db.execute(
+                'UPDATE responses SET checked_at = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE key = ?',
+                (now, response.headers.get('ETag'), response.headers.get('Last-Modified'), key))
+            self._db.commit()
+
+    def derived(self, key, derived_key):
+        """Text stored by store_derived for the current body, if made from the same input"""
+        with self._lock:
+            row = self._db.execute('SELECT derived_key, derived FROM responses WHERE key = ?', (key,)).fetchone()
+        if row and row[0] == derived_key:
+            return row[1]
+        return None
+
+    def store_derived(self, key, derived_key, text):
+        """Attach text derived from the current body (parsed/serialized form) to the entry"""
+        with self._lock:
+            self._db.execute('UPDATE responses SET derived_key = ?, derived = ? WHERE key = ?',
+                             (derived_key, text, key))
+            self._db.commit()
+
+    def summary(self):
+        with self._lock:
+            counts = dict(self.counts)
+            total = sum(counts.values())
+            hits = sum(counts[outcome] for outcome in HIT_OUTCOMES)
+            return {
+                'requests': total,
+                'hits': hits,
+                'hit_ratio': hits / total if total else 0.0,
+                'counts': counts,
+                'bytes_downloaded': self.bytes_downloaded,
+                'bytes_reused': self.bytes_reused,
+            }
+
+    def print_report(self, title="BMKG response cache"):
+        summary = self.summary()
+        if not summary['requests']:
+            return
+        counts = summary['counts']
+        print(f"\n🗄️  {title}: {summary['hits']}/{summary['requests']} hits ({summary['hit_ratio']:.1%})")
+        print(f"   304 not modified: {counts[NOT_MODIFIED]} | same body: {counts[UNCHANGED]} | "
+              f"changed: {counts[CHANGED]} | new: {counts[NEW]} | failed: {counts[FAILED]}")
+        print(f"   Downloaded {summary['bytes_downloaded'] / 1024 / 1024:.1f} MB, "
+              f"reused {summary['bytes_reused'] / 1024 / 1024:.1f} MB from cache")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache(path=None):
+    """The process-wide ResponseCache (opened on first use)"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache(path or DEFAULT_CACHE_PATH)
+        return _shared_cache
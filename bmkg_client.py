@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the BMKG scrapers
+One pooled keep-alive requests.Session for maritim.bmkg.go.id, used by
+pelabuhan_weather.py, cuaca_pelabuhan.py and fetch_maritime_weather.py.
+Connections are reused across ports/areas (DNS, TCP and TLS are paid once
+per pooled connection instead of once per request), responses are
+negotiated compressed, and every request is timed per phase:
+
+    dns      name resolution (new connections only)
+    connect  TCP connect (new connections only)
+    tls      TLS handshake (new https connections only)
+    ttfb     request sent -> response headers received
+    body     reading and decoding the response body
+
+Usage:
+    from bmkg_client import get_bmkg_client
+    client = get_bmkg_client()
+    response = client.get(url, timeout=30)
+    client.print_timing_report()
+
+The pool size defaults to BMKG_POOL_SIZE (environment) or 10; a later
+get_bmkg_client(pool_size=n) with a larger n grows the shared pool.
+"""
+
+import os
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING
+
+DEFAULT_POOL_SIZE = int(os.environ.get('BMKG_POOL_SIZE', '10'))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # Only the encodings the installed urllib3 can decode (gzip, deflate, + br/zstd when available)
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+}
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body')
+
+# Connection setup happens in the thread that sends the request; the timed
+# connection classes record their phases here for BMKGClient.get to pick up
+_connection_timings = threading.local()
+
+
+def _record_connection_phase(phase, seconds):
+    timings = getattr(_connection_timings, 'current', None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+_getaddrinfo = socket.getaddrinfo
+
+
+def _timed_getaddrinfo(*args, **kwargs):
+    """socket.getaddrinfo that records its time as 'dns' while a timed connection is being opened"""
+    if not getattr(_connection_timings, 'connecting', False):
+        return _getaddrinfo(*args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return _getaddrinfo(*args, **kwargs)
+    finally:
+        _record_connection_phase('dns', time.perf_counter() - started)
+
+
+# urllib3 resolves through socket.getaddrinfo; outside a timed connection
+# (any other thread or library) the wrapper only forwards the call
+socket.getaddrinfo = _timed_getaddrinfo
+
+
+class _TimedConnectionMixin:
+    """Splits connection setup into dns / connect / tls"""
+
+    def _new_conn(self):
+        # urllib3 opens the socket itself (address selection, socket options,
+        # errors); the getaddrinfo wrapper times the lookup inside it and the
+        # rest of the call is the TCP connect. Only paid for new connections.
+        timings = getattr(_connection_timings, 'current', None)
+        if timings is None:
+            return super()._new_conn()
+        dns_before = timings.get('dns', 0.0)
+        started = time.perf_counter()
+        _connection_timings.connecting = True
+        try:
+            return super()._new_conn()
+        finally:
+            _connection_timings.connecting = False
+            dns = timings.get('dns', 0.0) - dns_before
+            _record_connection_phase('connect', max(0.0, time.perf_counter() - started - dns))
+
+    def connect(self):
+        started = time.perf_counter()
+        super().connect()
+        timings = getattr(_connection_timings, 'current', None)
+        if timings is not None:
+            setup = time.perf_counter() - started
+            timings['new_connection'] = True
+            if self.default_port == 443:
+                timings['tls'] = max(0.0, setup - timings.get('dns', 0.0) - timings.get('connect', 0.0))
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTimings:
+    """Thread-safe per-phase timing samples of the requests made by a client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = {phase: [] for phase in PHASES}
+            self.requests = 0
+            self.new_connections = 0
+            self.errors = 0
+            self.body_bytes = 0
+            self.encodings = {}
+
+    def add(self, timings, body_bytes, encoding):
+        with self._lock:
+            self.requests += 1
+            if timings.get('new_connection'):
+                self.new_connections += 1
+            for phase in PHASES:
+                if phase in timings:
+                    self.samples[phase].append(timings[phase])
+            self.body_bytes += body_bytes
+            self.encodings[encoding] = self.encodings.get(encoding, 0) + 1
+
+    def add_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def summary(self):
+        """{phase: {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'total_s'}} plus request counters"""
+        with self._lock:
+            phases = {}
+            for phase, values in self.samples.items():
+                if not values:
+                    continue
+                ordered = sorted(values)
+                phases[phase] = {
+                    'count': len(ordered),
+                    'mean_ms': sum(ordered) / len(ordered) * 1000,
+                    'p50_ms': ordered[len(ordered) // 2] * 1000,
+                    'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    'total_s': sum(ordered),
+                }
+            return {
+                'requests': self.requests,
+                'errors': self.errors,
+                'new_connections': self.new_connections,
+                'reused_connections': self.requests - self.new_connections,
+                'body_bytes': self.body_bytes,
+                'encodings': dict(self.encodings),
+                'phases': phases,
+            }
+
+
+class BMKGClient:
+    """Pooled keep-alive session with per-request phase timings"""
+
+    def __init__(self, pool_size=None, headers=None):
+        self.pool_size = pool_size or DEFAULT_POOL_SIZE
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        self._mount_adapter()
+        self.timings = RequestTimings()
+
+    def _mount_adapter(self):
+        # One pool per host, pool_size keep-alive connections each; threads
+        # beyond that wait for a free connection instead of opening more
+        adapter = _PooledAdapter(pool_connections=4, pool_maxsize=self.pool_size, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def grow_pool(self, pool_size):
+        """Raise the per-host pool size (never shrinks it); returns True if it grew"""
+        if pool_size <= self.pool_size:
+            return False
+        previous = self.session.get_adapter('https://')
+        self.pool_size = pool_size
+        self._mount_adapter()
+        # Idle connections of the old pools are closed; busy ones when released
+        previous.close()
+        return True
+
+    def get(self, url, **kwargs):
+        """session.get with the body read (and decoded) and the request timed"""
+        timings = {}
+        _connection_timings.current = timings
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, stream=True, **kwargs)
+            headers_at = time.perf_counter()
+            content = response.content
+        except requests.exceptions.RequestException:
+            self.timings.add_error()
+            raise
+        finally:
+            _connection_timings.current = None
+        finished = time.perf_counter()
+
+        setup = timings.get('dns', 0.0) + timings.get('connect', 0.0) + timings.get('tls', 0.0)
+        timings['ttfb'] = max(0.0, headers_at - started - setup)
+        timings['body'] = finished - headers_at
+        self.timings.add(timings, len(content), response.headers.get('Content-Encoding', 'identity'))
+        return response
+
+    def get_json(self, url, **kwargs):
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def print_timing_report(self, title="BMKG HTTP timings"):
+        summary = self.timings.summary()
+        if not summary['requests'] and not summary['errors']:
+            return
+        print(f"\n⏱️  {title}")
+        print(f"   Requests: {summary['requests']} ({summary['errors']} errors) | "
+              f"connections: {summary['new_connections']} new, {summary['reused_connections']} reused "
+              f"(pool size {self.pool_size})")
+        encodings = ", ".join(f"{name} {count}" for name, count in sorted(summary['encodings'].items()))
+        print(f"   Body: {summary['body_bytes'] / 1024 / 1024:.1f} MB decoded | encodings: {encodings or '-'}")
+        for phase in PHASES:
+            stats = summary['phases'].get(phase)
+            if stats:
+                print(f"   {phase:>7}: n={stats['count']:4d}  mean {stats['mean_ms']:7.1f} ms  "
+                      f"p50 {stats['p50_ms']:7.1f} ms  p95 {stats['p95_ms']:7.1f} ms  total {stats['total_s']:6.1f} s")
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_bmkg_client(pool_size=None):
+    """
+    The process-wide BMKGClient (created on first use). Asking for a larger
+    pool_size than the existing client has grows its pool.
+    """
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = BMKGClient(pool_size=pool_size)
+        elif pool_size and _shared_client.grow_pool(pool_size):
+            print(f"🔌 BMKG connection pool grown to {pool_size} connections per host")
+        return _shared_client
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Server-side temperature heatmap tiles
+Interpolates a grid layer variable onto a regular lat/lon field with NumPy
+(bilinear on the grid lattice, or inverse distance weighting with an
+optional land/sea split) and writes colour-mapped PNG tiles:
+tiles/heatmap/<variable>/<z>/<x>/<y>.png plus meta.json with the value range
+for the legend. The browser only draws an image layer.
+
+Usage:
+    python heatmap_tiles.py                          # bilinear temperature tiles
+    python heatmap_tiles.py --method idw --land-sea
+    python heatmap_tiles.py --variable wind_speed_10m
+"""
+
+import argparse
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from tile_pyramid import PROJECT_ROOT, TILE_SIZE, TILES_DIRECTORY, replace_directory
+
+GRID_LAYER_FILE = os.path.join(PROJECT_ROOT, 'openmeteo', 'grid_weather_data_1degree.json')
+HEATMAP_DIRECTORY = os.path.join(TILES_DIRECTORY, 'heatmap')
+# Adaptive (mixed 1°/0.25°) grid runs render here, next to the 1-degree tiles
+ADAPTIVE_HEATMAP_DIRECTORY = os.path.join(TILES_DIRECTORY, 'heatmap_adaptive')
+
+MIN_ZOOM = 4
+MAX_ZOOM = 8  # Leaflet upscales the deepest level beyond this
+FIELD_STEP = 0.05  # degrees; resolution of the IDW field
+IDW_POWER = 2.0
+IDW_RADIUS_CELLS = 2.5  # neighbours farther than this many lattice steps are ignored
+IDW_CHUNK = 8192  # field pixels per vectorized IDW block
+OPACITY = 0.65
+HEATMAP_FORMAT_VERSION = 1
+
+# Same ramp as the browser legend: position -> RGB
+GRADIENT = [
+    (0.0, (0x31, 0x36, 0x95)),  # dark blue (cold)
+    (0.2, (0x45, 0x75, 0xb4)),
+    (0.4, (0x74, 0xad, 0xd1)),
+    (0.6, (0xab, 0xd9, 0xe9)),
+    (0.8, (0xfd, 0xae, 0x61)),
+    (1.0, (0xd7, 0x30, 0x27)),  # red (hot)
+]
+
+
+def load_grid_values(filename, variable):
+    """lat, lon, value and elevation arrays of the grid points that have `variable`"""
+    with open(filename, 'r', encoding='utf-8') as file:
+        records = json.load(file)
+    rows = []
+    for record in records:
+        value = (record.get('weather_data') or {}).get(variable)
+        if value is None:
+            continue
+        elevation = (record.get('coordinates') or {}).get('elevation')
+        rows.append((record['lat'], record['lon'], float(value),
+                     float(elevation) if elevation is not None else np.nan))
+    if not rows:
+        raise ValueError(f"No '{variable}' values in {filename}")
+    lats, lons, values, elevations = (np.array(column, dtype=np.float64) for column in zip(*rows))
+    return lats, lons, values, elevations
+
+
+class Field:
+    """Values on a regular lat/lon lattice: values[row, col] at (lat0 + row*step, lon0 + col*step)"""
+
+    def __init__(self, values, lat0, lon0, step):
+        self.values = values
+        self.lat0 = lat0
+        self.lon0 = lon0
+        self.step = step
+
+    @property
+    def bounds(self):
+        rows, cols = self.values.shape
+        return (self.lat0, self.lon0,
+                self.lat0 + (rows - 1) * self.step, self.lon0 + (cols - 1) * self.step)
+
+    def sample(self, lats, lons):
+        """Bilinear lookup; NaN corners are left out and the rest re-weighted"""
+        rows, cols = self.values.shape
+        fy = (lats - self.lat0) / self.step
+        fx = (lons - self.lon0) / self.step
+        outside = (fy < 0) | (fy > rows - 1) | (fx < 0) | (fx > cols - 1)
+        y0 = np.clip(np.floor(fy).astype(np.intp), 0, max(rows - 2, 0))
+        x0 = np.clip(np.floor(fx).astype(np.intp), 0, max(cols - 2, 0))
+        y1 = np.minimum(y0 + 1, rows - 1)
+        x1 = np.minimum(x0 + 1, cols - 1)
+        ty = np.clip(fy - y0, 0.0, 1.0)
+        tx = np.clip(fx - x0, 0.0, 1.0)
+
+        total = np.zeros(lats.shape, dtype=np.float64)
+        weight_sum = np.zeros(lats.shape, dtype=np.float64)
+        for y, x, weight in ((y0, x0, (1 - ty) * (1 - tx)), (y0, x1, (1 - ty) * tx),
+                             (y1, x0, ty * (1 - tx)), (y1, x1, ty * tx)):
+            corner = self.values[y, x]
+            valid = ~np.isnan(corner)
+            total += np.where(valid, corner, 0.0) * weight
+            weight_sum += np.where(valid, weight, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = total / weight_sum
+        result[outside | (weight_sum <= 0)] = np.nan
+        return result
+
+
+def lattice_field(lats, lons, values):
+    """Field on the grid's own lattice (cells without a value are NaN)"""
+    unique_lats = np.unique(np.round(lats, 6))
+    unique_lons = np.unique(np.round(lons, 6))
+    diffs = np.concatenate([np.diff(unique_lats), np.diff(unique_lons)])
+    step = float(diffs.min()) if diffs.size else 1.0
+    rows = int(round((unique_lats[-1] - unique_lats[0]) / step)) + 1
+    cols = int(round((unique_lons[-1] - unique_lons[0]) / step)) + 1
+    grid = np.full((rows, cols), np.nan, dtype=np.float64)
+    grid[np.rint((lats - unique_lats[0]) / step).astype(np.intp),
+         np.rint((lons - unique_lons[0]) / step).astype(np.intp)] = values
+    return Field(grid, float(unique_lats[0]), float(unique_lons[0]), step)
+
+
+def _idw(target_lats, target_lons, lats, lons, values, radius):
+    """Inverse distance weighting of (lats, lons, values) at the target points, chunked"""
+    result = np.full(target_lats.shape, np.nan, dtype=np.float64)
+    if values.size == 0:
+        return result
+    source_lats = lats.astype(np.float32)
+    source_lons = lons.astype(np.float32)
+    source_values = values.astype(np.float32)
+    radius_sq = np.float32(radius * radius)
+    for start in range(0, target_lats.size, IDW_CHUNK):
+        block_lats = target_lats[start:start + IDW_CHUNK, None].astype(np.float32)
+        block_lons = target_lons[start:start + IDW_CHUNK, None].astype(np.float32)
+        distance_sq = (block_lats - source_lats) ** 2 + (block_lons - source_lons) ** 2
+        with np.errstate(divide='ignore'):
+            weights = np.where(distance_sq <= radius_sq,
+                               1.0 / np.maximum(distance_sq, 1e-12) ** np.float32(IDW_POWER / 2), 0.0)
+        weight_sum = weights.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block = (weights @ source_values) / weight_sum
+        block[weight_sum <= 0] = np.nan
+        result[start:start + IDW_CHUNK] = block
+    return result
+
+
+def idw_field(lats, lons, values, elevations=None, land_sea=False, step=FIELD_STEP, radius_step=None):
+    """
+    IDW field at `step` resolution over the points' bbox. With `land_sea`,
+    each field cell takes the class (land: elevation > 0) of its nearest grid
+    point and is interpolated from points of that class only, so coastal
+    cells do not mix sea and land temperatures.
+    The search radius is IDW_RADIUS_CELLS times `radius_step` (default: the
+    finest lattice spacing); mixed-resolution grids pass their coarsest step
+    so the sparse cells still reach their neighbours.
+    """
+    lattice_step = radius_step or lattice_field(lats, lons, values).step
+    radius = IDW_RADIUS_CELLS * lattice_step
+    lat0, lon0 = float(lats.min()), float(lons.min())
+    rows = int(round((lats.max() - lat0) / step)) + 1
+    cols = int(round((lons.max() - lon0) / step)) + 1
+    grid_lats, grid_lons = np.meshgrid(lat0 + np.arange(rows) * step, lon0 + np.arange(cols) * step, indexing='ij')
+    target_lats, target_lons = grid_lats.ravel(), grid_lons.ravel()
+
+    if not land_sea or elevations is None or np.isnan(elevations).all():
+        result = _idw(target_lats, target_lons, lats, lons, values, radius)
+        return Field(result.reshape(rows, cols), lat0, lon0, step)
+
+    is_land = np.nan_to_num(elevations, nan=0.0) > 0
+    land = _idw(target_lats, target_lons, lats[is_land], lons[is_land], values[is_land], radius)
+    sea = _idw(target_lats, target_lons, lats[~is_land], lons[~is_land], values[~is_land], radius)
+    # Class of every field cell = class of its nearest lattice point (missing cells count as sea)
+    classes = lattice_field(lats, lons, is_land.astype(np.float64))
+    class_rows = np.clip(np.rint((target_lats - classes.lat0) / classes.step).astype(np.intp),
+                         0, classes.values.shape[0] - 1)
+    class_cols = np.clip(np.rint((target_lons - classes.lon0) / classes.step).astype(np.intp),
+                         0, classes.values.shape[1] - 1)
+    cell_is_land = classes.values[class_rows, class_cols] > 0.5
+    result = np.where(cell_is_land, land, sea)
+    # Fall back to the other class where a cell has no same-class neighbour
+    result = np.where(np.isnan(result), np.where(cell_is_land, sea, land), result)
+    return Field(result.reshape(rows, cols), lat0, lon0, step)
+
+
+def colorize(values, vmin, vmax):
+    """RGBA uint8 image of `values` on GRADIENT; NaN is transparent"""
+    span = (vmax - vmin) or 1.0
+    position = np.nan_to_num(np.clip((values - vmin) / span, 0.0, 1.0))
+    stops = [stop for stop, _ in GRADIENT]
+    rgba = np.zeros(values.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        levels = [color[channel] for _, color in GRADIENT]
+        rgba[..., channel] = np.rint(np.interp(position, stops, levels)).astype(np.uint8)
+    rgba[..., 3] = np.where(np.isnan(values), 0, int(round(OPACITY * 255)))
+    return rgba
+
+
+def encode_png(rgba):
+    """Minimal RGBA PNG encoder (filter type 0 on every row)"""
+    height, width, _ = rgba.shape
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)  # 8-bit RGBA
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(raw.tobytes(), 6)) + chunk(b'IEND', b''))
+
+
+def tile_pixel_coordinates(zoom, x, y):
+    """lat/lon of every pixel centre of tile (zoom, x, y)"""
+    scale = TILE_SIZE * (2 ** zoom)
+    offsets = np.arange(TILE_SIZE) + 0.5
+    lons = (x * TILE_SIZE + offsets) / scale * 360.0 - 180.0
+    world_y = (y * TILE_SIZE + offsets) / scale
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * world_y))))
+    return np.meshgrid(lats, lons, indexing='ij')
+
+
+def tile_range(lat_min, lon_min, lat_max, lon_max, zoom):
+    """Inclusive x and y tile ranges covering a bbox at `zoom`"""
+    count = 2 ** zoom
+
+    def tile_x(lon):
+        return min(count - 1, max(0, int((lon + 180.0) / 360.0 * count)))
+
+    def tile_y(lat):
+        sin_lat = math.sin(math.radians(lat))
+        return min(count - 1, max(0, int((0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * count)))
+
+    return (tile_x(lon_min), tile_x(lon_max)), (tile_y(lat_max), tile_y(lat_min))
+
+
+def write_heatmap_tiles(variable='temperature_2m', source_path=GRID_LAYER_FILE, method='bilinear',
+                        land_sea=False, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+                        output_directory=HEATMAP_DIRECTORY, radius_step=None):
+    """Render the heatmap pyramid of one grid variable; returns the meta dict or None"""
+    try:
+        lats, lons, values, elevations = load_grid_values(source_path, variable)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️  Could not build {variable} heatmap from {source_path}: {e}")
+        return None
+
+    if method == 'idw':
+        field = idw_field(lats, lons, values, elevations, land_sea=land_sea, radius_step=radius_step)
+    else:
+        field = lattice_field(lats, lons, values)
+    vmin, vmax = float(np.nanmin(values)), float(np.nanmax(values))
+    lat_min, lon_min, lat_max, lon_max = field.bounds
+
+    final_directory = os.path.join(output_directory, variable)
+    temp_directory = os.path.join(output_directory, f".{variable}.tmp")
+    tiles = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        (x_first, x_last), (y_first, y_last) = tile_range(lat_min, lon_min, lat_max, lon_max, zoom)
+        for x in range(x_first, x_last + 1):
+            for y in range(y_first, y_last + 1):
+                pixel_lats, pixel_lons = tile_pixel_coordinates(zoom, x, y)
+                sampled = field.sample(pixel_lats, pixel_lons)
+                if np.isnan(sampled).all():
+                    continue
+                path = os.path.join(temp_directory, str(zoom), str(x), f"{y}.png")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(encode_png(colorize(sampled, vmin, vmax)))
+                tiles.setdefault(str(zoom), []).append(f"{x}/{y}")
+
+    meta = {
+        'format_version': HEATMAP_FORMAT_VERSION,
+        'variable': variable,
+        'generated_at': datetime.now().isoformat(),
+        'method': method,
+        'land_sea': bool(land_sea and method == 'idw'),
+        'min': vmin,
+        'max': vmax,
+        'gradient': [[stop, '#%02x%02x%02x' % color] for stop, color in GRADIENT],
+        'opacity': OPACITY,
+        'bounds': [[lat_min, lon_min], [lat_max, lon_max]],
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'tiles': tiles,
+    }
+    os.makedirs(temp_directory, exist_ok=True)
+    with open(os.path.join(temp_directory, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=2)
+    replace_directory(temp_directory, final_directory)
+
+    count = sum(len(keys) for keys in tiles.values())
+    print(f"🌡️  {variable} heatmap ({method}{', land/sea' if meta['land_sea'] else ''}): "
+          f"{count} PNG tiles (z{min_zoom}-{max_zoom}), {vmin:.1f}..{vmax:.1f}")
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render heatmap PNG tiles from the grid layer")
+    parser.add_argument('--variable', default='temperature_2m')
+    parser.add_argument('--source', default=GRID_LAYER_FILE)
+    parser.add_argument('--method', choices=('bilinear', 'idw'), default='bilinear')
+    parser.add_argument('--land-sea', action='store_true', help="IDW: interpolate land and sea separately")
+    parser.add_argument('--radius-step', type=float, help="IDW: lattice step of the search radius (1 for adaptive grids)")
+    parser.add_argument('--output', default=HEATMAP_DIRECTORY)
+    parser.add_argument('--min-zoom', type=int, default=MIN_ZOOM)
+    parser.add_argument('--max-zoom', type=int, default=MAX_ZOOM)
+    args = parser.parse_args()
+    meta = write_heatmap_tiles(args.variable, args.source, args.method, args.land_sea,
+                               args.min_zoom, args.max_zoom, args.output, args.radius_step)
+    return 0 if meta else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Streaming, atomic JSON writers for the collectors' output files
+Records are serialized one at a time into a uniquely named temp file next
+to the target (<file>.<random>.tmp, so concurrent writers of the same file
+never share one), which is flushed, fsynced and renamed over the target,
+so serve_local.py
+(and anything else reading the file) sees either the old or the new file,
+never a partly written one. The size comes from the written file instead of
+serializing the data a second time.
+
+PRETTY output is byte-identical to json.dump(data, indent=2,
+ensure_ascii=False); COMPACT drops all optional whitespace.
+
+Usage:
+    from json_writer import JSONArrayWriter, write_json
+    with JSONArrayWriter('data.json') as writer:
+        for record in records:
+            writer.write(record)
+    size = writer.size
+
+    size = write_json('data.json', records_or_dict, compact=True)
+"""
+
+import json
+import os
+import tempfile
+
+PRETTY = 'pretty'
+COMPACT = 'compact'
+
+_ENCODERS = {
+    PRETTY: json.JSONEncoder(indent=2, ensure_ascii=False),
+    COMPACT: json.JSONEncoder(separators=(',', ':'), ensure_ascii=False),
+}
+# mkstemp creates files as 0600; temp files get the mode open() would give them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_FILE_MODE = 0o666 & ~_UMASK
+
+# Array punctuation around the records: (first, between, last)
+_ARRAY_LAYOUT = {
+    PRETTY: ('[\n  ', ',\n  ', '\n]'),
+    COMPACT: ('[', ',', ']'),
+}
+
+
+def encode_record(record, mode=PRETTY):
+    """
+    JSON text of one record. A record that carries its pretty text already
+    (bmkg_cache.SerializedRecord) is not serialized again in PRETTY mode.
+    """
+    json_text = getattr(record, 'json_text', None)
+    if json_text is not None:
+        return json_text if mode == PRETTY else _ENCODERS[mode].encode(json.loads(json_text))
+    return _ENCODERS[mode].encode(record)
+
+
+def _fsync_directory(path):
+    # Makes the rename itself durable; not supported on every platform
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicFile:
+    """
+    File written to a unique temp file next to `path` and renamed over it on
+    commit() (text, or bytes with binary=True)
+    """
+
+    def __init__(self, path, binary=False):
+        self.path = path
+        self.size = None
+        fd, self.temp_path = tempfile.mkstemp(
+            prefix=os.path.basename(path) + '.', suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            os.chmod(self.temp_path, _FILE_MODE)
+            self._file = os.fdopen(fd, 'wb') if binary else os.fdopen(fd, 'w', encoding='utf-8')
+        except BaseException:
+            os.close(fd)
+            os.remove(self.temp_path)
+            raise
+
+    def write(self, data):
+        self._file.write(data)
+
+    def commit(self):
+        """Flush, fsync and rename into place; returns the file size in bytes"""
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.size = os.fstat(self._file.fileno()).st_size
+            self._file.close()
+            os.replace(self.temp_path, self.path)
+        except BaseException:
+            self.abort()
+            raise
+        _fsync_directory(self.path)
+        return self.size
+
+    def abort(self):
+        """Drop the temp file; `path` keeps its previous contents"""
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class JSONArrayWriter(AtomicFile):
+    """Streams records into a JSON array, one record serialized at a time"""
+
+    def __init__(self, path, compact=False):
+        super().__init__(path)
+        self.mode = COMPACT if compact else PRETTY
+        self.count = 0
+        self._first, self._between, self._last = _ARRAY_LAYOUT[self.mode]
+
+    def write(self, record):
+        text = encode_record(record, self.mode)
+        if self.mode == PRETTY:
+            # JSON strings never contain raw newlines, so this only re-indents
+            text = text.replace('\n', '\n  ')
+        self._file.write((self._between if self.count else self._first) + text)
+        self.count += 1
+
+    def commit(self):
+        try:
+            self._file.write(self._last if self.count else '[]')
+        except BaseException:
+            self.abort()
+            raise
+        return super().commit()
+
+
+def write_json(path, data, compact=False):
+    """
+    Atomically write `data` to `path`; lists are streamed record by record.
+    Returns the file size in bytes.
+    """
+    if isinstance(data, list):
+        with JSONArrayWriter(path, compact) as writer:
+            for record in data:
+                writer.write(record)
+        return writer.size
+    with AtomicFile(path) as file:
+        for chunk in _ENCODERS[COMPACT if compact else PRETTY].iterencode(data):
+            file.write(chunk)
+    return file.size
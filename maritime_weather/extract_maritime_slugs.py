@@ -1,37 +1,32 @@
-import json
-import re
+import os
+import sys
+
 import requests
 
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_writer import write_json
+from nuxt_payload import AREA_URL, area_slug, load_entity_index
+
+def load_maritime_areas():
+    """Coastal waters ("Perairan ...") from the shared entity index, compiled from perairan.json"""
+    return [
+        {'name': area['name'], 'slug': area['slug'], 'url': AREA_URL.format(slug=area['slug'])}
+        for area in load_entity_index().areas
+        if 'Perairan' in area['name']
+    ]
+
 def extract_maritime_slugs():
     """Extract maritime weather slugs from perairan.json"""
     
     try:
-        # Load the perairan data
-        with open('perairan.json', 'r', encoding='utf-8') as file:
-            data = json.load(file)
-        
-        maritime_areas = []
-        
-        # Parse the complex structure to find maritime areas
-        for i, item in enumerate(data):
-            if isinstance(item, str) and 'Perairan' in item:
-                # Extract the maritime area name
-                area_name = item
-                
-                # Create slug from the area name
-                slug = create_maritime_slug(area_name)
-                
-                maritime_areas.append({
-                    'name': area_name,
-                    'slug': slug,
-                    'url': f"https://maritim.bmkg.go.id/cuaca/perairan/{slug}"
-                })
+        maritime_areas = load_maritime_areas()
         
         print(f"🌊 Found {len(maritime_areas)} maritime areas")
         
         # Save to file
-        with open('maritime_areas.json', 'w', encoding='utf-8') as file:
-            json.dump(maritime_areas, file, indent=2, ensure_ascii=False)
+        write_json('maritime_areas.json', maritime_areas)
         
         print(f"📁 Maritime areas saved to: maritime_areas.json")
         
@@ -53,16 +48,8 @@ def extract_maritime_slugs():
         return []
 
 def create_maritime_slug(area_name):
-    """Convert maritime area name to slug format"""
-    # Remove "Perairan" prefix and clean the name
-    clean_name = area_name.replace('Perairan', '').strip()
-    
-    # Convert to lowercase and replace spaces/special chars with hyphens
-    slug = re.sub(r'[^a-zA-Z0-9\s]', ' ', clean_name)
-    slug = re.sub(r'\s+', '-', slug.strip()).lower()
-    
-    # Add "perairan-" prefix to match BMKG format
-    return f"perairan-{slug}"
+    """Convert maritime area name to slug format ("perairan-" + slugified name without "Perairan")"""
+    return area_slug(area_name)
 
 def test_maritime_api():
     """Test the maritime weather API with a sample slug"""
@@ -1,126 +1,327 @@
 import json
-import requests
+import os
+import queue
+import sys
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timezone
 
-def fetch_maritime_weather_data():
-    """Fetch weather data from BMKG maritime areas"""
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmkg_cache import get_response_cache
+from bmkg_client import get_bmkg_client
+from json_writer import JSONArrayWriter
+from nuxt_payload import decode
+from precompress import write_compressed_sidecars
+from timeseries_store import MARITIME, append_records
+
+from extract_maritime_slugs import load_maritime_areas
+from maritime_extractor import extract_maritime_html
+
+# Politeness limits for maritim.bmkg.go.id: they alone bound a refresh
+DOWNLOAD_WORKERS = 4
+MIN_REQUEST_INTERVAL = 0.25  # seconds between request starts (at most 4 pages/s)
+
+# HTML parsing runs in worker processes fed by a bounded queue
+PARSE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+PARSE_QUEUE_SIZE = 16
+
+# Nuxt route payloads: the structured data the area pages are rendered from
+BULK_PAYLOAD_URL = "https://maritim.bmkg.go.id/cuaca/perairan/_payload.json"
+PAYLOAD_URL = "{url}/_payload.json"
+
+# weather_data field -> forecast keys that carry it in the payload, in order of preference
+PAYLOAD_FIELDS = {
+    'temperature': ('temp_avg', 'temperature'),
+    'humidity': ('rh_avg', 'humidity'),
+    'wind_speed': ('wind_speed', 'wind_speed_max'),
+    'wind_gust': ('wind_gust', 'wind_speed_gust'),
+    'wind_direction': ('wind_from',),
+    'current_direction': ('current_to', 'current_from'),
+    'wave_height': ('wave_height', 'wave_desc'),
+    'wave_classification': ('wave_cat',),
+    'current_speed': ('current_speed',),
+    'weather_condition': ('weather', 'weather_desc'),
+    'time': ('time', 'time_desc', 'valid_from'),
+    'weather_icon': ('weather_icon', 'icon'),
+}
+FORECAST_KEYS = {'wind_from', 'wave_cat', 'temp_avg', 'current_to'}
+
+class RequestPacer:
+    """Spaces request starts at least `interval` seconds apart across threads"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+    
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class StreamingResultWriter:
+    """
+    Writes area records to a JSON array (json.dump indent=2 layout) as they
+    complete; the file is fsynced and replaces `filename` atomically on close
+    """
+    
+    def __init__(self, filename, total):
+        self.filename = filename
+        self.total = total
+        self.size = None
+        self.results = []
+        self.successful = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._writer = JSONArrayWriter(filename)
+    
+    def write(self, record, detail):
+        with self._lock:
+            self._writer.write(record)
+            self.results.append(record)
+            if record['status'] == 'success':
+                self.successful += 1
+                print(f"[{len(self.results):3d}/{self.total}] ✅ {record['area_name']} - {detail}")
+            else:
+                self.failed += 1
+                print(f"[{len(self.results):3d}/{self.total}] ❌ {record['area_name']} - {detail}")
+            
+            # Progress update every 20 areas
+            done = len(self.results)
+            if done % 20 == 0:
+                print(f"\n📈 Progress: {done}/{self.total} ({done/self.total*100:.1f}%)")
+                print(f"   ✅ Successful: {self.successful}, ❌ Failed: {self.failed}\n")
     
+    def close(self):
+        with self._lock:
+            self.size = self._writer.commit()
+
+def area_record(area, weather_data=None, status='success', error=None):
+    record = {
+        'area_name': area['name'],
+        'slug': area['slug'],
+        'url': area['url'],
+        'weather_data': weather_data,
+        'status': status,
+    }
+    if error:
+        record['error'] = error
+    record['timestamp'] = datetime.now().isoformat()
+    return record
+
+def html_record(area, weather_data):
+    if weather_data:
+        return area_record(area, weather_data), "HTML data extracted"
+    return area_record(area, None, 'failed', 'No weather data found in HTML'), "No data in HTML"
+
+def cached_parse(cache, area, response):
+    """The previous parse_maritime_html result when the page has not changed, else None"""
+    if response.changed:
+        return None
+    parsed = cache.derived(area['slug'], f"parse_maritime_html|{area['name']}")
+    return json.loads(parsed) if parsed is not None else None
+
+def store_parse(cache, area, weather_data):
+    if weather_data:
+        cache.store_derived(area['slug'], f"parse_maritime_html|{area['name']}",
+                            json.dumps(weather_data, ensure_ascii=False))
+
+def download_area(area, client, cache, pacer, parse_queue, writer):
+    """Download stage: fetch one area page; HTML that needs parsing goes to parse_queue"""
+    pacer.wait()
     try:
-        # Load maritime areas
-        with open('maritime_areas.json', 'r', encoding='utf-8') as file:
-            maritime_areas = json.load(file)
+        response = cache.get(client, area['slug'], area['url'], timeout=30)
+    except Exception as e:
+        writer.write(area_record(area, None, 'error', str(e)), f"Error: {e}")
+        return
+    
+    if not response.ok:
+        writer.write(area_record(area, None, 'failed', f"HTTP {response.status_code}"),
+                     f"HTTP {response.status_code}")
+    elif 'text/html' in response.headers.get('content-type', ''):
+        # This is a webpage, we need to extract data from HTML
+        weather_data = cached_parse(cache, area, response)
+        if weather_data is not None:
+            writer.write(*html_record(area, weather_data))
+        else:
+            parse_queue.put((area, response.text))  # blocks while the parsers are behind
+    else:
+        # Try to parse as JSON
+        try:
+            writer.write(area_record(area, response.json()), "JSON data")
+        except ValueError:
+            writer.write(area_record(area, None, 'failed', 'Invalid JSON response'), "Invalid JSON")
+
+def find_forecasts(tree):
+    """(owner dict, forecast list) for every list of forecast entries in a decoded payload"""
+    found = []
+    stack = [(None, tree)]
+    seen = set()
+    while stack:
+        owner, node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, dict):
+            for child in node.values():
+                stack.append((node, child))
+        elif isinstance(node, list):
+            entries = [entry for entry in node if isinstance(entry, dict)]
+            if entries and any(FORECAST_KEYS & entry.keys() for entry in entries):
+                found.append((owner, entries))
+            else:
+                stack.extend((owner, child) for child in node)
+    found.reverse()  # document order
+    return found
+
+def current_forecast(entries, now=None):
+    """The entry valid now (valid_from <= now < valid_to, UTC), else the first one"""
+    now = (now or datetime.now(timezone.utc)).strftime('%Y-%m-%d %H:%M')
+    for entry in entries:
+        valid_from, valid_to = entry.get('valid_from'), entry.get('valid_to')
+        if isinstance(valid_from, str) and isinstance(valid_to, str):
+            # "2025-08-15 00:00 UTC" / "2025-08-15T00:00:00Z" -> "2025-08-15 00:00"
+            if valid_from.replace('T', ' ')[:16] <= now < valid_to.replace('T', ' ')[:16]:
+                return entry, True
+    return entries[0], False
+
+def payload_weather_data(area_name, entries):
+    """weather_data (same fields as the HTML parser) from an area's forecast entries"""
+    entry, is_current = current_forecast(entries)
+    weather_data = {
+        'area_name': area_name,
+        'source': 'BMKG Maritime Payload',
+        'parsed_at': datetime.now().isoformat()
+    }
+    for field, keys in PAYLOAD_FIELDS.items():
+        for key in keys:
+            if entry.get(key) not in (None, ''):
+                weather_data[field] = str(entry[key])
+                break
+    if is_current:
+        weather_data['is_current'] = True
+    return weather_data if len(weather_data) > 3 else None
+
+def fetch_bulk_forecasts(client, cache):
+    """{area name: forecast entries} from the area-list payload, when it carries forecasts"""
+    try:
+        response = cache.get(client, 'perairan|payload', BULK_PAYLOAD_URL, timeout=30)
+        if not response.ok:
+            return {}
+        tree = decode(response.json())
+    except Exception as e:
+        print(f"⚠️  Bulk payload unavailable: {e}")
+        return {}
+    return {owner['name']: entries for owner, entries in find_forecasts(tree)
+            if isinstance(owner, dict) and isinstance(owner.get('name'), str)}
+
+def download_area_payload(area, client, cache, pacer, parse_queue, writer, bulk):
+    """Payload stage: the area's Nuxt payload mapped to weather_data; HTML scraping only if that fails"""
+    entries = bulk.get(area['name'])
+    if entries is None:
+        pacer.wait()
+        try:
+            response = cache.get(client, f"{area['slug']}|payload", PAYLOAD_URL.format(url=area['url']), timeout=30)
+            if response.ok:
+                forecasts = find_forecasts(decode(response.json()))
+                entries = forecasts[0][1] if forecasts else None
+        except Exception:
+            entries = None  # transport error, HTML instead of JSON, unexpected structure
+    
+    weather_data = payload_weather_data(area['name'], entries) if entries else None
+    if weather_data:
+        writer.write(area_record(area, weather_data), "Payload data extracted")
+    else:
+        download_area(area, client, cache, pacer, parse_queue, writer)
+
+def fetch_maritime_weather_data(mode='payload'):
+    """
+    Fetch weather data from BMKG maritime areas.
+    
+    mode='payload' maps each area's Nuxt _payload.json (or the area-list
+    payload, when it carries forecasts) to weather_data with one
+    json.loads, and scrapes the HTML page only for areas whose payload
+    fails. mode='html' always scrapes.
+    
+    Two-stage pipeline: DOWNLOAD_WORKERS threads download pages (paced by
+    MIN_REQUEST_INTERVAL) into a bounded queue that PARSE_WORKERS processes
+    drain with extract_maritime_html (the precompiled equivalent of
+    parse_maritime_html). Records are written to disk in
+    completion order.
+    """
+    
+    try:
+        # Load maritime areas from the compiled port/area index
+        maritime_areas = load_maritime_areas()
         
         print(f"🌊 Starting to fetch weather data for {len(maritime_areas)} maritime areas")
         print(f"⏰ Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"⚙️  Mode: {mode} | {DOWNLOAD_WORKERS} downloads (≥{MIN_REQUEST_INTERVAL}s apart) -> "
+              f"{PARSE_WORKERS} parser processes")
+        start_time = time.monotonic()
+        
+        client = get_bmkg_client()
+        cache = get_response_cache()
+        pacer = RequestPacer(MIN_REQUEST_INTERVAL)
+        parse_queue = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+        parse_slots = threading.BoundedSemaphore(PARSE_WORKERS * 2)
+        filename = "maritime_weather_data.json"
+        writer = StreamingResultWriter(filename, len(maritime_areas))
+        bulk = fetch_bulk_forecasts(client, cache) if mode == 'payload' else {}
         
-        results = []
-        successful = 0
-        failed = 0
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        for i, area in enumerate(maritime_areas, 1):
-            print(f"[{i:3d}/{len(maritime_areas)}] Fetching: {area['name']}")
-            
+        def parsed(future, area):
             try:
-                response = requests.get(area['url'], headers=headers, timeout=30)
-                
-                if response.status_code == 200:
-                    # Check if it's HTML content (webpage)
-                    if 'text/html' in response.headers.get('content-type', ''):
-                        # This is a webpage, we need to extract data from HTML
-                        weather_data = parse_maritime_html(response.text, area['name'])
-                        
-                        if weather_data:
-                            results.append({
-                                'area_name': area['name'],
-                                'slug': area['slug'],
-                                'url': area['url'],
-                                'weather_data': weather_data,
-                                'status': 'success',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            successful += 1
-                            print(f"    ✅ Success - HTML data extracted")
-                        else:
-                            results.append({
-                                'area_name': area['name'],
-                                'slug': area['slug'],
-                                'url': area['url'],
-                                'weather_data': None,
-                                'status': 'failed',
-                                'error': 'No weather data found in HTML',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            failed += 1
-                            print(f"    ❌ Failed - No data in HTML")
-                    else:
-                        # Try to parse as JSON
-                        try:
-                            weather_data = response.json()
-                            results.append({
-                                'area_name': area['name'],
-                                'slug': area['slug'],
-                                'url': area['url'],
-                                'weather_data': weather_data,
-                                'status': 'success',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            successful += 1
-                            print(f"    ✅ Success - JSON data")
-                        except:
-                            results.append({
-                                'area_name': area['name'],
-                                'slug': area['slug'],
-                                'url': area['url'],
-                                'weather_data': None,
-                                'status': 'failed',
-                                'error': 'Invalid JSON response',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            failed += 1
-                            print(f"    ❌ Failed - Invalid JSON")
-                else:
-                    results.append({
-                        'area_name': area['name'],
-                        'slug': area['slug'],
-                        'url': area['url'],
-                        'weather_data': None,
-                        'status': 'failed',
-                        'error': f"HTTP {response.status_code}",
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    failed += 1
-                    print(f"    ❌ Failed - HTTP {response.status_code}")
-                    
+                weather_data = future.result()
             except Exception as e:
-                results.append({
-                    'area_name': area['name'],
-                    'slug': area['slug'],
-                    'url': area['url'],
-                    'weather_data': None,
-                    'status': 'error',
-                    'error': str(e),
-                    'timestamp': datetime.now().isoformat()
-                })
-                failed += 1
-                print(f"    ❌ Error: {e}")
+                writer.write(area_record(area, None, 'error', f"Parser error: {e}"), f"Parser error: {e}")
+            else:
+                store_parse(cache, area, weather_data)
+                writer.write(*html_record(area, weather_data))
+            finally:
+                parse_slots.release()
+        
+        with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as parsers, \
+                ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as downloaders:
+            if mode == 'payload':
+                downloads = [downloaders.submit(download_area_payload, area, client, cache, pacer, parse_queue,
+                                                writer, bulk)
+                             for area in maritime_areas]
+            else:
+                downloads = [downloaders.submit(download_area, area, client, cache, pacer, parse_queue, writer)
+                             for area in maritime_areas]
             
-            # Progress update every 20 areas
-            if i % 20 == 0:
-                print(f"\n📈 Progress: {i}/{len(maritime_areas)} ({i/len(maritime_areas)*100:.1f}%)")
-                print(f"   ✅ Successful: {successful}, ❌ Failed: {failed}\n")
+            # Parse stage: drain the queue into the process pool until every download is done
+            while True:
+                try:
+                    area, html_content = parse_queue.get(timeout=0.1)
+                except queue.Empty:
+                    if all(download.done() for download in downloads) and parse_queue.empty():
+                        break
+                    continue
+                parse_slots.acquire()
+                future = parsers.submit(extract_maritime_html, html_content, area['name'])
+                future.add_done_callback(lambda future, area=area: parsed(future, area))
             
-            # Add delay to avoid overwhelming the server
-            time.sleep(1)
-        
-        # Save results
-        filename = "maritime_weather_data.json"
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(results, file, indent=2, ensure_ascii=False)
+            # An error raised outside a download's own handling would otherwise
+            # drop the area from the output and from the totals
+            for area, download in zip(maritime_areas, downloads):
+                try:
+                    download.result()
+                except Exception as e:
+                    writer.write(area_record(area, None, 'error', f"Download error: {e}"), f"Download error: {e}")
+        
+        writer.close()
+        write_compressed_sidecars(filename)
+        results = writer.results
+        append_records(MARITIME, results)
+        successful, failed = writer.successful, writer.failed
+        elapsed = time.monotonic() - start_time
         
         # Final summary
         print(f"\n" + "=" * 50)
@@ -130,8 +331,15 @@ def fetch_maritime_weather_data():
         print(f"✅ Successful: {successful}")
         print(f"❌ Failed: {failed}")
         print(f"📈 Success rate: {successful/len(maritime_areas)*100:.1f}%")
+        print(f"⏱️  Completed in {elapsed:.1f}s ({len(maritime_areas)/elapsed:.1f} areas/s)")
+        if mode == 'payload':
+            from_payload = sum(1 for r in results
+                               if r['weather_data'] and r['weather_data'].get('source') == 'BMKG Maritime Payload')
+            print(f"📦 From payload: {from_payload} | HTML fallback: {len(results) - from_payload}")
         print(f"💾 Results saved to: {filename}")
-        print(f"📁 File size: {len(json.dumps(results))/1024/1024:.1f} MB")
+        print(f"📁 File size: {writer.size/1024/1024:.1f} MB")
+        client.print_timing_report()
+        cache.print_report()
         
         return results
         
@@ -557,7 +765,7 @@ def main():
     print("🌊 BMKG Maritime Weather Data Fetcher")
     print("=" * 50)
     
-    results = fetch_maritime_weather_data()
+    results = fetch_maritime_weather_data(mode='html' if '--html' in sys.argv[1:] else 'payload')
     
     if results:
         # Show sample of successful data
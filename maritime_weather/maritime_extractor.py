@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Precompiled Maritime HTML Extractor
+Produces the same dict as fetch_maritime_weather.parse_maritime_html
+without its repeated work: that function imports re on every call, looks
+up ~90 patterns in the re cache, and rescans the page from the start for
+every pattern of every stage (the table-cell patterns once per field).
+
+How it works:
+- Every pattern of parse_maritime_html is compiled once, at import, and
+  patterns shared between fields (span/td cells) are compiled once in total.
+- A probe is a pattern plus the filter its field applies. Probes form
+  priority chains per field (e.g. wind_direction: HTML classes, then
+  JavaScript strings, then table cells), flattened from the stages and
+  fallbacks of parse_maritime_html.
+- Per page, each pattern's matches are produced lazily and kept: a pattern
+  walks the page at most once, only as far as its probes need, and every
+  probe that shares it reads the same matches (the re.findall sequence).
+  Probes below a resolved one in its chain are never run.
+- Each pattern knows the literals every match must contain ('kelembaban',
+  'cm/s', 'class="' + 'wave', ...). A page missing one is ruled out with a
+  substring test, and the regex never runs on it. The test runs on the
+  page encoded once to bytes and lowered (latin-1 when the page fits,
+  else UTF-8; bytes.lower only touches ASCII and costs ~1/15 of
+  str.casefold). Pages containing one of the few non-ASCII characters
+  re.IGNORECASE matches to an ASCII letter skip the test.
+- The dict is assembled in the same order, with the same fallbacks, as
+  parse_maritime_html.
+
+A combined alternation of all patterns (one regex walk over the page) was
+measured too: CPython's re then tries every alternative at every position
+and loses the literal-prefix search of the individual patterns, which made
+it ~10x slower than the original parser.
+
+Measured with parser_benchmark.py (60 corpus pages, ~32 KB each, seeded
+synthetic until real pages are recorded): ~140 vs ~113 pages/sec, no
+field slower than parse_maritime_html beyond run-to-run noise, peak
+memory ~90 KB vs ~37 KB (the lowered page copy plus kept matches).
+"""
+
+import json
+import re
+from datetime import datetime
+
+# Inline regex flags of the patterns
+IGNORECASE = 'i'
+IGNORECASE_DOTALL = 'is'
+DOTALL = 's'
+
+DIRECTION_KEYWORDS = [
+    'barat', 'timur', 'utara', 'selatan', 'tenggara', 'barat daya',
+    'barat laut', 'timur laut', 'utara timur', 'selatan barat',
+    'west', 'east', 'north', 'south', 'southeast', 'southwest',
+    'northwest', 'northeast'
+]
+AREA_TERMS = ['perairan', 'aceh', 'medan', 'banda', 'provinsi', 'kota', 'kabupaten']
+TABLE_AREA_TERMS = ['perairan', 'aceh', 'medan', 'banda', 'provinsi']
+WAVE_CLASS_KEYWORDS = ['sedang', 'rendah', 'tinggi', 'sangat tinggi', 'moderate', 'low', 'high', 'very high']
+WEATHER_KEYWORDS = ['hujan', 'berawan', 'cerah', 'mendung', 'rain', 'cloudy', 'clear', 'overcast']
+
+TAG_RE = re.compile(r'<[^>]+>')
+# Non-ASCII characters re.IGNORECASE matches to an ASCII letter (İ ı ſ K)
+ASCII_CASE_VARIANTS = '\u0130\u0131\u017f\u212a'
+
+# (pattern, flags) of parse_maritime_html; identical pattern/flag pairs are shared
+CLASS_WIND = (r'class="[^"]*wind[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE_DOTALL)
+CLASS_DIRECTION = (r'class="[^"]*direction[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE_DOTALL)
+SPAN_TEXT = (r'<span[^>]*class="[^"]*text-[^"]*"[^>]*>([^<>\n]+)</span>', IGNORECASE)
+TD_CENTER = (r'<td[^>]*class="[^"]*text-center[^"]*"[^>]*>([^<>\n]+)</td>', IGNORECASE)
+TD_LEFT = (r'<td[^>]*class="[^"]*text-left[^"]*"[^>]*>([^<>\n]+)</td>', IGNORECASE)
+TD_RIGHT = (r'<td[^>]*class="[^"]*text-right[^"]*"[^>]*>([^<>\n]+)</td>', IGNORECASE)
+TD_ANY = (r'<td[^>]*>([^<>\n]+)</td>', IGNORECASE)
+TABLE_CELL_PATTERNS = [TD_CENTER, TD_LEFT, TD_RIGHT, TD_ANY]
+# The direction patterns ran with DOTALL; it only changes patterns containing '.'
+DOTALL_INSENSITIVE = {SPAN_TEXT, TD_CENTER}
+
+
+def _direction_cell(text):
+    text = text.strip()
+    lowered = text.lower()
+    if (any(term in lowered for term in DIRECTION_KEYWORDS) and
+            not any(term in lowered for term in AREA_TERMS) and
+            len(text) < 30 and
+            not text.startswith('/') and
+            'class=' not in text and
+            'href=' not in text):
+        return text
+    return None
+
+
+def _js_direction(text):
+    text = TAG_RE.sub('', text).strip()
+    if (not any(term in text.lower() for term in AREA_TERMS) and
+            len(text) < 30 and
+            not text.startswith('data-') and
+            'class=' not in text):
+        return text
+    return None
+
+
+def _wave_class_cell(text):
+    text = text.strip()
+    return text if any(term in text.lower() for term in WAVE_CLASS_KEYWORDS) else None
+
+
+def _weather_cell(text):
+    text = text.strip()
+    if (any(term in text.lower() for term in WEATHER_KEYWORDS) and
+            len(text) < 50 and
+            not text.startswith('/') and
+            'class=' not in text and
+            'href=' not in text):
+        return text
+    return None
+
+
+def _table_direction_cell(text):
+    text = text.strip()
+    lowered = text.lower()
+    if any(term in lowered for term in DIRECTION_KEYWORDS) and not any(term in lowered for term in TABLE_AREA_TERMS):
+        return text
+    return None
+
+
+def _table_keyword_cell(keywords):
+    def accept(text):
+        text = text.strip()
+        return text if any(term in text.lower() for term in keywords) else None
+    return accept
+
+
+def _max_int(limit):
+    return lambda text: text if int(text) <= limit else None
+
+
+def _max_float(limit):
+    return lambda text: text if float(text) <= limit else None
+
+
+def _clock_time(separator):
+    """Validation parse_maritime_html applies to the first time-only match"""
+    def accept(text):
+        parts = text.split(separator)
+        if len(parts) == 2 and len(parts[0]) <= 2 and len(parts[1]) <= 2:
+            if 0 <= int(parts[0]) <= 23 and 0 <= int(parts[1]) <= 59:
+                return text
+        return None
+    return accept
+
+
+def _first(text):
+    return text
+
+
+# Probe modes
+FIRST_VALID = 'first_valid'  # first findall match the filter accepts
+FIRST_ONLY = 'first_only'    # only the first match counts (re.search / findall()[0])
+ALL = 'all'                  # every match, in order
+
+# Field -> probes in priority order: (pattern, mode, filter)
+# parse_maritime_html's stages and fallbacks are flattened into these chains
+FIELD_CHAINS = {
+    'temperature': [
+        ((r'(\d+)°C', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d+)\s*C', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d+)\s*Celcius', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d+)\s*derajat', IGNORECASE), FIRST_ONLY, _first),
+    ],
+    'humidity': [
+        ((r'(\d+)%', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'Kelembaban[:\s]*(\d+)', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'Humidity[:\s]*(\d+)', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'RH[:\s]*(\d+)', IGNORECASE), FIRST_VALID, _max_int(100)),
+    ],
+    'wind_speed': [
+        ((r'(\d+)\s*kt', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'(\d+)\s*knot', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'(\d+)\s*km/h', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'(\d+)\s*m/s', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'Kecepatan[:\s]*(\d+)', IGNORECASE), FIRST_VALID, _max_int(100)),
+        ((r'Wind[:\s]*(\d+)', IGNORECASE), FIRST_VALID, _max_int(100)),
+    ],
+    'wind_gust': [
+        ((r'Gust[:\s]*(\d+)', IGNORECASE), FIRST_ONLY, _first),
+        ((r'Angin[:\s]*Puncak[:\s]*(\d+)', IGNORECASE), FIRST_ONLY, _first),
+        ((r'Puncak[:\s]*(\d+)', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d+)\s*kt.*gust', IGNORECASE), FIRST_ONLY, _first),
+        ((r'gust.*(\d+)\s*kt', IGNORECASE), FIRST_ONLY, _first),
+    ],
+    'wind_direction': [
+        (CLASS_WIND, FIRST_VALID, _direction_cell),
+        (CLASS_DIRECTION, FIRST_VALID, _direction_cell),
+        (SPAN_TEXT, FIRST_VALID, _direction_cell),
+        (TD_CENTER, FIRST_VALID, _direction_cell),
+        ((r'<th[^>]*>.*?[Aa]ngin.*?[Dd]ari.*?</th>.*?<td[^>]*>([^<>\n]+)</td>', IGNORECASE_DOTALL),
+         FIRST_VALID, _direction_cell),
+        ((r'<th[^>]*>.*?[Ww]ind.*?[Dd]irection.*?</th>.*?<td[^>]*>([^<>\n]+)</td>', IGNORECASE_DOTALL),
+         FIRST_VALID, _direction_cell),
+        ((r'[Aa]ngin[:\s]*[Dd]ari[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        ((r'[Ww]ind[:\s]*[Dd]irection[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        # JavaScript data
+        ((r'["\']([^"\']*(?:Tenggara|Barat Laut|Barat Daya|Timur Laut|Barat|Timur|Utara|Selatan)[^"\']*)["\']\s*,\s*\d+\s*kt',
+          IGNORECASE), FIRST_VALID, _js_direction),
+        ((r'wind_from["\']?\s*:\s*["\']?([^"\']*(?:Tenggara|Barat Laut|Barat Daya|Timur Laut|Barat|Timur|Utara|Selatan)[^"\']*)["\']?',
+          IGNORECASE), FIRST_VALID, _js_direction),
+        ((r'["\']([^"\']*(?:Tenggara|Barat Laut|Barat Daya|Timur Laut|Barat|Timur|Utara|Selatan)[^"\']*)["\']',
+          IGNORECASE), FIRST_VALID, _js_direction),
+    ] + [(pattern, FIRST_VALID, _table_direction_cell) for pattern in TABLE_CELL_PATTERNS],
+    'current_direction': [
+        ((r'class="[^"]*current[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        ((r'Arus[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        ((r'Current[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        ((r'<th[^>]*>.*?[Aa]rus.*?[Dd]ari.*?</th>.*?<td[^>]*>([^<>\n]+)</td>', IGNORECASE_DOTALL),
+         FIRST_VALID, _direction_cell),
+        ((r'<th[^>]*>.*?[Cc]urrent.*?[Dd]irection.*?</th>.*?<td[^>]*>([^<>\n]+)</td>', IGNORECASE_DOTALL),
+         FIRST_VALID, _direction_cell),
+        ((r'[Aa]rus[:\s]*[Dd]ari[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        ((r'[Cc]urrent[:\s]*[Dd]irection[:\s]*([^<>\n]+)', IGNORECASE_DOTALL), FIRST_VALID, _direction_cell),
+        # JavaScript data
+        ((r'current_to["\']?\s*:\s*["\']?([^"\']*(?:Barat|Timur|Utara|Selatan)[^"\']*)["\']?', IGNORECASE),
+         FIRST_VALID, _js_direction),
+        ((r'["\']([^"\']*(?:Barat|Timur|Utara|Selatan)[^"\']*)["\']', IGNORECASE), FIRST_VALID, _js_direction),
+    ] + [(pattern, FIRST_VALID, _table_direction_cell) for pattern in TABLE_CELL_PATTERNS],
+    'wave_height': [
+        ((r'(\d+\.?\d*)\s*m', IGNORECASE), FIRST_VALID, _max_float(20)),
+        ((r'(\d+\.?\d*)\s*meter', IGNORECASE), FIRST_VALID, _max_float(20)),
+        ((r'Tinggi[:\s]*Gelombang[:\s]*(\d+\.?\d*)', IGNORECASE), FIRST_VALID, _max_float(20)),
+        ((r'Wave[:\s]*Height[:\s]*(\d+\.?\d*)', IGNORECASE), FIRST_VALID, _max_float(20)),
+    ],
+    'wave_classification': [
+        ((r'class="[^"]*wave[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE), FIRST_VALID, _wave_class_cell),
+        (SPAN_TEXT, FIRST_VALID, _wave_class_cell),
+        (TD_CENTER, FIRST_VALID, _wave_class_cell),
+    ] + [(pattern, FIRST_VALID, _table_keyword_cell(WAVE_CLASS_KEYWORDS)) for pattern in TABLE_CELL_PATTERNS],
+    'current_speed': [
+        ((r'(\d+\.?\d*)\s*cm/s', IGNORECASE), FIRST_VALID, _max_float(200)),
+        ((r'(\d+\.?\d*)\s*m/s', IGNORECASE), FIRST_VALID, _max_float(200)),
+        ((r'(\d+\.?\d*)\s*knot', IGNORECASE), FIRST_VALID, _max_float(200)),
+        ((r'Kecepatan[:\s]*Arus[:\s]*(\d+\.?\d*)', IGNORECASE), FIRST_VALID, _max_float(200)),
+        ((r'Current[:\s]*Speed[:\s]*(\d+\.?\d*)', IGNORECASE), FIRST_VALID, _max_float(200)),
+    ],
+    'weather_condition': [
+        ((r'class="weather-text"[^>]*>([^<>\n]+)</', IGNORECASE), FIRST_VALID, _weather_cell),
+        ((r'class="[^"]*weather[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE), FIRST_VALID, _weather_cell),
+        ((r'class="[^"]*condition[^"]*"[^>]*>([^<>\n]+)</', IGNORECASE), FIRST_VALID, _weather_cell),
+        (SPAN_TEXT, FIRST_VALID, _weather_cell),
+        ((r'Cuaca[:\s]*([^<>\n]+)', IGNORECASE), FIRST_VALID, _weather_cell),
+        ((r'Weather[:\s]*([^<>\n]+)', IGNORECASE), FIRST_VALID, _weather_cell),
+    ] + [(pattern, FIRST_VALID, _table_keyword_cell(WEATHER_KEYWORDS)) for pattern in TABLE_CELL_PATTERNS],
+    # Only the first match of each pattern is considered; time-only values must be a clock time
+    'time': [
+        ((r'(\d{1,2}\s+Agu\s+\d{2},\s+\d{2}\.\d{2})', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d{1,2}\s+[A-Za-z]+\s+\d{2},\s+\d{2}\.\d{2})', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d{2}\.\d{2})', IGNORECASE), FIRST_ONLY, _clock_time('.')),
+        ((r'(\d{1,2}:\d{2})', IGNORECASE), FIRST_ONLY, _clock_time(':')),
+        ((r'Waktu[:\s]*([^<>\n]+)', IGNORECASE), FIRST_ONLY, _first),
+        ((r'Time[:\s]*([^<>\n]+)', IGNORECASE), FIRST_ONLY, _first),
+    ],
+    'is_current': [
+        ((r'Saat ini', IGNORECASE), FIRST_ONLY, _first),
+        ((r'Current', IGNORECASE), FIRST_ONLY, _first),
+        ((r'Now', IGNORECASE), FIRST_ONLY, _first),
+        ((r'(\d{1,2}\s+[A-Za-z]+\s+\d{2},\s+\d{2}\.\d{2})', IGNORECASE), FIRST_ONLY, _first),
+    ],
+    'weather_icon': [
+        ((r'src="([^"]*\.svg)"', IGNORECASE), FIRST_ONLY, _first),
+        ((r'src="([^"]*\.png)"', IGNORECASE), FIRST_ONLY, _first),
+        ((r'src="([^"]*\.jpg)"', IGNORECASE), FIRST_ONLY, _first),
+        ((r'class="[^"]*icon[^"]*"[^>]*src="([^"]*)"', IGNORECASE), FIRST_ONLY, _first),
+    ],
+    'json_ld': [
+        ((r'<script[^>]*type="application/ld\+json"[^>]*>(.*?)</script>', DOTALL), ALL, _first),
+    ],
+}
+
+# Where each chain's stages begin (parse_maritime_html fills them at different points)
+HTML_PROBES = {'wind_direction': 8, 'current_direction': 7, 'wave_classification': 3, 'weather_condition': 6}
+JS_PROBES = {'wind_direction': 11, 'current_direction': 9}
+TABLE_FIELDS = ['wind_direction', 'current_direction', 'wave_classification', 'weather_condition']
+
+
+def _flagged(pattern, flags):
+    return f'(?{flags}:{pattern})'
+
+
+def _skip_quantifier(pattern, position):
+    """Position after the quantifier (if any) starting at `position`"""
+    if position < len(pattern) and pattern[position] == '{':
+        position = pattern.index('}', position) + 1
+    elif position < len(pattern) and pattern[position] in '*+?':
+        position += 1
+    else:
+        return position
+    if position < len(pattern) and pattern[position] in '?+':
+        position += 1  # lazy / possessive
+    return position
+
+
+def _required_literals(pattern):
+    """
+    Literal runs every match of `pattern` contains. Only plain
+    characters outside classes, escapes, alternations and optional parts
+    count, so the list may miss some but never claims too much.
+    """
+    literals = []
+    run = []
+
+    def flush():
+        if run:
+            literals.append(''.join(run))
+            run.clear()
+
+    position = 0
+    while position < len(pattern):
+        char = pattern[position]
+        if char == '\\':
+            flush()
+            position = _skip_quantifier(pattern, position + 2)
+        elif char == '[':
+            flush()
+            end = pattern.index(']', position + 2)  # a ']' right after '[' is part of the class
+            position = _skip_quantifier(pattern, end + 1)
+        elif char == '(':
+            flush()
+            depth, end = 0, position
+            while True:
+                if pattern[end] == '\\':
+                    end += 2
+                    continue
+                depth += {'(': 1, ')': -1}.get(pattern[end], 0)
+                if depth == 0:
+                    break
+                end += 1
+            after = _skip_quantifier(pattern, end + 1)
+            inner = pattern[position + 1:end]
+            # Plain groups repeated at least once; alternations and (?...) groups are skipped
+            if pattern[end + 1:after] in ('', '+', '+?') and '|' not in inner and not inner.startswith('?'):
+                literals.extend(_required_literals(inner))
+            position = after
+        elif char in '.^$|':
+            flush()
+            position = _skip_quantifier(pattern, position + 1)
+        else:
+            after = _skip_quantifier(pattern, position + 1)
+            if after == position + 1:
+                run.append(char)
+            else:
+                flush()
+                if pattern[position + 1] == '+':
+                    run.append(char)  # at least once
+                    flush()
+            position = after
+    flush()
+    return literals
+
+
+class _Pattern:
+    """One distinct (pattern, flags), compiled once and shared by every probe using it"""
+
+    def __init__(self, index, pattern, flags):
+        self.index = index
+        self.regex = re.compile(_flagged(pattern, flags))
+        # Pages missing one of these cannot match, so the regex never runs on them.
+        # Case-sensitive patterns already start with re's own literal search, and
+        # literals without a letter ('%', ',', ':') are on every page, so neither
+        # is worth a test; the rest are compared with the lowered page bytes.
+        self.required = []
+        if IGNORECASE in flags:
+            self.required = [literal.lower() for literal in _required_literals(pattern)
+                             if any(char.isalpha() for char in literal) and
+                             all(char.isascii() or char.lower() == char.upper() for char in literal)]
+
+
+class _Probe:
+    def __init__(self, field, rank, pattern, mode, accept):
+        self.field = field
+        self.rank = rank
+        self.pattern = pattern
+        self.mode = mode
+        self.accept = accept
+
+
+def _build_tables():
+    patterns = {}
+    chains = {}
+    for field, chain in FIELD_CHAINS.items():
+        chains[field] = []
+        for rank, ((pattern, flags), mode, accept) in enumerate(chain):
+            if (pattern, flags) in DOTALL_INSENSITIVE or flags == IGNORECASE_DOTALL and '.' not in pattern:
+                flags = IGNORECASE  # DOTALL cannot change these, so they share the IGNORECASE pattern
+            key = (pattern, flags)
+            if key not in patterns:
+                patterns[key] = _Pattern(len(patterns), pattern, flags)
+            chains[field].append(_Probe(field, rank, patterns[key], mode, accept))
+    return list(patterns.values()), chains
+
+
+PATTERNS, CHAINS = _build_tables()
+
+
+class _Page:
+    """
+    The match stream of every pattern over one page, produced lazily: a
+    pattern advances only as far as some probe asks, and every probe that
+    shares it reads the same matches (same sequence as re.findall)
+    """
+
+    def __init__(self, html_content):
+        self.html_content = html_content
+        self.folded = None
+        self.encoding = None
+        self.found = [None] * len(PATTERNS)
+        self.streams = [None] * len(PATTERNS)
+
+    def matches(self, pattern):
+        index = pattern.index
+        found = self.found[index]
+        if found is None:
+            found = self.found[index] = []
+            if self.possible(pattern):
+                self.streams[index] = pattern.regex.finditer(self.html_content)
+            else:
+                self.streams[index] = iter(())
+        position = 0
+        while True:
+            if position < len(found):
+                yield found[position]
+                position += 1
+                continue
+            match = next(self.streams[index], None)
+            if match is None:
+                return
+            found.append(match.group(1) if match.re.groups else match.group(0))
+
+    def possible(self, pattern):
+        """False when the page lacks one of the pattern's required literals"""
+        if not pattern.required:
+            return True
+        if self.folded is None:
+            try:
+                self.encoding = 'latin-1'
+                self.folded = self.html_content.encode(self.encoding).lower()
+            except UnicodeEncodeError:
+                if any(char in self.html_content for char in ASCII_CASE_VARIANTS):
+                    self.folded = False
+                else:
+                    self.encoding = 'utf-8'
+                    self.folded = self.html_content.encode(self.encoding, 'surrogatepass').lower()
+        if self.folded is False:
+            return True
+        return all(literal.encode(self.encoding) in self.folded for literal in pattern.required)
+
+    def probe(self, probe):
+        """The probe's result: accepted value, every match (ALL), or None"""
+        if probe.mode == ALL:
+            if self.found[probe.pattern.index] is None:
+                # Nothing read yet: one findall instead of stepping a match stream
+                self.found[probe.pattern.index] = probe.pattern.regex.findall(self.html_content)
+                self.streams[probe.pattern.index] = iter(())
+            return list(self.matches(probe.pattern))
+        for value in self.matches(probe.pattern):
+            accepted = probe.accept(value)
+            if accepted is not None or probe.mode == FIRST_ONLY:
+                return accepted
+        return None
+
+    def resolve(self, field, start=0, stop=None):
+        """Result of the first probe in [start, stop) of the field's chain that resolves"""
+        for probe in CHAINS[field][start:stop]:
+            value = self.probe(probe)
+            if value is not None:
+                return value
+        return None
+
+
+def scan(html_content, fields=None):
+    """{field: first resolved value of its whole chain} (used by the benchmark)"""
+    page = _Page(html_content)
+    return {field: page.resolve(field) for field in (fields or CHAINS)}
+
+
+def extract_maritime_html(html_content, area_name):
+    """Parse weather data from BMKG maritime HTML page (same output as parse_maritime_html)"""
+
+    try:
+        weather_data = {
+            'area_name': area_name,
+            'source': 'BMKG Maritime HTML',
+            'parsed_at': datetime.now().isoformat()
+        }
+        page = _Page(html_content)
+
+        def assign(field, value):
+            if value is not None:
+                weather_data[field] = value
+
+        assign('temperature', page.resolve('temperature'))
+        assign('humidity', page.resolve('humidity'))
+        assign('wind_speed', page.resolve('wind_speed'))
+        assign('wind_gust', page.resolve('wind_gust'))
+        assign('wind_direction', page.resolve('wind_direction', 0, HTML_PROBES['wind_direction']))
+        assign('current_direction', page.resolve('current_direction', 0, HTML_PROBES['current_direction']))
+        assign('wave_height', page.resolve('wave_height'))
+        assign('wave_classification', page.resolve('wave_classification', 0, HTML_PROBES['wave_classification']))
+        assign('current_speed', page.resolve('current_speed'))
+        assign('weather_condition', page.resolve('weather_condition', 0, HTML_PROBES['weather_condition']))
+        assign('time', page.resolve('time'))
+        if page.resolve('is_current') is not None:
+            weather_data['is_current'] = True
+        assign('weather_icon', page.resolve('weather_icon'))
+
+        # Extract JSON-LD structured data if available
+        json_ld_matches = page.resolve('json_ld')
+        if json_ld_matches:
+            try:
+                for json_ld in json_ld_matches:
+                    json_data = json.loads(json_ld.strip())
+                    if json_data.get('@type') == 'WeatherForecast':
+                        weather_data['structured_data'] = {
+                            'forecast_name': json_data.get('name', ''),
+                            'provider': json_data.get('provider', {}).get('name', ''),
+                            'valid_from': json_data.get('validFrom', ''),
+                            'valid_to': json_data.get('validTo', ''),
+                            'date_issued': json_data.get('dateIssued', ''),
+                            'location': json_data.get('location', {}).get('name', '')
+                        }
+                        break
+            except json.JSONDecodeError:
+                pass  # Skip invalid JSON
+
+        # Directions embedded in JavaScript data
+        for field in ('wind_direction', 'current_direction'):
+            if field not in weather_data:
+                assign(field, page.resolve(field, HTML_PROBES[field], JS_PROBES[field]))
+
+        # Fallback: table cells, one cell pattern at a time
+        for cell_index in range(len(TABLE_CELL_PATTERNS)):
+            for field in TABLE_FIELDS:
+                if field not in weather_data:
+                    table_start = JS_PROBES.get(field, HTML_PROBES[field])
+                    assign(field, page.probe(CHAINS[field][table_start + cell_index]))
+
+        # If we found any data, return it
+        if len(weather_data) > 3:  # More than just area_name, source, and parsed_at
+            return weather_data
+        else:
+            return None
+
+    except Exception as e:
+        print(f"⚠️  HTML parsing error for {area_name}: {e}")
+        return None
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark and regression suite for the maritime HTML parsers
+
+Runs every parser in PARSERS over the recorded page corpus in
+parser_corpus/ (no network), and:
+
+- checks each page's output field by field against the golden outputs
+  (golden.json, recorded from parse_maritime_html)
+- reports pages/sec, per-field extraction time and peak memory (tracemalloc)
+- fails when a parser's throughput drops below THROUGHPUT_TOLERANCE x the
+  pages/sec stored in baseline.json
+
+Corpus layout:
+    parser_corpus/manifest.json   [{name, source, sha256, bytes}]
+    parser_corpus/pages/*.html.gz one gzipped page per manifest entry
+    parser_corpus/golden.json     {name: weather_data without parsed_at, or null}
+    parser_corpus/baseline.json   {parser: {pages_per_second, ...}}
+
+Usage:
+    python parser_benchmark.py                     # regression + benchmark, exit 1 on failure
+    python parser_benchmark.py --record [--live N] [saved_pages_dir]
+                                                   # add pages, re-record golden outputs
+    python parser_benchmark.py --update-baseline   # store this machine's throughput
+
+Pages are recorded from the BMKG response cache, a directory of saved
+*.html files, the live site (--live N areas) and, while the corpus has no
+real pages yet, seeded synthetic pages shaped like maritim.bmkg.go.id
+(source 'synthetic' in the manifest). A successor parser is benchmarked by
+adding it to PARSERS.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from fetch_maritime_weather import parse_maritime_html
+from maritime_extractor import FIELD_CHAINS, extract_maritime_html, scan
+from test_extractor_equivalence import AREAS, best_of, load_pages, run_old_field, synthetic_page
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parser_corpus')
+PAGES_DIR = os.path.join(CORPUS_DIR, 'pages')
+MANIFEST_PATH = os.path.join(CORPUS_DIR, 'manifest.json')
+GOLDEN_PATH = os.path.join(CORPUS_DIR, 'golden.json')
+BASELINE_PATH = os.path.join(CORPUS_DIR, 'baseline.json')
+
+SYNTHETIC_PAGES = 60
+SYNTHETIC_SEED = 22
+BENCHMARK_ROUNDS = 5
+# Fail when pages/sec falls below this fraction of the stored baseline
+THROUGHPUT_TOLERANCE = 0.8
+
+# name -> (parse(html, area_name), run one field(field, html)); the first one is the reference
+PARSERS = {
+    'parse_maritime_html': (parse_maritime_html, run_old_field),
+    'extract_maritime_html': (extract_maritime_html, lambda field, html_content: scan(html_content, [field])),
+}
+
+
+def comparable(weather_data):
+    """weather_data without its timestamp, as stored in golden.json"""
+    if weather_data is None:
+        return None
+    return {key: value for key, value in weather_data.items() if key != 'parsed_at'}
+
+
+def page_filename(name):
+    slug = re.sub(r'[^a-zA-Z0-9]+', '-', name).strip('-').lower()
+    return f"{slug or 'page'}.html.gz"
+
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(temp_path, path)
+
+
+def load_corpus():
+    """[(name, html)] in manifest order"""
+    pages = []
+    for entry in load_json(MANIFEST_PATH, []):
+        with gzip.open(os.path.join(PAGES_DIR, page_filename(entry['name'])), 'rb') as f:
+            body = f.read()
+        if hashlib.sha256(body).hexdigest() != entry['sha256']:
+            raise ValueError(f"Corpus page {entry['name']} does not match its manifest hash")
+        pages.append((entry['name'], body.decode('utf-8')))
+    return pages
+
+
+def corpus_page(rng, area_name, all_areas):
+    """A synthetic area page inside the navigation/layout markup of the real site"""
+    nav = ''.join(f'<li><a href="/cuaca/perairan/{area["slug"]}" class="block px-3 py-1">{area["name"]}</a></li>\n'
+                  for area in all_areas)
+    body = synthetic_page(rng, area_name)
+    return body.replace('<body>\n', '<body>\n<header class="flex items-center justify-between">'
+                                    f'<ul class="dropdown-menu">{nav}</ul></header>\n', 1)
+
+
+def synthetic_corpus(count=SYNTHETIC_PAGES, seed=SYNTHETIC_SEED):
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maritime_areas.json'),
+              'r', encoding='utf-8') as f:
+        all_areas = json.load(f)
+    rng = random.Random(seed)
+    names = rng.sample([area['name'] for area in all_areas], count - len(AREAS)) + AREAS
+    return [(f"synthetic-{name}", corpus_page(rng, name, all_areas)) for name in names]
+
+
+def fetch_live_pages(count):
+    """(slug, html) of the first `count` area pages from the live site"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bmkg_client import get_bmkg_client
+    from extract_maritime_slugs import load_maritime_areas
+
+    client = get_bmkg_client()
+    pages = []
+    for area in load_maritime_areas()[:count]:
+        try:
+            response = client.get(area['url'], timeout=30)
+        except Exception as e:
+            print(f"⚠️  {area['slug']}: {e}")
+            continue
+        if response.status_code == 200 and 'text/html' in response.headers.get('content-type', ''):
+            pages.append((area['slug'], response.text))
+        else:
+            print(f"⚠️  {area['slug']}: HTTP {response.status_code}")
+    return pages
+
+
+def record(directory=None, live=0):
+    """Add pages to the corpus and re-record the golden outputs from the reference parser"""
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    manifest = load_json(MANIFEST_PATH, [])
+    known = {entry['name'] for entry in manifest}
+
+    sources = [('saved', load_pages(directory))]
+    if live:
+        sources.append(('live', fetch_live_pages(live)))
+    if not any(pages for _, pages in sources) and not known:
+        sources.append(('synthetic', synthetic_corpus()))
+
+    added = 0
+    for source, pages in sources:
+        for name, html_content in pages:
+            if name in known:
+                continue
+            body = html_content.encode('utf-8')
+            with gzip.GzipFile(os.path.join(PAGES_DIR, page_filename(name)), 'wb', mtime=0) as f:
+                f.write(body)
+            manifest.append({'name': name, 'source': source,
+                             'sha256': hashlib.sha256(body).hexdigest(), 'bytes': len(body)})
+            known.add(name)
+            added += 1
+    save_json(MANIFEST_PATH, manifest)
+
+    reference = next(iter(PARSERS.values()))[0]
+    golden = {name: comparable(reference(html_content, name)) for name, html_content in load_corpus()}
+    save_json(GOLDEN_PATH, golden)
+    print(f"📼 Corpus: {len(manifest)} pages (+{added}), golden outputs for {len(golden)} -> {CORPUS_DIR}")
+
+
+def check_golden(name, parse, pages, golden):
+    """Number of pages whose output differs from the golden output; prints per-field mismatches"""
+    field_mismatches = {}
+    failed_pages = 0
+    for page_name, html_content in pages:
+        expected = golden.get(page_name)
+        actual = comparable(parse(html_content, page_name))
+        if expected == actual:
+            continue
+        failed_pages += 1
+        for field in sorted(set(expected or {}) | set(actual or {})):
+            if (expected or {}).get(field) != (actual or {}).get(field):
+                field_mismatches.setdefault(field, []).append(page_name)
+    if failed_pages:
+        print(f"❌ {name}: {failed_pages}/{len(pages)} pages differ from golden")
+        for field, page_names in field_mismatches.items():
+            print(f"   {field}: {len(page_names)} pages, e.g. {page_names[0]}")
+    else:
+        print(f"✅ {name}: all {len(pages)} pages match golden")
+    return failed_pages
+
+
+def peak_memory(parse, pages):
+    """Peak traced allocation (bytes) while parsing each page once"""
+    tracemalloc.start()
+    try:
+        peak = 0
+        for page_name, html_content in pages:
+            tracemalloc.reset_peak()
+            parse(html_content, page_name)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        return peak
+    finally:
+        tracemalloc.stop()
+
+
+def page_parser(parse):
+    return lambda page_name, html_content: parse(html_content, page_name)
+
+
+def field_runner(run_field, field):
+    return lambda page_name, html_content: run_field(field, html_content)
+
+
+def measure(pages, rounds=BENCHMARK_ROUNDS):
+    """{parser: timings and peak memory} for every parser in PARSERS"""
+    elapsed = best_of(rounds, {name: page_parser(parse) for name, (parse, _) in PARSERS.items()}, pages)
+    fields = {
+        field: best_of(rounds, {name: field_runner(run_field, field) for name, (_, run_field) in PARSERS.items()},
+                       pages)
+        for field in FIELD_CHAINS
+    }
+    return {
+        name: {
+            'pages_per_second': len(pages) / elapsed[name],
+            'ms_per_page': elapsed[name] / len(pages) * 1000,
+            'field_ms': {field: fields[field][name] * 1000 for field in FIELD_CHAINS},
+            'peak_memory_kb': peak_memory(parse, pages) / 1024,
+        }
+        for name, (parse, _) in PARSERS.items()
+    }
+
+
+def print_results(results, pages):
+    total_bytes = sum(len(html_content) for _, html_content in pages)
+    print(f"\n⏱️  {len(pages)} pages, {total_bytes / 1024:.0f} KB, best of {BENCHMARK_ROUNDS}")
+    names = list(results)
+    print(f"   {'':<22}" + ''.join(f"{name:>24}" for name in names))
+    print(f"   {'pages/sec':<22}" + ''.join(f"{results[name]['pages_per_second']:24.0f}" for name in names))
+    print(f"   {'ms/page':<22}" + ''.join(f"{results[name]['ms_per_page']:24.3f}" for name in names))
+    print(f"   {'peak memory (KB)':<22}" + ''.join(f"{results[name]['peak_memory_kb']:24.0f}" for name in names))
+    print(f"   per field, ms for the whole corpus:")
+    for field in FIELD_CHAINS:
+        print(f"   {field:<22}" + ''.join(f"{results[name]['field_ms'][field]:24.1f}" for name in names))
+
+
+def check_baseline(results, baseline):
+    """Names of parsers slower than THROUGHPUT_TOLERANCE x their stored pages/sec"""
+    slow = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"⚠️  {name}: no stored baseline (run with --update-baseline)")
+            continue
+        floor = baseline[name]['pages_per_second'] * THROUGHPUT_TOLERANCE
+        if result['pages_per_second'] < floor:
+            slow.append(name)
+            print(f"❌ {name}: {result['pages_per_second']:.0f} pages/sec < {floor:.0f} "
+                  f"({THROUGHPUT_TOLERANCE:.0%} of baseline {baseline[name]['pages_per_second']:.0f})")
+        else:
+            print(f"✅ {name}: {result['pages_per_second']:.0f} pages/sec "
+                  f"(baseline {baseline[name]['pages_per_second']:.0f})")
+    return slow
+
+
+def run(update_baseline=False):
+    pages = load_corpus()
+    if not pages:
+        print(f"❌ Empty corpus; run with --record first")
+        return False
+    golden = load_json(GOLDEN_PATH, {})
+    print(f"📼 Corpus: {len(pages)} pages from {CORPUS_DIR}")
+
+    failures = sum(check_golden(name, parse, pages, golden) for name, (parse, _) in PARSERS.items())
+    results = measure(pages)
+    print_results(results, pages)
+
+    if update_baseline:
+        save_json(BASELINE_PATH, {
+            name: {'pages_per_second': round(result['pages_per_second'], 1),
+                   'ms_per_page': round(result['ms_per_page'], 4),
+                   'peak_memory_kb': round(result['peak_memory_kb'], 1)}
+            for name, result in results.items()
+        })
+        print(f"\n💾 Baseline updated: {BASELINE_PATH}")
+        slow = []
+    else:
+        print()
+        slow = check_baseline(results, load_json(BASELINE_PATH, {}))
+    return not failures and not slow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline maritime parser regression suite and benchmark")
+    parser.add_argument('saved_pages_dir', nargs='?', help="directory of saved *.html pages (with --record)")
+    parser.add_argument('--record', action='store_true', help="add pages to the corpus and re-record golden outputs")
+    parser.add_argument('--live', type=int, default=0, metavar='N', help="with --record, fetch N live area pages")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run's throughput as the baseline")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.saved_pages_dir, args.live)
+        return True
+    return run(args.update_baseline)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
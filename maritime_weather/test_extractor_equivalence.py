@@ -0,0 +1,186 @@
+import glob
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+import zlib
+
+from fetch_maritime_weather import parse_maritime_html
+from maritime_extractor import FIELD_CHAINS, FIRST_ONLY, FIRST_VALID, extract_maritime_html, scan
+
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmkg_cache import DEFAULT_CACHE_PATH
+
+FUZZ_PAGES = 2000
+BENCHMARK_ROUNDS = 5
+
+DIRECTIONS = ['Utara', 'Timur Laut', 'Timur', 'Tenggara', 'Selatan', 'Barat Daya', 'Barat', 'Barat Laut']
+WEATHER = ['Cerah', 'Cerah Berawan', 'Berawan', 'Hujan Ringan', 'Hujan Sedang', 'Mendung', 'Petir']
+WAVES = ['Rendah', 'Sedang', 'Tinggi', 'Sangat Tinggi', 'Tenang']
+AREAS = ['Perairan Aceh Utara - Aceh Timur', 'Perairan Banda Aceh', 'Perairan Medan', 'Selat Makassar Bagian Utara']
+
+FUZZ_TOKENS = [
+    '28', '7', '150', '1.5', '0.25', '23.59', '24.00', '08.30', '12:45', '99:99', ' ', '\n', '  ', ',', ':', '"', "'",
+    '°C', ' C', 'Celcius', 'derajat', '%', 'kt', ' knot', 'km/h', 'm/s', 'cm/s', ' m', 'meter', 'gust', 'Gust:',
+    'Angin Puncak', 'Puncak:', 'Kelembaban:', 'Humidity', 'RH ', 'Kecepatan', 'Kecepatan Arus:', 'Wind', 'Wind Direction:',
+    'Angin dari:', 'Arus dari ', 'Arus:', 'Current:', 'Current Speed', 'Current Direction', 'Tinggi Gelombang:',
+    'Wave Height', 'Cuaca:', 'Weather:', 'Waktu:', 'Time:', 'Saat ini', 'Now', '15 Agu 25, 08.00', '3 Sep 25, 14.30',
+    '<td>', '</td>', '<td class="text-center">', '<td class="text-left">', '<td class="text-right">',
+    '<th>', '</th>', '<span class="text-sm">', '</span>', '<div class="wind-dir">', '<div class="wave">',
+    '<div class="current-box">', '<div class="weather-text">', '<p class="condition">', '</div>', '</p>',
+    '<img class="icon" src="/a.png">', 'src="/icon/b.svg"', 'src="x.jpg"', 'wind_from: "', 'current_to:"',
+    '<script type="application/ld+json">', '{"@type": "WeatherForecast", "name": "F", "provider": {"name": "BMKG"}}',
+    '{"@type": "Place"}', '{broken', '</script>', 'class="x"', 'href="/perairan"', '/path',
+    'perairan', 'Provinsi', 'Sangat Tinggi',
+    # Non-ASCII characters re.IGNORECASE matches to ASCII letters, and one outside latin-1
+    '\u212a', '\u017f', '\u0130', '\u0131', '\u2014',
+] + DIRECTIONS + WEATHER + WAVES
+
+
+def synthetic_page(rng, area_name):
+    """A page shaped like maritim.bmkg.go.id/cuaca/perairan/..., with randomized content"""
+    rows = []
+    for hour in range(rng.randint(1, 8)):
+        rows.append(
+            f'<tr><td class="text-left">{rng.randint(1, 28)} Agu 25, {hour * 3:02d}.00</td>'
+            f'<td class="text-center">{rng.choice(WEATHER)}</td>'
+            f'<td class="text-center">{rng.choice(DIRECTIONS)}</td>'
+            f'<td class="text-right">{rng.randint(0, 40)} kt</td>'
+            f'<td>{rng.choice(WAVES)}</td><td>{rng.randint(0, 45) / 10} m</td></tr>')
+    blocks = [
+        f'<nav>' + ''.join(f'<a href="/cuaca/perairan/{i}" class="text-sm">{a}</a>\n' for i, a in enumerate(AREAS)) + '</nav>',
+        f'<div class="weather-card"><span class="text-lg">{rng.randint(22, 33)}°C</span>\n'
+        f'<span class="text-sm">{rng.choice(WEATHER)}</span>\n<span class="text-xs">{rng.randint(60, 99)}%</span></div>',
+        f'<div class="wind"><p class="wind-direction">{rng.choice(DIRECTIONS)}</p>\n'
+        f'<p>Angin Puncak: {rng.randint(10, 50)} kt</p></div>',
+        f'<table><thead><tr><th>Waktu</th><th>Cuaca</th><th>Angin dari</th><th>Kecepatan</th>'
+        f'<th>Gelombang</th><th>Tinggi</th></tr></thead>\n<tbody>' + '\n'.join(rows) + '</tbody></table>',
+        f'<div class="current-info">Arus dari {rng.choice(DIRECTIONS)}\n'
+        f'Kecepatan Arus: {rng.randint(0, 120) / 10} cm/s</div>',
+        f'<p>Saat ini</p><img class="weather-icon" src="/images/icon-{rng.randint(1, 9)}.svg">',
+        f'<script>var data = [["{rng.choice(DIRECTIONS)}", {rng.randint(1, 30)} kt], '
+        f'{{wind_from: "{rng.choice(DIRECTIONS)}", current_to: "{rng.choice(DIRECTIONS)}"}}];</script>',
+        f'<script type="application/ld+json">{{"@type": "WeatherForecast", "name": "{area_name}", '
+        f'"provider": {{"name": "BMKG"}}, "validFrom": "2025-08-15T00:00", "location": {{"name": "{area_name}"}}}}</script>',
+    ]
+    keep = [block for block in blocks if rng.random() < 0.85]
+    rng.shuffle(keep)
+    return f'<html><head><title>{area_name}</title></head><body>\n' + '\n'.join(keep) + '\n</body></html>'
+
+
+def fuzz_page(rng):
+    """Random soup of the tokens the parser's patterns look for"""
+    return ''.join(rng.choice(FUZZ_TOKENS) for _ in range(rng.randint(5, 400)))
+
+
+def load_pages(directory=None):
+    """(name, html) of saved pages: *.html in `directory` and maritime bodies in the BMKG response cache"""
+    pages = []
+    if directory:
+        for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append((os.path.basename(path), f.read()))
+    if os.path.exists(DEFAULT_CACHE_PATH):
+        db = sqlite3.connect(DEFAULT_CACHE_PATH)
+        try:
+            for key, url, body in db.execute("SELECT key, url, body FROM responses WHERE url LIKE '%/perairan/%'"):
+                pages.append((key, zlib.decompress(body).decode('utf-8', errors='replace')))
+        except sqlite3.Error as e:
+            print(f"⚠️  Could not read {DEFAULT_CACHE_PATH}: {e}")
+        finally:
+            db.close()
+    return pages
+
+
+def comparable(weather_data):
+    if weather_data is None:
+        return None
+    return [(key, value) for key, value in weather_data.items() if key != 'parsed_at']
+
+
+def compare_parsers(pages):
+    """Both parsers must return the same dict (same keys, same order) for every page"""
+    print(f"🧪 Equivalence on {len(pages)} pages")
+    mismatches = 0
+    parsed = 0
+    for name, html_content in pages:
+        expected = comparable(parse_maritime_html(html_content, name))
+        actual = comparable(extract_maritime_html(html_content, name))
+        parsed += expected is not None
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"❌ {name}")
+                print(f"   parse_maritime_html:   {expected}")
+                print(f"   extract_maritime_html: {actual}")
+    if mismatches:
+        print(f"❌ {mismatches} mismatches")
+    else:
+        print(f"✅ Identical output on all pages ({parsed} with weather data)")
+    return mismatches == 0
+
+
+def run_old_field(field, html_content):
+    """The searches parse_maritime_html runs for one field: re.search / re.findall per pattern, full page each"""
+    for (pattern, flags), mode, accept in FIELD_CHAINS[field]:
+        if mode == FIRST_ONLY:
+            match = re.search(f'(?{flags}:{pattern})', html_content)
+            if match and accept(match.group(1) if match.re.groups else match.group(0)) is not None:
+                return
+        else:
+            matches = re.findall(f'(?{flags}:{pattern})', html_content)
+            if mode == FIRST_VALID and any(accept(value) is not None for value in matches):
+                return
+
+
+def best_of(rounds, functions, pages):
+    """
+    Best time of each function over the pages. Rounds alternate between the
+    functions, so load changes on the machine hit all of them alike.
+    """
+    best = {}
+    for _ in range(rounds):
+        for key, function in functions.items():
+            started = time.perf_counter()
+            for name, html_content in pages:
+                function(name, html_content)
+            elapsed = time.perf_counter() - started
+            best[key] = min(best.get(key, elapsed), elapsed)
+    return best
+
+
+def benchmark(pages, rounds=BENCHMARK_ROUNDS):
+    """Per-field and total time of the multi-pass parser vs the precompiled extractor"""
+    total_bytes = sum(len(html_content) for _, html_content in pages)
+    print(f"\n⏱️  Benchmark: {len(pages)} pages, {total_bytes / 1024:.0f} KB, best of {rounds}")
+    print(f"   {'field':<20} {'patterns':>8} {'original':>12} {'extractor':>12} {'speedup':>8}")
+    for field, chain in FIELD_CHAINS.items():
+        old, new = best_of(rounds, {
+            'old': lambda name, html_content: run_old_field(field, html_content),
+            'new': lambda name, html_content: scan(html_content, [field]),
+        }, pages).values()
+        print(f"   {field:<20} {len(chain):8d} {old * 1000:9.1f} ms {new * 1000:9.1f} ms {old / new:7.1f}x")
+    old, new = best_of(rounds, {
+        'old': lambda name, html_content: parse_maritime_html(html_content, name),
+        'new': lambda name, html_content: extract_maritime_html(html_content, name),
+    }, pages).values()
+    print(f"   {'whole page':<20} {sum(len(c) for c in FIELD_CHAINS.values()):8d} "
+          f"{old * 1000:9.1f} ms {new * 1000:9.1f} ms {old / new:7.1f}x")
+    print(f"   ({old / len(pages) * 1000:.2f} ms -> {new / len(pages) * 1000:.2f} ms per page)")
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    saved = load_pages(directory)
+    rng = random.Random(19)
+    synthetic = [(f"synthetic-{i}", synthetic_page(rng, rng.choice(AREAS))) for i in range(200)]
+    fuzz = [(f"fuzz-{i}", fuzz_page(rng)) for i in range(FUZZ_PAGES)]
+    print(f"📄 Pages: {len(saved)} saved, {len(synthetic)} synthetic, {len(fuzz)} fuzz")
+
+    ok = compare_parsers(saved + synthetic + fuzz)
+    benchmark(saved or synthetic)
+    sys.exit(0 if ok else 1)
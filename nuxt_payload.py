@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Nuxt Payload Decoder and BMKG Entity Index
+maritim.bmkg.go.id ships its page data as Nuxt `_payload.json` files in the
+devalue format: one flat array whose objects and arrays hold indexes into
+that same array (values used twice are stored once and referenced).
+PayloadDecoder resolves those references, memoizing every index it has
+resolved, so shared values are decoded once and cycles terminate.
+
+The port list (pelabuhan/pelabuhan.json) and the maritime area list
+(maritime_weather/perairan.json) are compiled into one binary index of
+entities (kind, id, name, slug, lat, lon, province). Collectors load the
+index instead of walking the payloads; it is rebuilt automatically when a
+source file changes.
+
+Index layout (little endian):
+    header   '<4sHHII'      magic b'BMKX', version, source count,
+                            entity count, string table size
+    source   '<64sqq'       path (relative to the project root, NUL
+                            padded), mtime_ns, size
+    entity   '<BxxxIIIIdd'  kind (0 port, 1 area), id, name, slug, province
+                            (numbers in the string table), lat, lon (NaN if
+                            unknown)
+    strings  UTF-8, NUL-separated; split once on load
+
+Usage:
+    from nuxt_payload import decode, load_entity_index
+    tree = decode(payload)
+    index = load_entity_index()
+    index.ports, index.areas, index.by_slug('pelabuhan-tapaktuan')
+
+    python nuxt_payload.py          # (re)build the index and print a summary
+"""
+
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+PORT_PAYLOAD = os.path.join('pelabuhan', 'pelabuhan.json')
+AREA_PAYLOAD = os.path.join('maritime_weather', 'perairan.json')
+DEFAULT_INDEX_PATH = os.environ.get('BMKG_INDEX_PATH', os.path.join(PROJECT_ROOT, 'bmkg_entities.bin'))
+
+INDEX_MAGIC = b'BMKX'
+INDEX_VERSION = 1
+HEADER_FORMAT = '<4sHHII'
+SOURCE_FORMAT = '<64sqq'
+ENTITY_FORMAT = '<BxxxIIIIdd'
+
+PORT = 'port'
+AREA = 'area'
+KINDS = (PORT, AREA)
+AREA_URL = "https://maritim.bmkg.go.id/cuaca/perairan/{slug}"
+
+# devalue encodes these constants as negative indexes
+SPECIAL_VALUES = {-1: None, -2: None, -3: math.nan, -4: math.inf, -5: -math.inf, -6: -0.0}
+
+
+class PayloadDecoder:
+    """Resolves devalue references of one payload, memoizing every index it resolves"""
+
+    def __init__(self, payload):
+        if not isinstance(payload, list) or not payload:
+            raise ValueError("Not a Nuxt payload: expected a non-empty array")
+        self.payload = payload
+        self.resolved = {}
+
+    def resolve(self, index=0):
+        if not isinstance(index, int) or index < 0:
+            return SPECIAL_VALUES.get(index)
+        if index in self.resolved:
+            return self.resolved[index]
+        item = self.payload[index]
+        if isinstance(item, dict):
+            # Registered before its members, which may refer back to it
+            result = self.resolved[index] = {}
+            for key, ref in item.items():
+                result[key] = self.resolve(ref)
+        elif isinstance(item, list) and item and isinstance(item[0], str):
+            result = self._resolve_typed(index, item[0], item[1:])
+        elif isinstance(item, list):
+            result = self.resolved[index] = []
+            result.extend(self.resolve(ref) for ref in item)
+        else:
+            result = self.resolved[index] = item
+        return result
+
+    def _resolve_typed(self, index, kind, args):
+        """["Reactive", ref], ["Date", iso], ["Set", ...refs], ["Map", k, v, ...], ["null", key, v, ...]"""
+        if kind in ('Map', 'null'):
+            result = self.resolved[index] = {}
+            for key, ref in zip(args[::2], args[1::2]):
+                # null-prototype objects keep literal keys; Map keys are refs too
+                result[self.resolve(key) if kind == 'Map' else key] = self.resolve(ref)
+            return result
+        if kind == 'Set':
+            result = self.resolved[index] = []
+            result.extend(self.resolve(ref) for ref in args)
+            return result
+        if kind in ('Date', 'RegExp', 'BigInt', 'Object'):
+            result = args[0] if args else None  # kept as the serialized value
+        else:  # Reactive / ShallowReactive / Ref / ShallowRef / EmptyRef / ...
+            result = self.resolve(args[0]) if args else None
+        self.resolved[index] = result
+        return result
+
+
+def decode(payload):
+    """The fully resolved root (payload[0]) of a Nuxt payload"""
+    return PayloadDecoder(payload).resolve(0)
+
+
+def route_data(tree):
+    """The data of the page's first async-data entry ({'data': {key: {'data': ...}}})"""
+    entries = (tree or {}).get('data') or {}
+    for entry in entries.values():
+        return entry.get('data') if isinstance(entry, dict) and 'data' in entry else entry
+    return None
+
+
+def port_slug(name):
+    """BMKG port slug: "Pelabuhan Pomalaa/Dawi-dawi" -> "pelabuhan-pomalaa-dawi-dawi" """
+    slug = re.sub(r'[^a-zA-Z0-9\s]', ' ', name)
+    return re.sub(r'\s+', '-', slug.strip()).lower()
+
+
+def area_slug(name):
+    """BMKG area slug: "Perairan Aceh Utara - Aceh Timur" -> "perairan-aceh-utara-aceh-timur" """
+    return f"perairan-{port_slug(name.replace('Perairan', ''))}"
+
+
+def _entity(kind, entry, province, slug):
+    lat, lon = entry.get('lat'), entry.get('lon')
+    return {
+        'kind': kind,
+        'id': str(entry.get('id') or ''),
+        'name': entry['name'],
+        'slug': slug,
+        'lat': float(lat) if isinstance(lat, (int, float)) else None,
+        'lon': float(lon) if isinstance(lon, (int, float)) else None,
+        'province': province or '',
+    }
+
+
+def extract_ports(tree):
+    """Port entities from a decoded pelabuhan payload: [{province, ports: [{id, name, lat, lon}]}]"""
+    ports = []
+    for group in route_data(tree) or []:
+        for entry in group.get('ports') or []:
+            if isinstance(entry, dict) and isinstance(entry.get('name'), str):
+                ports.append(_entity(PORT, entry, group.get('province'), port_slug(entry['name'])))
+    return ports
+
+
+def extract_areas(tree):
+    """Area entities from a decoded perairan payload: [{province, areas: [{id, name}]}]"""
+    areas = []
+    for group in route_data(tree) or []:
+        for entry in group.get('areas') or []:
+            if isinstance(entry, dict) and isinstance(entry.get('name'), str):
+                areas.append(_entity(AREA, entry, group.get('province'), area_slug(entry['name'])))
+    return areas
+
+
+def _source_stamp(relative_path, root):
+    stat = os.stat(os.path.join(root, relative_path))
+    return relative_path, stat.st_mtime_ns, stat.st_size
+
+
+def pack_index(entities, sources):
+    """Index bytes for entities and the (path, mtime_ns, size) of the payloads they came from"""
+    strings = []
+    numbers = {}
+
+    def string(value):
+        if value not in numbers:
+            numbers[value] = len(strings)
+            strings.append(value)
+        return numbers[value]
+
+    source_rows = [struct.pack(SOURCE_FORMAT, path.replace(os.sep, '/').encode('utf-8'), mtime_ns, size)
+                   for path, mtime_ns, size in sources]
+    entity_rows = [
+        struct.pack(ENTITY_FORMAT, KINDS.index(entity['kind']), string(entity['id']), string(entity['name']),
+                    string(entity['slug']), string(entity['province']),
+                    math.nan if entity['lat'] is None else entity['lat'],
+                    math.nan if entity['lon'] is None else entity['lon'])
+        for entity in entities
+    ]
+    table = '\0'.join(strings).encode('utf-8')
+    header = struct.pack(HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, len(source_rows), len(entity_rows), len(table))
+    return b''.join([header] + source_rows + entity_rows + [table])
+
+
+class EntityIndex:
+    """Decoded index: entity dicts are built on first access"""
+
+    def __init__(self, data):
+        magic, version, source_count, entity_count, strings_size = struct.unpack_from(HEADER_FORMAT, data, 0)
+        if magic != INDEX_MAGIC:
+            raise ValueError("Not a BMKG entity index")
+        if version != INDEX_VERSION:
+            raise ValueError(f"Unsupported entity index version: {version}")
+        self._data = data
+        self._entities_at = struct.calcsize(HEADER_FORMAT) + source_count * struct.calcsize(SOURCE_FORMAT)
+        self._entity_count = entity_count
+        self._strings_at = len(data) - strings_size
+        self.sources = [
+            (os.path.join(*path.rstrip(b'\0').decode('utf-8').split('/')), mtime_ns, size)
+            for path, mtime_ns, size in struct.iter_unpack(
+                SOURCE_FORMAT, data[struct.calcsize(HEADER_FORMAT):self._entities_at])
+        ]
+        self._entities = None
+        self._by_kind = {}
+        self._slugs = None
+
+    def is_current(self, root=PROJECT_ROOT):
+        """True if every source payload still has the recorded mtime and size"""
+        try:
+            return all(_source_stamp(path, root) == (path, mtime_ns, size) for path, mtime_ns, size in self.sources)
+        except OSError:
+            return False
+
+    @property
+    def entities(self):
+        if self._entities is None:
+            rows = self._data[self._entities_at:self._entities_at + self._entity_count * struct.calcsize(ENTITY_FORMAT)]
+            strings = self._data[self._strings_at:].decode('utf-8').split('\0')
+            self._entities = [
+                {'kind': KINDS[kind], 'id': strings[id_], 'name': strings[name], 'slug': strings[slug],
+                 'lat': None if lat != lat else lat, 'lon': None if lon != lon else lon,
+                 'province': strings[province]}
+                for kind, id_, name, slug, province, lat, lon in struct.iter_unpack(ENTITY_FORMAT, rows)
+            ]
+        return self._entities
+
+    def _kind(self, kind):
+        if kind not in self._by_kind:
+            self._by_kind[kind] = [entity for entity in self.entities if entity['kind'] == kind]
+        return self._by_kind[kind]
+
+    @property
+    def ports(self):
+        """Port entities in payload order (shared dicts: copy before modifying)"""
+        return self._kind(PORT)
+
+    @property
+    def areas(self):
+        """Area entities in payload order (shared dicts: copy before modifying)"""
+        return self._kind(AREA)
+
+    def by_slug(self, slug):
+        """Entities with this slug (names are not unique, so neither are slugs)"""
+        if self._slugs is None:
+            self._slugs = {}
+            for entity in self.entities:
+                self._slugs.setdefault(entity['slug'], []).append(entity)
+        return self._slugs.get(slug, [])
+
+    def __len__(self):
+        return self._entity_count
+
+
+def build_entity_index(path=DEFAULT_INDEX_PATH, root=PROJECT_ROOT):
+    """Decode the port and area payloads and write the index atomically; returns its bytes"""
+    entities = []
+    sources = []
+    for relative_path, extract in ((PORT_PAYLOAD, extract_ports), (AREA_PAYLOAD, extract_areas)):
+        stamp = _source_stamp(relative_path, root)
+        with open(os.path.join(root, relative_path), 'r', encoding='utf-8') as file:
+            entities.extend(extract(decode(json.load(file))))
+        sources.append(stamp)
+    data = pack_index(entities, sources)
+    try:
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"⚠️  Could not write entity index {path}: {e}")
+    return data
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_entity_index(path=DEFAULT_INDEX_PATH, root=PROJECT_ROOT):
+    """The entity index, rebuilt first if missing, unreadable or older than its payloads"""
+    with _loaded_lock:
+        index = _loaded.get(path)
+        if index is not None and index.is_current(root):
+            return index
+        try:
+            with open(path, 'rb') as file:
+                index = EntityIndex(file.read())
+        except (OSError, ValueError, struct.error):
+            index = None
+        if index is None or not index.is_current(root):
+            index = EntityIndex(build_entity_index(path, root))
+        _loaded[path] = index
+        return index
+
+
+def main():
+    started = time.perf_counter()
+    data = build_entity_index()
+    built = time.perf_counter() - started
+    index = EntityIndex(data)
+    started = time.perf_counter()
+    with open(DEFAULT_INDEX_PATH, 'rb') as file:
+        EntityIndex(file.read())
+    loaded = time.perf_counter() - started
+    print(f"🗂️  Entity index: {len(index.ports)} ports, {len(index.areas)} areas -> {DEFAULT_INDEX_PATH}")
+    print(f"   {len(data) / 1024:.1f} KB | built in {built * 1000:.1f} ms | loads in {loaded * 1e6:.0f} µs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Adaptive Quadtree Grid
+Starts from the coarse 1-degree lattice and splits a cell into four only
+where the last grid snapshot shows strong temperature or wind variation,
+down to MIN_STEP (0.25 degree). Open ocean stays at 1 degree, so the grid
+gets near-0.25-degree detail where it matters for a fraction of the points.
+
+The output uses the gridData_1degree.json format (comma separated latitude
+and longitude strings, read by fetch_weather_data.load_grid_coordinates)
+plus per-point steps and the quadtree leaves, which AdaptiveGrid loads back
+as a spatial index.
+"""
+
+import json
+import math
+import os
+import sys
+
+# Add current directory to path to import local modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from grid_refresh import load_snapshot
+
+LAT_RANGE = (-11.0, 6.0)
+LON_RANGE = (95.0, 141.0)
+COARSE_STEP = 1.0
+MIN_STEP = 0.25
+
+# A cell is split when a variable varies more than this across it
+# (temperature in °C, wind components in km/h)
+SPLIT_THRESHOLDS = {
+    'temperature_2m': 1.5,
+    'wind_u': 8.0,
+    'wind_v': 8.0,
+}
+
+ADAPTIVE_GRID_FILE = 'gridData_adaptive.json'
+# Weather for the adaptive grid is kept apart from the 1-degree snapshot:
+# the raster and bilinear heatmap expect a single regular lattice, and the
+# 1-degree refresh would drop the refined cells on its next merge
+ADAPTIVE_WEATHER_FILE = 'grid_weather_data_adaptive.json'
+ADAPTIVE_LAYER = 'grid_adaptive'
+
+
+def _key(lat, lon):
+    return round(lat, 6), round(lon, 6)
+
+
+def snapshot_samples(records):
+    """{(lat, lon): {variable: value}} for temperature and wind u/v of a grid snapshot"""
+    samples = {}
+    for record in records:
+        weather = record.get('weather_data') or {}
+        values = {}
+        if weather.get('temperature_2m') is not None:
+            values['temperature_2m'] = float(weather['temperature_2m'])
+        speed, direction = weather.get('wind_speed_10m'), weather.get('wind_direction_10m')
+        if speed is not None and direction is not None:
+            # Meteorological direction is where the wind comes from
+            radians = math.radians(direction)
+            values['wind_u'] = -speed * math.sin(radians)
+            values['wind_v'] = -speed * math.cos(radians)
+        if values:
+            samples[_key(record['lat'], record['lon'])] = values
+    return samples
+
+
+class SampleIndex:
+    """Snapshot samples bucketed on the MIN_STEP lattice for fast in-cell lookups"""
+
+    def __init__(self, samples):
+        self.buckets = {}
+        for (lat, lon), values in samples.items():
+            bucket = (math.floor(lat / MIN_STEP + 1e-9), math.floor(lon / MIN_STEP + 1e-9))
+            self.buckets.setdefault(bucket, []).append((lat, lon, values))
+
+    def within(self, lat_min, lon_min, size):
+        """Samples inside the closed cell [lat_min, lat_min+size] x [lon_min, lon_min+size]"""
+        lat_max, lon_max = lat_min + size, lon_min + size
+        found = []
+        for row in range(math.floor(lat_min / MIN_STEP + 1e-9), math.floor(lat_max / MIN_STEP + 1e-9) + 1):
+            for col in range(math.floor(lon_min / MIN_STEP + 1e-9), math.floor(lon_max / MIN_STEP + 1e-9) + 1):
+                for lat, lon, values in self.buckets.get((row, col), ()):
+                    if lat_min - 1e-9 <= lat <= lat_max + 1e-9 and lon_min - 1e-9 <= lon <= lon_max + 1e-9:
+                        found.append(values)
+        return found
+
+
+def cell_score(samples):
+    """Largest variation / threshold over the variables, or None with < 2 samples"""
+    if len(samples) < 2:
+        return None
+    score = 0.0
+    for variable, threshold in SPLIT_THRESHOLDS.items():
+        values = [s[variable] for s in samples if variable in s]
+        if len(values) >= 2:
+            score = max(score, (max(values) - min(values)) / threshold)
+    return score
+
+
+def build_quadtree(samples, lat_range=LAT_RANGE, lon_range=LON_RANGE,
+                   coarse_step=COARSE_STEP, min_step=MIN_STEP):
+    """
+    Leaf cells (lat_min, lon_min, size) of the adaptive quadtree.
+
+    A cell's score comes from the snapshot samples it contains; a child with
+    too few samples of its own inherits half its parent's score (a linear
+    field varies half as much over half the distance).
+    """
+    index = SampleIndex(samples)
+    leaves = []
+    stack = []
+    rows = int(round((lat_range[1] - lat_range[0]) / coarse_step))
+    cols = int(round((lon_range[1] - lon_range[0]) / coarse_step))
+    for row in range(rows):
+        for col in range(cols):
+            stack.append((lat_range[0] + row * coarse_step, lon_range[0] + col * coarse_step, coarse_step, 0.0))
+
+    while stack:
+        lat_min, lon_min, size, parent_score = stack.pop()
+        score = cell_score(index.within(lat_min, lon_min, size))
+        if score is None:
+            score = parent_score / 2
+        if score > 1.0 and size / 2 >= min_step - 1e-9:
+            half = size / 2
+            for d_lat in (0.0, half):
+                for d_lon in (0.0, half):
+                    stack.append((lat_min + d_lat, lon_min + d_lon, half, score))
+        else:
+            leaves.append((lat_min, lon_min, size))
+    leaves.sort()
+    return leaves
+
+
+def leaf_points(leaves):
+    """Unique corner points of the leaf cells with the finest step each one serves"""
+    steps = {}
+    for lat_min, lon_min, size in leaves:
+        for lat in (lat_min, lat_min + size):
+            for lon in (lon_min, lon_min + size):
+                key = _key(lat, lon)
+                steps[key] = min(steps.get(key, size), size)
+    return sorted(steps.items())
+
+
+def generate_adaptive_grid(snapshot_file='grid_weather_data_1degree.json'):
+    """gridData-style dict for the adaptive grid built from the last snapshot"""
+    samples = snapshot_samples(load_snapshot(snapshot_file))
+    if not samples:
+        print(f"⚠️  No snapshot samples in {snapshot_file}; the adaptive grid stays at {COARSE_STEP}°")
+    leaves = build_quadtree(samples)
+    points = leaf_points(leaves)
+    uniform_points = ((int(round((LAT_RANGE[1] - LAT_RANGE[0]) / MIN_STEP)) + 1) *
+                      (int(round((LON_RANGE[1] - LON_RANGE[0]) / MIN_STEP)) + 1))
+    return {
+        "latitude": ",".join(f"{lat:.4f}" for (lat, _), _ in points),
+        "longitude": ",".join(f"{lon:.4f}" for (_, lon), _ in points),
+        "grid_size": COARSE_STEP,
+        "min_grid_size": MIN_STEP,
+        "total_points": len(points),
+        "uniform_min_grid_points": uniform_points,
+        "description": (f"Adaptive quadtree grid covering Indonesia ({LAT_RANGE[0]:g} to {LAT_RANGE[1]:g} lat, "
+                        f"{LON_RANGE[0]:g} to {LON_RANGE[1]:g} lon), {COARSE_STEP:g} to {MIN_STEP:g} degree"),
+        "adaptive": True,
+        "point_steps": ",".join(f"{step:g}" for _, step in points),
+        "cells": [[lat, lon, size] for lat, lon, size in leaves],
+    }
+
+
+class AdaptiveGrid:
+    """Spatial index over the quadtree leaves of an adaptive grid file"""
+
+    def __init__(self, grid_data):
+        self.coarse_step = grid_data['grid_size']
+        self.lat0 = min(cell[0] for cell in grid_data['cells'])
+        self.lon0 = min(cell[1] for cell in grid_data['cells'])
+        # Coarse cell -> its leaves (at most (coarse/min)^2 of them)
+        self.coarse_cells = {}
+        for lat_min, lon_min, size in grid_data['cells']:
+            self.coarse_cells.setdefault(self._coarse_key(lat_min + size / 2, lon_min + size / 2), []).append(
+                (lat_min, lon_min, size))
+
+    @classmethod
+    def load(cls, filename=ADAPTIVE_GRID_FILE):
+        with open(filename, 'r', encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def _coarse_key(self, lat, lon):
+        return (math.floor((lat - self.lat0) / self.coarse_step),
+                math.floor((lon - self.lon0) / self.coarse_step))
+
+    def locate(self, lat, lon):
+        """Leaf cell (lat_min, lon_min, size) containing lat/lon, or None outside the grid"""
+        for lat_min, lon_min, size in self.coarse_cells.get(self._coarse_key(lat, lon), ()):
+            if lat_min <= lat <= lat_min + size and lon_min <= lon <= lon_min + size:
+                return lat_min, lon_min, size
+        return None
+
+    def corners(self, lat, lon):
+        """The four grid points of the leaf cell containing lat/lon (for interpolation)"""
+        cell = self.locate(lat, lon)
+        if cell is None:
+            return []
+        lat_min, lon_min, size = cell
+        return [(lat_min, lon_min), (lat_min, lon_min + size),
+                (lat_min + size, lon_min), (lat_min + size, lon_min + size)]
+
+    def resolution_counts(self):
+        counts = {}
+        for leaves in self.coarse_cells.values():
+            for _, _, size in leaves:
+                counts[size] = counts.get(size, 0) + 1
+        return dict(sorted(counts.items(), reverse=True))
+
+
+def main(snapshot_file=None):
+    """Build gridData_adaptive.json from the last grid snapshot"""
+    arguments = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    snapshot_file = snapshot_file or (arguments[0] if arguments else 'grid_weather_data_1degree.json')
+    print("Generating adaptive quadtree grid for Indonesia...")
+    grid_data = generate_adaptive_grid(snapshot_file)
+
+    with open(ADAPTIVE_GRID_FILE, 'w', encoding='utf-8') as f:
+        json.dump(grid_data, f, indent=2)
+
+    grid = AdaptiveGrid(grid_data)
+    levels = ", ".join(f"{size:g}°: {count}" for size, count in grid.resolution_counts().items())
+    saved = 1 - grid_data['total_points'] / grid_data['uniform_min_grid_points']
+    print(f"Leaf cells: {len(grid_data['cells'])} ({levels})")
+    print(f"Generated {grid_data['total_points']} grid points "
+          f"vs {grid_data['uniform_min_grid_points']} for a uniform {MIN_STEP:g}° grid ({saved:.0%} fewer)")
+    print(f"Saved to: {ADAPTIVE_GRID_FILE}")
+
+
+if __name__ == "__main__":
+    main()
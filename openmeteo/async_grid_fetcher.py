@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Grid Weather Fetch Engine
+Keeps several Open-Meteo batches in flight under a token-bucket rate limiter
+that tracks the per-minute, per-hour and per-day API quotas
+"""
+
+import asyncio
+import math
+import re
+import time
+
+# Open-Meteo free tier quotas: (calls allowed, window in seconds)
+# Every location in a multi-location request counts as one API call
+OPENMETEO_RATE_LIMITS = {
+    'minute': (600, 60),
+    'hour': (5000, 3600),
+    'day': (10000, 86400),
+}
+
+# Requests with more than 10 variables count as several calls per location
+VARIABLES_PER_CALL = 10
+
+
+class TokenBucket:
+    """Token bucket that refills `capacity` tokens evenly over `period` seconds"""
+
+    def __init__(self, name, capacity, period):
+        self.name = name
+        self.capacity = float(capacity)
+        self.rate = capacity / float(period)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, cost, now):
+        """Seconds until `cost` tokens are available (0 if available now)"""
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def consume(self, cost):
+        self.tokens -= cost
+
+    def drain(self, now):
+        """Empty the bucket, e.g. after the server reported a rate limit"""
+        self._refill(now)
+        self.tokens = 0.0
+
+
+class RateLimiter:
+    """Combines one token bucket per quota window; all must allow a request"""
+
+    def __init__(self, limits=None):
+        limits = limits or OPENMETEO_RATE_LIMITS
+        self.buckets = [TokenBucket(name, capacity, period)
+                        for name, (capacity, period) in limits.items()]
+        self._lock = asyncio.Lock()
+        self.total_wait = 0.0
+
+    async def acquire(self, cost):
+        """Wait until every bucket can pay `cost` tokens, then pay them"""
+        # A single request may never cost more than the smallest bucket holds
+        cost = min(cost, min(bucket.capacity for bucket in self.buckets))
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = max(bucket.wait_time(cost, now) for bucket in self.buckets)
+                if wait <= 0:
+                    for bucket in self.buckets:
+                        bucket.consume(cost)
+                    return
+                self.total_wait += wait
+                await asyncio.sleep(wait)
+
+    def penalize(self, window='minute'):
+        """Drain the named bucket after the API rejected a request as rate limited"""
+        now = time.monotonic()
+        for bucket in self.buckets:
+            if bucket.name == window:
+                bucket.drain(now)
+
+    def status(self):
+        now = time.monotonic()
+        parts = []
+        for bucket in self.buckets:
+            bucket._refill(now)
+            parts.append(f"{bucket.name}: {bucket.tokens:.0f}/{bucket.capacity:.0f}")
+        return " | ".join(parts)
+
+
+def request_cost(params, location_count):
+    """Number of API calls Open-Meteo bills for one multi-location request"""
+    variable_count = 0
+    for block in ('current', 'hourly', 'daily', 'minutely_15'):
+        variables = params.get(block)
+        if variables:
+            variable_count += len(variables) if isinstance(variables, (list, tuple)) else 1
+    weight = max(1, math.ceil(variable_count / VARIABLES_PER_CALL))
+    return location_count * weight
+
+
+# Open-Meteo answers "Minutely/Hourly/Daily API request limit exceeded"
+RATE_LIMIT_PATTERN = re.compile(r'\b(?:minutely|hourly|daily) api request limit exceeded'
+                                r'|\brate limit|too many requests|\b429\b')
+
+
+def is_rate_limit_error(error):
+    """True for Open-Meteo quota errors and HTTP 429 responses"""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 429:
+        return True
+    return RATE_LIMIT_PATTERN.search(str(error).lower()) is not None
+
+
+def rate_limit_window(error):
+    """Which quota window an Open-Meteo rate limit error refers to"""
+    message = str(error).lower()
+    if 'daily' in message:
+        return 'day'
+    if 'hourly' in message:
+        return 'hour'
+    return 'minute'
+
+
+async def fetch_batches_async(locations, download_batch, decode_batch, params,
+                              batch_size=50, max_in_flight=4, max_retries=3,
+                              limiter=None):
+    """
+    Fetch `locations` in batches with up to `max_in_flight` downloads running.
+
+    `download_batch(batch)` performs the blocking HTTP request and runs in a
+    worker thread; `decode_batch(responses, batch)` runs on the event loop, so
+    one batch is decoded while the next ones are still downloading.
+    Returns (decoded, stats) where `decoded` holds one entry per batch in
+    input order: (batch_locations, decode_batch result), or None if the
+    batch failed.
+    """
+    if not locations:
+        return [], {'points': 0, 'elapsed': 0.0, 'points_per_second': 0.0, 'failed_batches': []}
+
+    limiter = limiter or RateLimiter()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    batches = [locations[i:i + batch_size] for i in range(0, len(locations), batch_size)]
+    total_batches = len(batches)
+    results = [None] * total_batches
+    failed_batches = []
+    done = 0
+    start_time = time.monotonic()
+
+    print(f"Processing {len(locations)} locations in {total_batches} batches of {batch_size} "
+          f"({max_in_flight} in flight)...")
+    print("=" * 60)
+
+    async def run_batch(index, batch):
+        nonlocal done
+        cost = request_cost(params, len(batch))
+        for attempt in range(max_retries):
+            await limiter.acquire(cost)
+            try:
+                async with semaphore:
+                    responses = await asyncio.to_thread(download_batch, batch)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    window = rate_limit_window(e)
+                    limiter.penalize(window)
+                    print(f"⏳ Rate limit ({window}) hit for batch {index + 1}, "
+                          f"retrying when quota allows (attempt {attempt + 1}/{max_retries})")
+                else:
+                    print(f"❌ Error in batch {index + 1} (attempt {attempt + 1}/{max_retries}): {e}")
+                continue
+
+            try:
+                decoded = decode_batch(responses, batch)
+            except Exception as e:
+                # Retrying would only get the same (cached) response back
+                print(f"❌ Could not decode batch {index + 1}: {e}")
+                break
+            results[index] = (batch, decoded)
+            done += 1
+            processed = sum(len(r[0]) for r in results if r)
+            elapsed = time.monotonic() - start_time
+            print(f"✅ Batch {index + 1}/{total_batches}: {len(batch)} locations "
+                  f"| {done}/{total_batches} done | {processed / elapsed:.1f} points/s")
+            return
+        else:
+            print(f"❌ Batch {index + 1} failed after {max_retries} attempts")
+        failed_batches.append(index)
+
+    await asyncio.gather(*(run_batch(i, batch) for i, batch in enumerate(batches)))
+
+    points = sum(len(r[0]) for r in results if r)
+    elapsed = time.monotonic() - start_time
+    stats = {
+        'points': points,
+        'elapsed': elapsed,
+        'points_per_second': points / elapsed if elapsed > 0 else 0.0,
+        'rate_limit_wait': limiter.total_wait,
+        'failed_batches': sorted(failed_batches),
+    }
+
+    print("\n" + "=" * 60)
+    print(f"🎉 Completed {total_batches - len(failed_batches)}/{total_batches} batches in {elapsed:.1f} seconds")
+    print(f"📊 Total locations processed: {points}/{len(locations)}")
+    print(f"🚀 Throughput: {stats['points_per_second']:.1f} points/s "
+          f"(waited {limiter.total_wait:.1f}s on rate limits)")
+    print(f"🪣 Remaining quota: {limiter.status()}")
+    return results, stats
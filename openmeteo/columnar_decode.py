@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Columnar decoding of Open-Meteo FlatBuffers responses
+Turns a whole batch of responses into struct-of-arrays NumPy columns
+(latitude, longitude, elevation and one array per variable); dicts are only
+built at the output edge by columns_to_records
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from weather_variables import get_variable_set, integer_variables, variable_dtype
+
+# Accessor of each block on a WeatherApiResponse
+BLOCK_ACCESSORS = {
+    'current': 'Current',
+    'hourly': 'Hourly',
+    'daily': 'Daily',
+}
+
+
+def _decode_timezone(response):
+    """Timezone name of a response as text (the SDK returns bytes)"""
+    timezone = response.Timezone()
+    if timezone is None:
+        return None
+    if isinstance(timezone, bytes):
+        return timezone.decode('utf-8')
+    return str(timezone)
+
+
+def _decode_current(blocks, names):
+    """
+    Scalar block: one (locations x variables) matrix filled row by row.
+
+    Variables are positional in request order, so the only per-value work is
+    the FlatBuffers accessor itself; there is no per-variable code path.
+    """
+    count = len(blocks)
+    width = len(names)
+    times = np.zeros(count, dtype=np.int64)
+    values = np.full((count, width), np.nan, dtype=np.float32)
+    for i, block in enumerate(blocks):
+        if block is None:
+            continue
+        times[i] = block.Time()
+        available = min(block.VariablesLength(), width)
+        if available:
+            variables = block.Variables
+            values[i, :available] = [variables(j).Value() for j in range(available)]
+    return {
+        'time': times,
+        'variables': {name: values[:, j] for j, name in enumerate(names)},
+    }
+
+
+def _decode_series(blocks, names, block_name):
+    """
+    Time-series block (hourly/daily): one (locations x steps) array per
+    variable, copied with ValuesAsNumpy so no Python work is done per step.
+    """
+    first = next((block for block in blocks if block is not None), None)
+    if first is None:
+        return None
+    interval = first.Interval()
+    steps = (first.TimeEnd() - first.Time()) // interval if interval else 0
+    times = first.Time() + np.arange(steps, dtype=np.int64) * interval
+
+    arrays = {}
+    for j, name in enumerate(names):
+        is_int64 = variable_dtype(block_name, name) == 'int64'
+        column = np.zeros((len(blocks), steps), dtype=np.int64) if is_int64 \
+            else np.full((len(blocks), steps), np.nan, dtype=np.float32)
+        arrays[name] = column
+        for i, block in enumerate(blocks):
+            if block is None or j >= block.VariablesLength():
+                continue
+            variable = block.Variables(j)
+            series = variable.ValuesInt64AsNumpy() if is_int64 else variable.ValuesAsNumpy()
+            if isinstance(series, np.ndarray):
+                column[i, :min(steps, series.shape[0])] = series[:steps]
+    return {
+        'time': times,
+        'interval': int(interval),
+        'variables': arrays,
+    }
+
+
+def decode_batch(responses, variable_set):
+    """
+    Decode every block of `variable_set` for a batch of responses.
+
+    Returns a dict of columns: latitude/longitude/elevation (one entry per
+    location), timezone/utc_offset_seconds (shared by the request) and one
+    entry per requested block. Missing float values are NaN.
+    """
+    variable_set = get_variable_set(variable_set)
+    count = len(responses)
+
+    coordinates = np.empty((count, 3), dtype=np.float32)
+    for i, response in enumerate(responses):
+        coordinates[i] = (response.Latitude(), response.Longitude(), response.Elevation())
+
+    # Timezone and offset are identical for every location of one request
+    first = responses[0] if count else None
+    columns = {
+        'latitude': coordinates[:, 0],
+        'longitude': coordinates[:, 1],
+        'elevation': coordinates[:, 2],
+        'timezone': _decode_timezone(first) if first is not None else None,
+        'utc_offset_seconds': int(first.UtcOffsetSeconds()) if first is not None else None,
+    }
+
+    for block_name, names in variable_set.items():
+        if not names:
+            continue
+        accessor = BLOCK_ACCESSORS[block_name]
+        blocks = [getattr(response, accessor)() for response in responses]
+        if block_name == 'current':
+            columns[block_name] = _decode_current(blocks, names)
+        else:
+            columns[block_name] = _decode_series(blocks, names, block_name)
+    return columns
+
+
+def decode_current_batch(responses, variables):
+    """Decode only the `current` block for the given variable names"""
+    return decode_batch(responses, {'current': list(variables)})
+
+
+def _series_axis(batch, block_name):
+    block = batch.get(block_name)
+    if block is None:
+        return None
+    times = block['time']
+    return len(times), int(times[0]) if len(times) else None, block.get('interval')
+
+
+def mergeable_batches(batches):
+    """
+    Which decoded batches concat_columns keeps: non-empty ones whose series
+    blocks (hourly/daily) have the same time axis as the first kept batch.
+    A batch fetched after the model run rolled over is left out (its
+    locations count as failed) instead of breaking np.concatenate.
+    """
+    keep = []
+    reference = None
+    for batch in batches:
+        if batch is None or not len(batch['latitude']):
+            keep.append(False)
+            continue
+        axes = {name: _series_axis(batch, name) for name in BLOCK_ACCESSORS if name != 'current'}
+        if reference is None:
+            reference = axes
+        elif axes != reference:
+            print(f"⚠️  Dropping a batch of {len(batch['latitude'])} locations: "
+                  f"its time axis differs from the first batch")
+            keep.append(False)
+            continue
+        keep.append(True)
+    return keep
+
+
+def concat_decoded(entries):
+    """
+    Concatenate (locations, columns) pairs of decoded batches; failed
+    entries may be None. Returns (columns, locations) with the locations of
+    exactly the rows that were concatenated, or (None, []).
+    """
+    entries = [entry for entry in entries if entry]
+    keep = mergeable_batches([batch_columns for _, batch_columns in entries])
+    kept = [entry for entry, use in zip(entries, keep) if use]
+    # A batch with fewer responses than locations only has its answered rows
+    locations = [location for batch, batch_columns in kept
+                 for location in batch[:len(batch_columns['latitude'])]]
+    return concat_columns([batch_columns for _, batch_columns in kept]), locations
+
+
+def concat_columns(batches):
+    """Concatenate several decoded batches into one set of columns"""
+    batches = [batch for batch, use in zip(batches, mergeable_batches(batches)) if use]
+    if not batches:
+        return None
+    first = batches[0]
+    columns = {
+        'latitude': np.concatenate([b['latitude'] for b in batches]),
+        'longitude': np.concatenate([b['longitude'] for b in batches]),
+        'elevation': np.concatenate([b['elevation'] for b in batches]),
+        'timezone': first['timezone'],
+        'utc_offset_seconds': first['utc_offset_seconds'],
+    }
+    for block_name in BLOCK_ACCESSORS:
+        if first.get(block_name) is None:
+            continue
+        block = first[block_name]
+        merged = {
+            'variables': {name: np.concatenate([b[block_name]['variables'][name] for b in batches])
+                          for name in block['variables']},
+        }
+        if block_name == 'current':
+            merged['time'] = np.concatenate([b[block_name]['time'] for b in batches])
+        else:
+            merged['time'] = block['time']
+            merged['interval'] = block['interval']
+        columns[block_name] = merged
+    return columns
+
+
+def _column_to_list(column, as_int=False):
+    """Convert a column to Python values with NaN mapped to None"""
+    if column.dtype.kind in 'iu':
+        return column.tolist()
+    missing = np.isnan(column)
+    if as_int:
+        values = np.where(missing, 0, column).astype(np.int64).tolist()
+    else:
+        values = column.tolist()
+    if missing.any():
+        for i in np.flatnonzero(missing).tolist():
+            values[i] = None
+    return values
+
+
+def columns_to_records(columns, locations, fetched_at=None):
+    """
+    Build the per-location dicts stored in the JSON snapshots.
+
+    This is the output edge: the only place a dict per location is created.
+    Only the `current` block is emitted; series blocks are stored as arrays
+    (see forecast_cube.py).
+    """
+    count = min(len(columns['latitude']), len(locations))
+    fetched_at = fetched_at or datetime.now().isoformat()
+
+    latitudes = columns['latitude'][:count].tolist()
+    longitudes = columns['longitude'][:count].tolist()
+    elevations = columns['elevation'][:count].tolist()
+
+    current = columns.get('current') or {'time': np.zeros(count, dtype=np.int64), 'variables': {}}
+    times = current['time'][:count].tolist()
+    as_int = set(integer_variables('current', current['variables']))
+    variable_lists = {
+        name: _column_to_list(column[:count], as_int=name in as_int)
+        for name, column in current['variables'].items()
+    }
+    timezone = columns['timezone']
+    utc_offset_seconds = columns['utc_offset_seconds']
+
+    records = []
+    for i in range(count):
+        location = locations[i]
+        weather_data = {name: values[i] for name, values in variable_lists.items()}
+        weather_data['timestamp'] = times[i]
+        weather_data['timezone'] = timezone
+        weather_data['utc_offset_seconds'] = utc_offset_seconds
+        weather_data['fetched_at'] = fetched_at
+        records.append({
+            'name': location['name'],
+            'lat': location['lat'],
+            'lon': location['lon'],
+            'coordinates': {
+                'latitude': latitudes[i],
+                'longitude': longitudes[i],
+                'elevation': elevations[i]
+            },
+            'weather_data': weather_data
+        })
+    return records
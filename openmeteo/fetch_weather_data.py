@@ -4,18 +4,38 @@ OpenMeteo Grid Weather Data Fetcher
 Downloads weather data for grid locations using official OpenMeteo Python client
 """
 
+import asyncio
 import json
-import time
-from datetime import datetime
 import os
+import sys
 import openmeteo_requests
 import requests_cache
 from retry_requests import retry
 
-def load_grid_coordinates():
-    """Load grid coordinates from gridData_1degree.json for higher resolution"""
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adaptive_grid import ADAPTIVE_GRID_FILE, ADAPTIVE_LAYER, ADAPTIVE_WEATHER_FILE, COARSE_STEP
+from async_grid_fetcher import fetch_batches_async
+from columnar_decode import decode_batch, concat_decoded, columns_to_records
+from grid_raster import write_grid_raster
+from grid_refresh import describe_plan, load_snapshot, merge_grid_records, plan_grid_refresh
+from precompress import write_compressed_sidecars
+from heatmap_tiles import ADAPTIVE_HEATMAP_DIRECTORY, write_heatmap_tiles
+from json_writer import write_json
+from timeseries_store import GRID, append_records
+from tile_pyramid import write_layer_tiles
+from weather_variables import build_params
+
+def grid_point_name(lat, lon):
+    """'-6.0, 106.0' on the 1-degree lattice, two decimals for refined points"""
+    decimals = 1 if round(lat * 10, 6).is_integer() and round(lon * 10, 6).is_integer() else 2
+    return f"{lat:.{decimals}f}, {lon:.{decimals}f}"
+
+def load_grid_coordinates(filename='gridData_1degree.json'):
+    """Load grid coordinates from gridData_1degree.json (or an adaptive grid file)"""
     try:
-        with open('gridData_1degree.json', 'r', encoding='utf-8') as file:
+        with open(filename, 'r', encoding='utf-8') as file:
             content = file.read()
             
             # Find the JSON part (remove any extra content)
@@ -49,15 +69,16 @@ def load_grid_coordinates():
         grid_points = []
         for i in range(len(latitudes)):
             grid_points.append({
-                'name': f"{latitudes[i]:.1f}, {longitudes[i]:.1f}",
+                'name': grid_point_name(latitudes[i], longitudes[i]),
                 'lat': latitudes[i],
                 'lon': longitudes[i]
             })
         
-        print(f"Loaded {len(grid_points)} grid points from gridData_1degree.json (1-degree resolution)")
+        resolution = "adaptive resolution" if grid_data.get('adaptive') else f"{grid_data.get('grid_size', 1)}-degree resolution"
+        print(f"Loaded {len(grid_points)} grid points from {filename} ({resolution})")
         return grid_points
     except Exception as e:
-        print(f"Error loading 1-degree grid coordinates: {e}")
+        print(f"Error loading grid coordinates from {filename}: {e}")
         print("Creating fallback 1-degree grid data...")
         # Fallback: create a 1-degree grid for Indonesia
         grid_points = []
@@ -79,90 +100,36 @@ def setup_openmeteo_client():
     openmeteo = openmeteo_requests.Client(session=retry_session)
     return openmeteo
 
+GRID_API_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Variables requested for the grid layer (see weather_variables.VARIABLE_SETS)
+GRID_VARIABLE_SET = 'grid'
+
+def build_weather_params(locations, variable_set=GRID_VARIABLE_SET):
+    """Build Open-Meteo request parameters for a list of locations"""
+    return build_params(variable_set, locations)
+
+def download_weather_responses(openmeteo_client, locations, variable_set=GRID_VARIABLE_SET):
+    """Perform the (blocking) Open-Meteo request for a batch of locations"""
+    return openmeteo_client.weather_api(GRID_API_URL, params=build_weather_params(locations, variable_set))
+
+def decode_weather_responses(responses, locations, variable_set=GRID_VARIABLE_SET):
+    """Decode a batch of Open-Meteo responses into NumPy columns"""
+    return decode_batch(responses[:len(locations)], variable_set)
+
+def process_weather_responses(responses, locations):
+    """Convert Open-Meteo responses into location dicts"""
+    return columns_to_records(decode_weather_responses(responses, locations), locations)
+
 def fetch_weather_data(openmeteo_client, locations):
     """Fetch weather data using OpenMeteo client"""
     if not locations:
         return []
     
-    # Prepare coordinates for API call
-    lats = [loc['lat'] for loc in locations]
-    lons = [loc['lon'] for loc in locations]
-    
-    # API parameters
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lats,
-        "longitude": lons,
-        "current": ["temperature_2m", "relative_humidity_2m", "weather_code", "wind_speed_10m", "wind_direction_10m"],
-        "timezone": "Asia/Jakarta"
-    }
-    
     try:
         print(f"Fetching weather data for {len(locations)} locations...")
-        responses = openmeteo_client.weather_api(url, params=params)
-        
-        processed_data = []
-        
-        for i, response in enumerate(responses):
-            if i < len(locations):
-                location = locations[i]
-                
-                # Get current weather data
-                current = response.Current()
-                
-                # Extract current weather variables using positional access
-                # Variables are returned in the same order as requested in params
-                current_vars = {}
-                
-                if current.VariablesLength() > 0:
-                    # temperature_2m (first variable)
-                    if current.VariablesLength() > 0:
-                        temp_var = current.Variables(0)
-                        current_vars['temperature_2m'] = temp_var.Value()
-                    
-                    # relative_humidity_2m (second variable)
-                    if current.VariablesLength() > 1:
-                        humidity_var = current.Variables(1)
-                        current_vars['relative_humidity_2m'] = humidity_var.Value()
-                    
-                    # weather_code (third variable)
-                    if current.VariablesLength() > 2:
-                        weather_var = current.Variables(2)
-                        current_vars['weather_code'] = weather_var.Value()
-                    
-                    # wind_speed_10m (fourth variable)
-                    if current.VariablesLength() > 3:
-                        wind_speed_var = current.Variables(3)
-                        current_vars['wind_speed_10m'] = wind_speed_var.Value()
-                    
-                    # wind_direction_10m (fifth variable)
-                    if current.VariablesLength() > 4:
-                        wind_dir_var = current.Variables(4)
-                        current_vars['wind_direction_10m'] = wind_dir_var.Value()
-                
-                processed_location = {
-                    'name': location['name'],
-                    'lat': location['lat'],
-                    'lon': location['lon'],
-                    'coordinates': {
-                        'latitude': float(response.Latitude()),
-                        'longitude': float(response.Longitude()),
-                        'elevation': float(response.Elevation())
-                    },
-                    'weather_data': {
-                        'temperature_2m': float(current_vars.get('temperature_2m')) if current_vars.get('temperature_2m') is not None else None,
-                        'relative_humidity_2m': float(current_vars.get('relative_humidity_2m')) if current_vars.get('relative_humidity_2m') is not None else None,
-                        'weather_code': int(current_vars.get('weather_code')) if current_vars.get('weather_code') is not None else None,
-                        'wind_speed_10m': float(current_vars.get('wind_speed_10m')) if current_vars.get('wind_speed_10m') is not None else None,
-                        'wind_direction_10m': float(current_vars.get('wind_direction_10m')) if current_vars.get('wind_direction_10m') is not None else None,
-                        'timestamp': int(current.Time()) if current.Time() is not None else None,
-                        'timezone': str(response.Timezone()).replace("b'", "").replace("'", "") if response.Timezone() is not None else None,
-                        'utc_offset_seconds': int(response.UtcOffsetSeconds()) if response.UtcOffsetSeconds() is not None else None,
-                        'fetched_at': datetime.now().isoformat()
-                    }
-                }
-                
-                processed_data.append(processed_location)
+        responses = download_weather_responses(openmeteo_client, locations)
+        processed_data = process_weather_responses(responses, locations)
         
         print(f"Successfully processed {len(processed_data)} locations")
         return processed_data
@@ -171,86 +138,93 @@ def fetch_weather_data(openmeteo_client, locations):
         print(f"Error fetching weather data: {e}")
         return []
 
-def fetch_weather_data_batched(openmeteo_client, locations, batch_size=50):
-    """Fetch weather data in batches to avoid URL length limits"""
+def fetch_weather_columns_batched(openmeteo_client, locations, batch_size=50, max_in_flight=4,
+                                  variable_set=GRID_VARIABLE_SET):
+    """Fetch weather data in concurrent batches; returns (columns, fetched_locations)"""
     if not locations:
-        return []
+        return None, []
     
-    total_batches = (len(locations) + batch_size - 1) // batch_size
+    decoded, stats = asyncio.run(fetch_batches_async(
+        locations,
+        download_batch=lambda batch: download_weather_responses(openmeteo_client, batch, variable_set),
+        decode_batch=lambda responses, batch: decode_weather_responses(responses, batch, variable_set),
+        params=build_weather_params(locations[:1], variable_set),
+        batch_size=batch_size,
+        max_in_flight=max_in_flight
+    ))
     
-    print(f"Processing {len(locations)} locations in batches of {batch_size}...")
-    print(f"Total batches: {total_batches}")
-    print(f"Estimated time: {total_batches * 10} seconds (with delays)")
-    print("=" * 60)
-    
-    all_processed_data = []
-    start_time = time.time()
+    # Locations of exactly the concatenated rows, so records stay aligned
+    return concat_decoded(decoded)
+
+def fetch_weather_data_batched(openmeteo_client, locations, batch_size=50, max_in_flight=4,
+                               variable_set=GRID_VARIABLE_SET):
+    """Fetch weather data in concurrent batches paced by the API rate limits"""
+    if not locations:
+        return []
     
-    for batch_num in range(total_batches):
-        batch_start_time = time.time()
-        start_idx = batch_num * batch_size
-        end_idx = min(start_idx + batch_size, len(locations))
-        batch_locations = locations[start_idx:end_idx]
-        
-        print(f"\nBatch {batch_num + 1}/{total_batches} ({len(batch_locations)} locations)...")
-        
-        # Retry logic for failed batches
-        max_retries = 3
-        retry_delay = 60  # Start with 60 seconds delay
-        
-        for retry in range(max_retries):
-            try:
-                batch_data = fetch_weather_data(openmeteo_client, batch_locations)
-                if batch_data:
-                    all_processed_data.extend(batch_data)
-                    batch_time = time.time() - batch_start_time
-                    total_time = time.time() - start_time
-                    avg_time_per_batch = total_time / (batch_num + 1)
-                    remaining_batches = total_batches - (batch_num + 1)
-                    eta = remaining_batches * avg_time_per_batch
-                    
-                    print(f"✅ Batch {batch_num + 1} completed: {len(batch_data)} locations processed")
-                    print(f"   Batch time: {batch_time:.1f}s | Total time: {total_time:.1f}s | ETA: {eta:.1f}s")
-                    break
-                else:
-                    print(f"❌ Batch {batch_num + 1} failed (attempt {retry + 1}/{max_retries})")
-            except Exception as e:
-                error_msg = str(e)
-                if "rate limit" in error_msg.lower() or "minutely" in error_msg.lower():
-                    print(f"⏳ Rate limit hit for batch {batch_num + 1}. Waiting {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                else:
-                    print(f"❌ Error in batch {batch_num + 1}: {e}")
-                
-                if retry == max_retries - 1:
-                    print(f"❌ Batch {batch_num + 1} failed after {max_retries} attempts")
-                continue
-        
-        # Wait between batches to be respectful to the API
-        if batch_num < total_batches - 1:
-            wait_time = 5  # Increased delay between batches
-            print(f"⏸️  Waiting {wait_time} seconds before next batch...")
-            time.sleep(wait_time)
+    columns, fetched_locations = fetch_weather_columns_batched(
+        openmeteo_client, locations, batch_size=batch_size, max_in_flight=max_in_flight,
+        variable_set=variable_set)
+    processed_data = columns_to_records(columns, fetched_locations) if columns else []
     
-    total_time = time.time() - start_time
-    print(f"\n" + "=" * 60)
-    print(f"🎉 Completed all batches in {total_time:.1f} seconds!")
-    print(f"📊 Total locations processed: {len(all_processed_data)}/{len(locations)}")
-    print(f"📈 Success rate: {(len(all_processed_data)/len(locations)*100):.1f}%")
-    return all_processed_data
+    print(f"📈 Success rate: {(len(processed_data)/len(locations)*100):.1f}%")
+    return processed_data
 
-def save_weather_data(data, filename):
-    """Save weather data to JSON file"""
+def save_weather_data(data, filename, raster_filename=None):
+    """Save weather data to JSON file, and optionally as a packed binary raster"""
     try:
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2, ensure_ascii=False)
-        
-        file_size = len(json.dumps(data)) / 1024 / 1024
+        # Streamed to a temp file and renamed: incremental refreshes build on this snapshot
+        file_size = write_json(filename, data) / 1024 / 1024
         print(f"Saved {len(data)} locations to {filename} ({file_size:.1f} MB)")
+        write_compressed_sidecars(filename)
         
     except Exception as e:
         print(f"Error saving data to {filename}: {e}")
+    
+    # Keep every fetched value: the JSON file only holds the latest one
+    append_records(GRID, data)
+    
+    if raster_filename:
+        try:
+            raster_size = write_grid_raster(data, raster_filename)
+            print(f"Saved binary raster to {raster_filename} ({raster_size / 1024:.1f} KB)")
+            write_compressed_sidecars(raster_filename)
+        except Exception as e:
+            print(f"Error saving raster to {raster_filename}: {e}")
+
+def refresh_grid_weather(openmeteo_client, grid_points, filename='grid_weather_data_1degree.json',
+                         raster_filename='grid_weather_data_1degree.bin', full=False, adaptive=False):
+    """
+    Refetch only the stale, failed or new cells of the grid snapshot and merge
+    them into it (everything when `full`). Returns the merged records, or
+    None if nothing was written. `adaptive` grids mix 1° and 0.25° cells, so
+    they get their own tile layer and an IDW heatmap instead of the bilinear one.
+    """
+    snapshot = [] if full else load_snapshot(filename)
+    plan = plan_grid_refresh(grid_points, snapshot)
+    print(f"🧭 Refresh plan: {describe_plan(plan)}")
+    if not plan['to_fetch']:
+        print("Grid weather data is fresh; nothing to fetch")
+        return None
+    
+    fetched = fetch_weather_data_batched(openmeteo_client, plan['to_fetch'])
+    if not fetched:
+        print("Failed to fetch grid weather data; keeping the existing snapshot")
+        return None
+    
+    merged = merge_grid_records(grid_points, snapshot, fetched)
+    still_missing = len(plan['to_fetch']) - len(fetched)
+    print(f"Merged {len(fetched)} refreshed cells into {len(merged)} grid cells"
+          + (f" ({still_missing} cells left for the next run)" if still_missing else ""))
+    save_weather_data(merged, filename, raster_filename=raster_filename)
+    if adaptive:
+        write_layer_tiles(ADAPTIVE_LAYER, filename)
+        write_heatmap_tiles('temperature_2m', filename, method='idw', radius_step=COARSE_STEP,
+                            output_directory=ADAPTIVE_HEATMAP_DIRECTORY)
+    else:
+        write_layer_tiles('grid', filename)
+        write_heatmap_tiles('temperature_2m', filename)
+    return merged
 
 def main():
     """Main function to fetch and save grid weather data"""
@@ -265,18 +239,25 @@ def main():
     
     # Fetch 1-degree grid weather data
     print("\nFetching 1-degree grid weather data...")
-    grid_points = load_grid_coordinates()
+    # --adaptive uses the quadtree grid written by adaptive_grid.py and keeps
+    # its own snapshot (no raster: that format holds a single regular lattice)
+    adaptive = '--adaptive' in sys.argv[1:]
+    grid_points = load_grid_coordinates(ADAPTIVE_GRID_FILE if adaptive else 'gridData_1degree.json')
     
     if grid_points:
-        grid_weather_data = fetch_weather_data_batched(openmeteo_client, grid_points)
-        if grid_weather_data:
-            save_weather_data(grid_weather_data, 'grid_weather_data_1degree.json')
+        # Only stale cells are refetched; pass --full to download the whole grid
+        if adaptive:
+            refresh_grid_weather(openmeteo_client, grid_points, ADAPTIVE_WEATHER_FILE, raster_filename=None,
+                                 full='--full' in sys.argv[1:], adaptive=True)
         else:
-            print("Failed to fetch grid weather data")
+            refresh_grid_weather(openmeteo_client, grid_points, full='--full' in sys.argv[1:])
     
     print("\nGrid weather data collection complete!")
     print("Files saved in openmeteo folder:")
     print("- grid_weather_data_1degree.json (1-degree resolution)")
+    print("- grid_weather_data_1degree.bin (packed binary raster, see grid_raster.py)")
+    print("- ../tiles/grid/ (marker tile pyramid, see tile_pyramid.py)")
+    print("- ../tiles/heatmap/temperature_2m/ (heatmap PNG tiles, see heatmap_tiles.py)")
     print("\nCache stored in .cache folder for faster subsequent requests")
     print("\nNote: City weather data is now handled by update_city_weather.py")
 
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Hourly Forecast Cube for the Grid
+Requests hourly variables for every grid point and stores each variable as a
+dense float32 cube (time x lat x lon) in its own .npy file, next to a small
+JSON header. Readers memory-map the files, so a time slider or a point query
+only touches the hour or cell it needs.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Add current directory to path to import local modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from async_grid_fetcher import fetch_batches_async
+from columnar_decode import decode_batch, concat_decoded
+from weather_variables import build_params, get_variable_set, VARIABLE_REGISTRY
+
+FORECAST_VARIABLE_SET = 'forecast'
+FORECAST_DAYS = 7
+CUBE_DIRECTORY = 'forecast_cube'
+HEADER_FILENAME = 'header.json'
+CUBE_FORMAT_VERSION = 1
+
+
+def lattice_axes(points):
+    """Sorted unique latitudes/longitudes of a regular lattice and its step"""
+    lats = np.unique(np.round([p['lat'] for p in points], 6))
+    lons = np.unique(np.round([p['lon'] for p in points], 6))
+    diffs = np.concatenate([np.diff(lats), np.diff(lons)])
+    step = float(diffs.min()) if diffs.size else 1.0
+    return lats, lons, step
+
+
+def fetch_forecast_columns(openmeteo_client, grid_points, forecast_days=FORECAST_DAYS,
+                           batch_size=50, max_in_flight=4):
+    """Fetch the hourly forecast for the grid; returns (columns, fetched_points)"""
+    url = "https://api.open-meteo.com/v1/forecast"
+
+    def download(batch):
+        params = build_params(FORECAST_VARIABLE_SET, batch, timezone="GMT", forecast_days=forecast_days)
+        return openmeteo_client.weather_api(url, params=params)
+
+    def decode(responses, batch):
+        return decode_batch(responses[:len(batch)], FORECAST_VARIABLE_SET)
+
+    decoded, _ = asyncio.run(fetch_batches_async(
+        grid_points,
+        download_batch=download,
+        decode_batch=decode,
+        params=build_params(FORECAST_VARIABLE_SET, grid_points[:1], forecast_days=forecast_days),
+        batch_size=batch_size,
+        max_in_flight=max_in_flight
+    ))
+    # Points of exactly the concatenated rows, so the cube stays aligned
+    return concat_decoded(decoded)
+
+
+def save_forecast_cube(columns, points, directory=CUBE_DIRECTORY, lattice_points=None):
+    """
+    Scatter decoded hourly columns onto the lattice and write one
+    memory-mappable float32 .npy per variable plus header.json.
+    The lattice is taken from `lattice_points` (default: `points`);
+    cells that were not fetched are NaN.
+    """
+    hourly = columns['hourly']
+    lats, lons, step = lattice_axes(lattice_points or points)
+    rows = np.rint((np.array([p['lat'] for p in points]) - lats[0]) / step).astype(np.intp)
+    cols = np.rint((np.array([p['lon'] for p in points]) - lons[0]) / step).astype(np.intp)
+    times = hourly['time']
+    shape = (len(times), len(lats), len(lons))
+
+    os.makedirs(directory, exist_ok=True)
+    for name, values in hourly['variables'].items():
+        final_path = os.path.join(directory, f"{name}.npy")
+        temp_path = final_path + '.tmp'
+        cube = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.float32, shape=shape)
+        cube[:] = np.nan
+        # values is (locations x time); scatter every location's series at once
+        cube[:, rows, cols] = values.astype(np.float32).T
+        cube.flush()
+        del cube
+        os.replace(temp_path, final_path)
+
+    header = {
+        'format_version': CUBE_FORMAT_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        'dtype': 'float32',
+        'layout': 'time,lat,lon',
+        'shape': list(shape),
+        'bbox': {
+            'lat_min': float(lats[0]), 'lat_max': float(lats[-1]),
+            'lon_min': float(lons[0]), 'lon_max': float(lons[-1]),
+        },
+        'step': step,
+        'time_start': int(times[0]) if len(times) else None,
+        'time_interval': int(hourly['interval']),
+        'variables': {
+            name: {'file': f"{name}.npy", 'unit': VARIABLE_REGISTRY['hourly'][name]['unit']}
+            for name in hourly['variables']
+        },
+    }
+    header_path = os.path.join(directory, HEADER_FILENAME)
+    with open(header_path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(header, file, indent=2)
+    os.replace(header_path + '.tmp', header_path)
+
+    total_size = sum(os.path.getsize(os.path.join(directory, v['file'])) for v in header['variables'].values())
+    print(f"Saved forecast cube {shape} x {len(header['variables'])} variables to {directory}/ "
+          f"({total_size / 1024 / 1024:.1f} MB)")
+    return header
+
+
+class ForecastCube:
+    """Memory-mapped reader for a forecast cube directory"""
+
+    def __init__(self, directory=CUBE_DIRECTORY):
+        self.directory = directory
+        with open(os.path.join(directory, HEADER_FILENAME), 'r', encoding='utf-8') as file:
+            self.header = json.load(file)
+        self._arrays = {}
+
+    @property
+    def variables(self):
+        return list(self.header['variables'])
+
+    @property
+    def times(self):
+        count = self.header['shape'][0]
+        return self.header['time_start'] + np.arange(count, dtype=np.int64) * self.header['time_interval']
+
+    def array(self, variable):
+        """The whole cube of one variable as a read-only memory map"""
+        if variable not in self._arrays:
+            info = self.header['variables'][variable]
+            self._arrays[variable] = np.load(os.path.join(self.directory, info['file']), mmap_mode='r')
+        return self._arrays[variable]
+
+    def time_index(self, unix_time):
+        """Index of the hour containing `unix_time` (clamped to the cube)"""
+        index = (int(unix_time) - self.header['time_start']) // self.header['time_interval']
+        return int(min(max(index, 0), self.header['shape'][0] - 1))
+
+    def cell_index(self, lat, lon):
+        """(row, col) of the lattice cell nearest to lat/lon"""
+        bbox = self.header['bbox']
+        step = self.header['step']
+        row = int(round((lat - bbox['lat_min']) / step))
+        col = int(round((lon - bbox['lon_min']) / step))
+        if not (0 <= row < self.header['shape'][1] and 0 <= col < self.header['shape'][2]):
+            raise ValueError(f"Point {lat}, {lon} is outside the forecast grid")
+        return row, col
+
+    def hour(self, variable, index):
+        """One lat x lon field; only that slice is read from disk"""
+        return np.array(self.array(variable)[index])
+
+    def series(self, variable, lat, lon):
+        """Hourly series of the cell nearest to lat/lon"""
+        row, col = self.cell_index(lat, lon)
+        return np.array(self.array(variable)[:, row, col])
+
+
+def main():
+    """Fetch the hourly grid forecast and write the cube"""
+    from fetch_weather_data import load_grid_coordinates, setup_openmeteo_client
+
+    print("OpenMeteo Hourly Forecast Cube")
+    print("=" * 60)
+    variable_set = get_variable_set(FORECAST_VARIABLE_SET)
+    print(f"Variables: {', '.join(variable_set['hourly'])} | {FORECAST_DAYS} days")
+
+    openmeteo_client = setup_openmeteo_client()
+    grid_points = load_grid_coordinates()
+    columns, fetched_points = fetch_forecast_columns(openmeteo_client, grid_points)
+    if columns is None:
+        print("Failed to fetch forecast data")
+        return 1
+
+    header = save_forecast_cube(columns, fetched_points, lattice_points=grid_points)
+    start = datetime.fromtimestamp(header['time_start'], tz=timezone.utc)
+    print(f"Forecast starts {start.isoformat()} with {header['shape'][0]} hourly steps")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
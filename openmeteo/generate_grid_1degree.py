@@ -5,6 +5,7 @@ Creates a higher resolution grid than the current 3-degree spacing
 """
 
 import json
+import sys
 
 def generate_1degree_grid():
     """Generate 1-degree grid covering Indonesia"""
@@ -33,7 +34,12 @@ def generate_1degree_grid():
     return grid_data
 
 def main():
-    """Generate and save 1-degree grid data"""
+    """Generate and save 1-degree grid data (--adaptive: quadtree grid from the last snapshot)"""
+    if '--adaptive' in sys.argv[1:]:
+        from adaptive_grid import main as generate_adaptive
+        generate_adaptive()
+        return
+    
     print("Generating 1-degree grid for Indonesia...")
     
     grid_data = generate_1degree_grid()
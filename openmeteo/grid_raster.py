@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Packed Binary Raster Format for Grid Weather Data
+Stores each grid variable as a row-major float32/int16 raster behind a fixed
+header (bbox, step, variable names), so consumers can read a few KB without
+JSON parsing. Written next to grid_weather_data_1degree.json, which stays the
+compatibility format.
+
+Layout (little endian):
+    header   '<4sHHHHdddq'  magic b'WXGR', version, variable count, rows,
+                            cols, lat_max, lon_min, step, valid time (unix)
+    per var  '<32s4sff'     name (NUL padded), dtype ('f4' or 'i2'),
+                            scale, offset  -> value = raw * scale + offset
+    data     one rows x cols raster per variable in header order, row 0 is
+             the northernmost latitude; each raster starts 4-byte aligned
+Missing values are NaN (f4) or -32768 (i2).
+"""
+
+import os
+import struct
+
+import numpy as np
+
+RASTER_MAGIC = b'WXGR'
+RASTER_VERSION = 1
+HEADER_FORMAT = '<4sHHHHdddq'
+VARIABLE_FORMAT = '<32s4sff'
+INT16_MISSING = -32768
+
+# Variables packed as scaled int16 instead of float32: name -> (scale, offset)
+INT16_ENCODING = {
+    'temperature_2m': (0.01, 0.0),
+    'relative_humidity_2m': (1.0, 0.0),
+    'weather_code': (1.0, 0.0),
+    'wind_speed_10m': (0.1, 0.0),
+    'wind_direction_10m': (0.1, 0.0),
+    'wind_gusts_10m': (0.1, 0.0),
+    'precipitation': (0.01, 0.0),
+    'pressure_msl': (0.1, 0.0),
+    'cloud_cover': (1.0, 0.0),
+}
+
+# weather_data keys that are metadata, not raster variables
+NON_RASTER_KEYS = ('timestamp', 'timezone', 'utc_offset_seconds', 'fetched_at')
+
+
+def _lattice(records):
+    lats = np.array([r['lat'] for r in records], dtype=np.float64)
+    lons = np.array([r['lon'] for r in records], dtype=np.float64)
+    unique_lats = np.unique(np.round(lats, 6))
+    unique_lons = np.unique(np.round(lons, 6))
+    diffs = np.concatenate([np.diff(unique_lats), np.diff(unique_lons)])
+    step = float(diffs.min()) if diffs.size else 1.0
+    rows = int(round((unique_lats[-1] - unique_lats[0]) / step)) + 1
+    cols = int(round((unique_lons[-1] - unique_lons[0]) / step)) + 1
+    lat_max = float(unique_lats[-1])
+    lon_min = float(unique_lons[0])
+    row_index = np.rint((lat_max - lats) / step).astype(np.intp)
+    col_index = np.rint((lons - lon_min) / step).astype(np.intp)
+    return rows, cols, lat_max, lon_min, step, row_index, col_index
+
+
+def _raster_variables(records):
+    names = []
+    for record in records:
+        for key, value in (record.get('weather_data') or {}).items():
+            if key not in NON_RASTER_KEYS and key not in names and isinstance(value, (int, float)):
+                names.append(key)
+    return names
+
+
+def pack_grid_raster(records, variables=None):
+    """Pack grid records (as stored in the JSON snapshot) into raster bytes"""
+    rows, cols, lat_max, lon_min, step, row_index, col_index = _lattice(records)
+    variables = variables or _raster_variables(records)
+    timestamps = [r['weather_data'].get('timestamp') for r in records if r.get('weather_data')]
+    valid_time = max((t for t in timestamps if t is not None), default=0)
+
+    header = struct.pack(HEADER_FORMAT, RASTER_MAGIC, RASTER_VERSION, len(variables),
+                         rows, cols, lat_max, lon_min, step, int(valid_time))
+    descriptors = []
+    rasters = []
+    for name in variables:
+        values = np.array([
+            (r.get('weather_data') or {}).get(name) for r in records
+        ], dtype=np.float64)  # None becomes NaN
+        grid = np.full((rows, cols), np.nan, dtype=np.float64)
+        grid[row_index, col_index] = values
+
+        if name in INT16_ENCODING:
+            scale, offset = INT16_ENCODING[name]
+            raw = np.round((grid - offset) / scale)
+            raw = np.where(np.isnan(raw), INT16_MISSING, np.clip(raw, INT16_MISSING + 1, 32767))
+            data = raw.astype('<i2').tobytes()
+            descriptors.append(struct.pack(VARIABLE_FORMAT, name.encode('ascii'), b'i2', scale, offset))
+        else:
+            data = grid.astype('<f4').tobytes()
+            descriptors.append(struct.pack(VARIABLE_FORMAT, name.encode('ascii'), b'f4', 1.0, 0.0))
+        rasters.append(data)
+
+    parts = [header] + descriptors
+    offset = sum(len(p) for p in parts)
+    for data in rasters:
+        padding = (-offset) % 4
+        parts.append(b'\0' * padding)
+        parts.append(data)
+        offset += padding + len(data)
+    return b''.join(parts)
+
+
+def write_grid_raster(records, filename, variables=None):
+    """Write the raster file atomically next to the JSON snapshot"""
+    payload = pack_grid_raster(records, variables)
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as file:
+        file.write(payload)
+    os.replace(temp_filename, filename)
+    return len(payload)
+
+
+class GridRaster:
+    """Decoded raster file: header fields plus one 2D array per variable"""
+
+    def __init__(self, header, variables):
+        self.header = header
+        self.variables = variables
+
+    @property
+    def latitudes(self):
+        return self.header['lat_max'] - np.arange(self.header['rows']) * self.header['step']
+
+    @property
+    def longitudes(self):
+        return self.header['lon_min'] + np.arange(self.header['cols']) * self.header['step']
+
+    def cell_index(self, lat, lon):
+        row = int(round((self.header['lat_max'] - lat) / self.header['step']))
+        col = int(round((lon - self.header['lon_min']) / self.header['step']))
+        if not (0 <= row < self.header['rows'] and 0 <= col < self.header['cols']):
+            raise ValueError(f"Point {lat}, {lon} is outside the raster")
+        return row, col
+
+    def value(self, variable, lat, lon):
+        """Value of the cell nearest to lat/lon (NaN if missing)"""
+        row, col = self.cell_index(lat, lon)
+        return float(self.variables[variable][row, col])
+
+
+def unpack_grid_raster(payload, variables=None):
+    """Decode raster bytes; `variables` limits which rasters are materialized"""
+    header_size = struct.calcsize(HEADER_FORMAT)
+    magic, version, count, rows, cols, lat_max, lon_min, step, valid_time = \
+        struct.unpack_from(HEADER_FORMAT, payload, 0)
+    if magic != RASTER_MAGIC:
+        raise ValueError("Not a grid raster file")
+    if version != RASTER_VERSION:
+        raise ValueError(f"Unsupported grid raster version: {version}")
+
+    header = {
+        'version': version, 'rows': rows, 'cols': cols,
+        'lat_max': lat_max, 'lon_min': lon_min, 'step': step,
+        'lat_min': lat_max - (rows - 1) * step, 'lon_max': lon_min + (cols - 1) * step,
+        'valid_time': valid_time, 'variables': [],
+    }
+    descriptor_size = struct.calcsize(VARIABLE_FORMAT)
+    offset = header_size
+    descriptors = []
+    for _ in range(count):
+        name, dtype, scale, value_offset = struct.unpack_from(VARIABLE_FORMAT, payload, offset)
+        descriptors.append((name.rstrip(b'\0').decode('ascii'), dtype.rstrip(b'\0').decode('ascii'),
+                            scale, value_offset))
+        offset += descriptor_size
+    header['variables'] = [d[0] for d in descriptors]
+
+    decoded = {}
+    for name, dtype, scale, value_offset in descriptors:
+        offset += (-offset) % 4
+        itemsize = 2 if dtype == 'i2' else 4
+        size = rows * cols * itemsize
+        if variables is None or name in variables:
+            raw = np.frombuffer(payload, dtype='<' + dtype, count=rows * cols, offset=offset).reshape(rows, cols)
+            if dtype == 'i2':
+                grid = raw.astype(np.float32) * np.float32(scale) + np.float32(value_offset)
+                grid[raw == INT16_MISSING] = np.nan
+            else:
+                grid = raw
+            decoded[name] = grid
+        offset += size
+    return GridRaster(header, decoded)
+
+
+def read_grid_raster(filename, variables=None):
+    """Read a raster file written by write_grid_raster"""
+    with open(filename, 'rb') as file:
+        return unpack_grid_raster(file.read(), variables)
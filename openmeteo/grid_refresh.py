@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Incremental Grid Refresh Planner
+Decides per grid cell whether it needs to be fetched again, using the
+fetched_at and model valid time (timestamp) stored with every cell of
+grid_weather_data_1degree.json, and merges freshly fetched cells back into
+the existing snapshot. A refresh run therefore only downloads stale, failed
+or new cells, and a failed batch only leaves its own cells stale.
+"""
+
+import json
+import os
+import sys
+from datetime import datetime
+
+# Add current directory to path to import local modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from weather_variables import get_variable_set
+
+# A cell is refetched once its data is older than this
+CELL_MAX_AGE_HOURS = 12
+# ...or once the model time it describes is this far in the past
+CELL_MAX_VALID_AGE_HOURS = 12
+
+
+def cell_key(lat, lon):
+    """Stable key of a grid cell (coordinates rounded to ~10 m)"""
+    return round(float(lat), 4), round(float(lon), 4)
+
+
+def load_snapshot(filename):
+    """Records of an existing grid snapshot ([] if missing or unreadable)"""
+    if not os.path.exists(filename):
+        return []
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            records = json.load(file)
+        return records if isinstance(records, list) else []
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read grid snapshot {filename}: {e}")
+        return []
+
+
+def _parse_fetched_at(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def cell_status(record, now, required_variables, max_age_hours=CELL_MAX_AGE_HOURS,
+                max_valid_age_hours=CELL_MAX_VALID_AGE_HOURS):
+    """'fresh', or why the cell must be refetched: 'missing', 'failed', 'incomplete', 'stale'"""
+    if record is None:
+        return 'missing'
+    weather = record.get('weather_data')
+    if not weather:
+        return 'failed'
+    if any(name not in weather for name in required_variables):
+        return 'incomplete'  # the variable set grew since this cell was fetched
+
+    fetched_at = _parse_fetched_at(weather.get('fetched_at'))
+    if fetched_at is None:
+        return 'stale'
+    if fetched_at.tzinfo is not None:
+        fetched_at = fetched_at.astimezone().replace(tzinfo=None)
+    if (now - fetched_at).total_seconds() > max_age_hours * 3600:
+        return 'stale'
+
+    valid_time = weather.get('timestamp')
+    if valid_time and now.timestamp() - valid_time > max_valid_age_hours * 3600:
+        return 'stale'
+    return 'fresh'
+
+
+def plan_grid_refresh(grid_points, snapshot, now=None, variable_set='grid',
+                      max_age_hours=CELL_MAX_AGE_HOURS, max_valid_age_hours=CELL_MAX_VALID_AGE_HOURS):
+    """
+    Classify every grid point against the snapshot.
+
+    Returns {'to_fetch': [grid points, in grid order], 'counts': {status: n}}.
+    """
+    now = now or datetime.now()
+    required = get_variable_set(variable_set).get('current', [])
+    by_key = {cell_key(r['lat'], r['lon']): r for r in snapshot if 'lat' in r and 'lon' in r}
+
+    to_fetch = []
+    counts = {'fresh': 0, 'missing': 0, 'failed': 0, 'incomplete': 0, 'stale': 0}
+    for point in grid_points:
+        status = cell_status(by_key.get(cell_key(point['lat'], point['lon'])), now, required,
+                             max_age_hours, max_valid_age_hours)
+        counts[status] += 1
+        if status != 'fresh':
+            to_fetch.append(point)
+    return {'to_fetch': to_fetch, 'counts': counts}
+
+
+def merge_grid_records(grid_points, snapshot, fetched_records):
+    """
+    Snapshot records updated with `fetched_records`, in grid order.
+    Cells that could not be refetched keep their previous record; cells that
+    are no longer part of the grid are dropped.
+    """
+    previous = {cell_key(r['lat'], r['lon']): r for r in snapshot if 'lat' in r and 'lon' in r}
+    fetched = {cell_key(r['lat'], r['lon']): r for r in fetched_records}
+    merged = []
+    for point in grid_points:
+        key = cell_key(point['lat'], point['lon'])
+        record = fetched.get(key) or previous.get(key)
+        if record is not None:
+            merged.append(record)
+    return merged
+
+
+def describe_plan(plan):
+    counts = plan['counts']
+    total = sum(counts.values())
+    details = ", ".join(f"{status} {count}" for status, count in counts.items() if count and status != 'fresh')
+    return (f"{len(plan['to_fetch'])}/{total} cells to refresh"
+            + (f" ({details})" if details else "") + f", {counts['fresh']} fresh")
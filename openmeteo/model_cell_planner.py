@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Model-Cell Request Planner
+Open-Meteo answers every coordinate with the data of the model cell it snaps
+to (the `coordinates` block stored with every record). Grid points, cities
+and ports that land in the same cell are therefore the same request. This
+planner predicts the snapped cell of every point across the layers, issues
+one request per unique cell and fans the result back out to every consumer.
+
+Prediction uses, in order:
+    1. the cell a previous response returned for exactly this coordinate
+    2. the nearest node of the model lattice (MODEL_GRID_STEP, or the step
+       inferred from stored responses)
+Cells are also split by elevation band, because Open-Meteo corrects
+temperature for the elevation of the requested point: the key is
+(cell lat, cell lon, band) for both predictions, with the band taken from
+the elevation a previous response reported and UNKNOWN_BAND for points that
+were never fetched, so points are only shared within ELEVATION_BAND_M.
+
+Usage:
+    python model_cell_planner.py            # report only
+    python model_cell_planner.py --fetch    # refresh stale grid cells + cities through shared cells
+"""
+
+import json
+import math
+import os
+import sys
+from fractions import Fraction
+
+# Add current directory to path to import local modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from weather_variables import get_variable_set, merge_variable_sets
+
+MODEL_GRID_STEP = 0.125  # best_match over Indonesia, as seen in stored responses
+ELEVATION_BAND_M = 100
+UNKNOWN_BAND = 'unknown'  # elevation never reported; shared only with other unknown points
+
+SNAPSHOT_FILES = {
+    'grid': 'grid_weather_data_1degree.json',
+    'city': 'city_weather_data.json',
+}
+# Variable set (weather_variables.VARIABLE_SETS) each fetched layer requests
+LAYER_VARIABLE_SETS = {
+    'grid': 'grid',
+    'city': 'city',
+}
+# weather_data keys every record carries besides the requested variables
+RECORD_METADATA_FIELDS = ('timestamp', 'timezone', 'utc_offset_seconds', 'fetched_at')
+PORT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'pelabuhan', 'namaPelabuhan.json')
+
+
+def _point_key(lat, lon):
+    return round(float(lat), 5), round(float(lon), 5)
+
+
+def learn_snapped_cells(records):
+    """{requested (lat, lon): (cell lat, cell lon, elevation)} from stored responses"""
+    learned = {}
+    for record in records:
+        coordinates = record.get('coordinates') or {}
+        if 'latitude' in coordinates and 'longitude' in coordinates and record.get('weather_data'):
+            learned[_point_key(record['lat'], record['lon'])] = (
+                coordinates['latitude'], coordinates['longitude'], coordinates.get('elevation'))
+    return learned
+
+
+def elevation_band(elevation):
+    """ELEVATION_BAND_M band of an elevation, UNKNOWN_BAND if there is none"""
+    if elevation is None or (isinstance(elevation, float) and math.isnan(elevation)):
+        return UNKNOWN_BAND
+    return int(elevation // ELEVATION_BAND_M)
+
+
+def infer_model_step(learned, default=MODEL_GRID_STEP):
+    """Largest step that all stored cell coordinates are multiples of"""
+    denominators = set()
+    for cell_lat, cell_lon, _ in learned.values():
+        for value in (cell_lat, cell_lon):
+            denominators.add(Fraction(value).limit_denominator(1000).denominator)
+    if not denominators:
+        return default
+    step = 1 / math.lcm(*denominators)
+    return step if step >= 0.01 else default
+
+
+class ModelCellPredictor:
+    """Predicts the model cell and elevation band a coordinate snaps to"""
+
+    def __init__(self, learned=None, step=None):
+        self.learned = learned or {}
+        self.step = step or infer_model_step(self.learned)
+        self.hits = 0
+        self.guesses = 0
+
+    def predict(self, lat, lon):
+        known = self.learned.get(_point_key(lat, lon))
+        if known:
+            self.hits += 1
+            cell_lat, cell_lon, elevation = known
+            return round(cell_lat, 5), round(cell_lon, 5), elevation_band(elevation)
+        self.guesses += 1
+        return (round(round(lat / self.step) * self.step, 5),
+                round(round(lon / self.step) * self.step, 5), UNKNOWN_BAND)
+
+
+def plan_shared_requests(layers, predictor):
+    """
+    Group the points of every layer by predicted model cell.
+
+    `layers` is {layer: [point dicts with lat/lon]}. Returns (cells, report);
+    each cell is {'key', 'lat', 'lon', 'consumers': [(layer, index), ...]}
+    and is requested with the coordinates of its first consumer.
+    """
+    cells = {}
+    for layer, points in layers.items():
+        for index, point in enumerate(points):
+            key = predictor.predict(point['lat'], point['lon'])
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = {'key': key, 'lat': point['lat'], 'lon': point['lon'], 'consumers': []}
+            cell['consumers'].append((layer, index))
+
+    total = sum(len(points) for points in layers.values())
+    shared = {}
+    layer_cells = {layer: 0 for layer in layers}
+    for cell in cells.values():
+        layers_in_cell = {layer for layer, _ in cell['consumers']}
+        for layer in layers_in_cell:
+            layer_cells[layer] += 1
+        if len(cell['consumers']) > 1:
+            for layer in layers_in_cell:
+                shared[layer] = shared.get(layer, 0) + sum(1 for l, _ in cell['consumers'] if l == layer)
+    # Deduplicating each layer on its own would need sum(layer_cells) requests
+    per_layer_requests = sum(layer_cells.values())
+    report = {
+        'points': {layer: len(points) for layer, points in layers.items()},
+        'total_points': total,
+        'unique_cells': len(cells),
+        'requests_saved': total - len(cells),
+        'saved_fraction': (total - len(cells)) / total if total else 0.0,
+        'points_in_shared_cells': shared,
+        'layer_cells': layer_cells,
+        'cross_layer_cells': sum(1 for c in cells.values() if len({l for l, _ in c['consumers']}) > 1),
+        'cross_layer_requests_saved': per_layer_requests - len(cells),
+        'learned_predictions': predictor.hits,
+        'lattice_predictions': predictor.guesses,
+        'model_step': predictor.step,
+    }
+    return list(cells.values()), report
+
+
+def _layer_weather(weather_data, layer):
+    """weather_data reduced to the variables `layer` requests (cells may be fetched with more)"""
+    requested = set(get_variable_set(LAYER_VARIABLE_SETS[layer]).get('current', []))
+    return {key: value for key, value in weather_data.items()
+            if key in requested or key in RECORD_METADATA_FIELDS}
+
+
+def fan_out(cells, cell_records, layers):
+    """
+    Per-layer records built from one record per cell: every consumer keeps
+    its own name/lat/lon and gets the cell's coordinates and weather_data.
+    Consumers of cells that failed are left out.
+    """
+    results = {layer: [None] * len(points) for layer, points in layers.items()}
+    for cell, record in zip(cells, cell_records):
+        if record is None:
+            continue
+        for layer, index in cell['consumers']:
+            point = layers[layer][index]
+            results[layer][index] = {
+                'name': point['name'],
+                'lat': point['lat'],
+                'lon': point['lon'],
+                'coordinates': dict(record['coordinates']),
+                'weather_data': _layer_weather(record['weather_data'], layer),
+            }
+    return {layer: [r for r in records if r is not None] for layer, records in results.items()}
+
+
+def cell_variable_set(cell):
+    """Names of the variable sets a cell's consumers need, in LAYER_VARIABLE_SETS order"""
+    layers_in_cell = {layer for layer, _ in cell['consumers']}
+    return tuple(dict.fromkeys(variable_set for layer, variable_set in LAYER_VARIABLE_SETS.items()
+                               if layer in layers_in_cell))
+
+
+def fetch_shared_cells(openmeteo_client, cells, batch_size=50, max_in_flight=4):
+    """
+    Fetch one record per cell (None where the batch failed). Cells are
+    requested with the union of their consumers' variable sets, one batched
+    run per distinct combination.
+    """
+    from fetch_weather_data import fetch_weather_data_batched
+
+    groups = {}
+    for index, cell in enumerate(cells):
+        groups.setdefault(cell_variable_set(cell), []).append(index)
+
+    by_index = {}
+    for set_names, indices in groups.items():
+        print(f"   {len(indices)} cells with the {' + '.join(set_names)} variables")
+        requests = [{'name': str(index), 'lat': cells[index]['lat'], 'lon': cells[index]['lon']} for index in indices]
+        fetched = fetch_weather_data_batched(openmeteo_client, requests, batch_size=batch_size,
+                                             max_in_flight=max_in_flight,
+                                             variable_set=merge_variable_sets(*set_names))
+        by_index.update((int(record['name']), record) for record in fetched)
+    return [by_index.get(index) for index in range(len(cells))]
+
+
+def load_ports(filename=PORT_FILE):
+    """Port coordinates from namaPelabuhan.json ([] if missing)"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            ports = json.load(file)
+    except (OSError, ValueError):
+        return []
+    return [{'name': name, 'lat': data['latitude'], 'lon': data['longitude']} for name, data in ports.items()]
+
+
+def print_report(report):
+    print("🧮 Model-cell request plan")
+    for layer, count in report['points'].items():
+        shared = report['points_in_shared_cells'].get(layer, 0)
+        print(f"   {layer:>5}: {count:4d} points in {report['layer_cells'][layer]} cells, "
+              f"{shared} in cells shared with other points")
+    print(f"   Model lattice: {report['model_step']}° | predictions: {report['learned_predictions']} "
+          f"from stored responses, {report['lattice_predictions']} from the lattice")
+    print(f"   {report['total_points']} points -> {report['unique_cells']} unique cells "
+          f"({report['cross_layer_cells']} shared across layers)")
+    print(f"🔗 Cross-layer dedup: {report['cross_layer_requests_saved']} requests fewer than "
+          f"deduplicating each layer on its own")
+    print(f"💾 Requests saved: {report['requests_saved']} ({report['saved_fraction']:.1%})")
+
+
+def main():
+    from fetch_weather_data import (load_grid_coordinates, save_weather_data, setup_openmeteo_client,
+                                    write_heatmap_tiles, write_layer_tiles)
+    from grid_refresh import describe_plan, load_snapshot, merge_grid_records, plan_grid_refresh
+    from update_city_weather import load_city_coordinates, save_city_weather_data
+
+    layers = {
+        'grid': load_grid_coordinates(),
+        'city': load_city_coordinates(),
+        'port': load_ports(),
+    }
+    learned = {}
+    for filename in SNAPSHOT_FILES.values():
+        learned.update(learn_snapped_cells(load_snapshot(filename)))
+
+    cells, report = plan_shared_requests(layers, ModelCellPredictor(learned))
+    print_report(report)
+    if '--fetch' not in sys.argv[1:]:
+        return 0
+
+    # Port weather comes from BMKG; ports are part of the report only.
+    # Like the per-layer refreshes, only stale, failed or new points are fetched.
+    snapshots = {layer: load_snapshot(SNAPSHOT_FILES[layer]) for layer in LAYER_VARIABLE_SETS}
+    stale_layers = {}
+    for layer, variable_set in LAYER_VARIABLE_SETS.items():
+        plan = plan_grid_refresh(layers[layer], snapshots[layer], variable_set=variable_set)
+        print(f"🧭 {layer}: {describe_plan(plan)}")
+        stale_layers[layer] = plan['to_fetch']
+    cells, report = plan_shared_requests(stale_layers, ModelCellPredictor(learned))
+    if not cells:
+        print("Grid and city weather data are fresh; nothing to fetch")
+        return 0
+    print(f"Fetching {report['unique_cells']} cells for {report['total_points']} grid points and cities "
+          f"({report['cross_layer_requests_saved']} saved by sharing cells across layers)...")
+
+    openmeteo_client = setup_openmeteo_client()
+    records = fan_out(cells, fetch_shared_cells(openmeteo_client, cells), stale_layers)
+    if records['grid']:
+        merged = merge_grid_records(layers['grid'], snapshots['grid'], records['grid'])
+        save_weather_data(merged, SNAPSHOT_FILES['grid'], raster_filename='grid_weather_data_1degree.bin')
+        write_layer_tiles('grid', SNAPSHOT_FILES['grid'])
+        write_heatmap_tiles('temperature_2m', SNAPSHOT_FILES['grid'])
+    if records['city']:
+        save_city_weather_data(merge_grid_records(layers['city'], snapshots['city'], records['city']),
+                               SNAPSHOT_FILES['city'])
+    print(f"Fanned out {len(cells)} cells to {len(records['grid'])} grid points and {len(records['city'])} cities")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+/**
+ * Point Tile Layer
+ * Loads the pre-rendered marker tiles written by tile_pyramid.py
+ * (tiles/<layer>/<z>/<x>/<y>.json) for the current viewport only.
+ *
+ * Features:
+ * - Only tiles in view are fetched and turned into markers
+ * - Markers of tiles that leave the view are removed
+ * - Zoom levels beyond the pyramid reuse its deepest level
+ * - Tile URLs are versioned by meta.json, so browsers cache them safely
+ */
+
+class PointTileLayer {
+    constructor(map, layerGroup, options) {
+        this.map = map;
+        this.layerGroup = layerGroup;
+        this.layer = options.layer;
+        this.baseUrl = options.baseUrl || 'tiles';
+        this.createMarker = options.createMarker;
+        this.meta = null;
+        this.available = new Set();
+        this.tileGroups = new Map();
+        this.pending = new Map();
+        this.active = false;
+        this.onMoveEnd = () => this.update();
+    }
+
+    /**
+     * Load meta.json and start following the viewport.
+     * Resolves to false if the layer has no tiles (caller falls back).
+     */
+    async start() {
+        try {
+            const response = await fetch(`${this.baseUrl}/${this.layer}/meta.json`, { cache: 'no-cache' });
+            if (!response.ok) return false;
+            this.meta = await response.json();
+        } catch (error) {
+            console.warn(`⚠️ No marker tiles for ${this.layer}:`, error);
+            return false;
+        }
+
+        this.available = new Set();
+        for (const [zoom, keys] of Object.entries(this.meta.tiles)) {
+            for (const key of keys) this.available.add(`${zoom}/${key}`);
+        }
+        this.stop();
+        this.active = true;
+        this.map.on('moveend', this.onMoveEnd);
+        await this.update();
+        console.log(`🧱 ${this.layer} tiles: ${this.meta.point_count} points, z${this.meta.min_zoom}-${this.meta.max_zoom}`);
+        return true;
+    }
+
+    /**
+     * Stop following the viewport and drop all markers
+     */
+    stop() {
+        this.active = false;
+        this.map.off('moveend', this.onMoveEnd);
+        this.tileGroups.clear();
+        this.pending.clear();
+        this.layerGroup.clearLayers();
+    }
+
+    tileZoom() {
+        const zoom = Math.round(this.map.getZoom());
+        return Math.max(this.meta.min_zoom, Math.min(this.meta.max_zoom, zoom));
+    }
+
+    visibleTileKeys() {
+        const zoom = this.tileZoom();
+        const bounds = this.map.getBounds();
+        const size = this.meta.tile_size;
+        const northWest = this.map.project(bounds.getNorthWest(), zoom).divideBy(size).floor();
+        const southEast = this.map.project(bounds.getSouthEast(), zoom).divideBy(size).floor();
+        const keys = [];
+        for (let x = northWest.x; x <= southEast.x; x++) {
+            for (let y = northWest.y; y <= southEast.y; y++) {
+                const key = `${zoom}/${x}/${y}`;
+                if (this.available.has(key)) keys.push(key);
+            }
+        }
+        return keys;
+    }
+
+    /**
+     * Sync markers with the tiles in view
+     */
+    async update() {
+        if (!this.active || !this.meta) return;
+        const wanted = new Set(this.visibleTileKeys());
+
+        for (const [key, group] of this.tileGroups) {
+            if (!wanted.has(key)) {
+                this.layerGroup.removeLayer(group);
+                this.tileGroups.delete(key);
+            }
+        }
+
+        const loads = [];
+        for (const key of wanted) {
+            if (!this.tileGroups.has(key) && !this.pending.has(key)) {
+                loads.push(this.loadTile(key));
+            }
+        }
+        await Promise.all(loads);
+    }
+
+    async loadTile(key) {
+        const request = fetch(`${this.baseUrl}/${this.layer}/${key}.json?v=${encodeURIComponent(this.meta.generated_at)}`)
+            .then(response => response.ok ? response.json() : null);
+        this.pending.set(key, request);
+        try {
+            const tile = await request;
+            // The view may have changed (or the layer stopped) while loading
+            if (!tile || this.pending.get(key) !== request || !this.active) return;
+            if (!this.visibleTileKeys().includes(key)) return;
+
+            const group = L.layerGroup();
+            for (const row of tile.features) {
+                const marker = this.createMarker(PointTileLayer.toLocation(tile.fields, row));
+                if (marker) group.addLayer(marker);
+            }
+            this.tileGroups.set(key, group);
+            this.layerGroup.addLayer(group);
+        } catch (error) {
+            console.error(`Error loading ${this.layer} tile ${key}:`, error);
+        } finally {
+            if (this.pending.get(key) === request) this.pending.delete(key);
+        }
+    }
+
+    /**
+     * Turn a compact tile row back into the {name, lat, lon, weather_data}
+     * shape used by the marker builders
+     */
+    static toLocation(fields, row) {
+        const location = { weather_data: {} };
+        fields.forEach((field, i) => {
+            if (field === 'lat' || field === 'lon' || field === 'count' || field === 'name') {
+                location[field] = row[i];
+            } else {
+                location.weather_data[field] = row[i];
+            }
+        });
+        return location;
+    }
+}
+
+// Export for use in other modules
+if (typeof module !== 'undefined' && module.exports) {
+    module.exports = PointTileLayer;
+}
@@ -12,6 +12,8 @@
 class SmartCacheManager {
     constructor() {
         this.cache = new Map();
+        // ETag / Last-Modified per URL, used for conditional background refreshes
+        this.validators = new Map();
         this.cacheConfig = {
             // Weather data: cache for shorter periods
             weather: {
@@ -132,7 +134,16 @@ class SmartCacheManager {
      */
     async backgroundRefresh(url, type, cacheKey) {
         try {
-            const freshData = await this.fetchWithCacheBuster(url);
+            const freshData = await this.fetchWithCacheBuster(url, true);
+            if (freshData === null) {
+                // 304 Not Modified: only the headers crossed the wire
+                const cached = this.cache.get(cacheKey);
+                if (cached) {
+                    cached.timestamp = Date.now();
+                }
+                console.log(`✅ Background refresh: ${url} not modified`);
+                return;
+            }
             this.setCache(cacheKey, freshData, type);
             console.log(`🔄 Background refresh completed for: ${url}`);
         } catch (error) {
@@ -142,24 +153,42 @@ class SmartCacheManager {
     
     /**
      * Fetch data with cache-busting
+     * With conditional=true the stored ETag/Last-Modified are sent and
+     * null is returned when the server answers 304 Not Modified
      */
-    async fetchWithCacheBuster(url) {
+    async fetchWithCacheBuster(url, conditional = false) {
         const cacheBuster = `_t=${Date.now()}`;
         const separator = url.includes('?') ? '&' : '?';
         const fullUrl = `${url}${separator}${cacheBuster}`;
         
+        const headers = {
+            'Cache-Control': 'no-cache, no-store, must-revalidate',
+            'Pragma': 'no-cache'
+        };
+        const validators = this.validators.get(url);
+        if (conditional && validators) {
+            if (validators.etag) headers['If-None-Match'] = validators.etag;
+            if (validators.lastModified) headers['If-Modified-Since'] = validators.lastModified;
+        }
+        
         const response = await fetch(fullUrl, {
             cache: 'no-cache',
-            headers: {
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'Pragma': 'no-cache'
-            }
+            headers: headers
         });
         
+        if (response.status === 304) {
+            return null;
+        }
+        
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
+        this.validators.set(url, {
+            etag: response.headers.get('ETag'),
+            lastModified: response.headers.get('Last-Modified')
+        });
+        
         return await response.json();
     }
     
@@ -24,6 +24,8 @@ from update_city_weather import (
     save_city_weather_data, 
     check_data_freshness as check_city_freshness
 )
+from fetch_weather_data import load_grid_coordinates
+from grid_refresh import describe_plan, load_snapshot, plan_grid_refresh
 
 # Setup logging
 logging.basicConfig(
@@ -36,20 +38,19 @@ logging.basicConfig(
 )
 
 def check_grid_data_freshness(filename='grid_weather_data_1degree.json'):
-    """Check if the grid weather data is fresh (less than 12 hours old)"""
+    """Check if every grid cell is fresh (per-cell fetched_at / valid time, see grid_refresh.py)"""
     try:
         if not os.path.exists(filename):
             logging.info(f"Grid data file {filename} does not exist. Update needed.")
             return False
         
-        file_mtime = os.path.getmtime(filename)
-        file_age_hours = (time.time() - file_mtime) / 3600
+        plan = plan_grid_refresh(load_grid_coordinates(), load_snapshot(filename))
         
-        if file_age_hours > 12:  # 12 hours threshold for grid data
-            logging.info(f"Grid data file {filename} is {file_age_hours:.1f} hours old. Update needed.")
+        if plan['to_fetch']:
+            logging.info(f"Grid data file {filename}: {describe_plan(plan)}. Update needed.")
             return False
         else:
-            logging.info(f"Grid data file {filename} is {file_age_hours:.1f} hours old. Still fresh.")
+            logging.info(f"Grid data file {filename}: all {plan['counts']['fresh']} cells fresh.")
             return True
             
     except Exception as e:
@@ -142,7 +143,7 @@ def update_grid_weather():
         
         if result.returncode == 0:
             logger.info("✅ Grid weather data update completed successfully!")
-            logger.info("Grid data saved to grid_weather_data_1degree.json")
+            logger.info("Stale grid cells merged into grid_weather_data_1degree.json")
             return True
         else:
             logger.error(f"❌ Grid weather update failed with return code: {result.returncode}")
@@ -8,17 +8,29 @@ Run this script periodically to keep city weather data current
 import json
 import time
 import logging
-from datetime import datetime
 import os
 import sys
 
 # Add current directory to path to import local modules
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import openmeteo_requests
 import requests_cache
 from retry_requests import retry
 
+from columnar_decode import decode_batch, columns_to_records
+from weather_variables import build_params
+from json_writer import write_json
+from precompress import write_compressed_sidecars
+from snapshot_store import get_snapshot_store
+from timeseries_store import CITY, append_records
+from tile_pyramid import write_layer_tiles
+
+# Variables requested for the city layer (see weather_variables.VARIABLE_SETS)
+CITY_VARIABLE_SET = 'city'
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -62,84 +74,17 @@ def fetch_city_weather_data(openmeteo_client, cities):
     if not cities:
         return []
     
-    # Prepare coordinates for API call
-    lats = [city['lat'] for city in cities]
-    lons = [city['lon'] for city in cities]
-    
     # API parameters
     url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lats,
-        "longitude": lons,
-        "current": ["temperature_2m", "relative_humidity_2m", "weather_code", "wind_speed_10m", "wind_direction_10m"],
-        "timezone": "Asia/Jakarta"
-    }
+    params = build_params(CITY_VARIABLE_SET, cities)
     
     try:
         logging.info(f"Fetching weather data for {len(cities)} cities...")
         responses = openmeteo_client.weather_api(url, params=params)
         
-        processed_data = []
-        
-        for i, response in enumerate(responses):
-            if i < len(cities):
-                city = cities[i]
-                
-                # Get current weather data
-                current = response.Current()
-                
-                # Extract current weather variables using positional access
-                current_vars = {}
-                
-                if current.VariablesLength() > 0:
-                    # temperature_2m (first variable)
-                    if current.VariablesLength() > 0:
-                        temp_var = current.Variables(0)
-                        current_vars['temperature_2m'] = temp_var.Value()
-                    
-                    # relative_humidity_2m (second variable)
-                    if current.VariablesLength() > 1:
-                        humidity_var = current.Variables(1)
-                        current_vars['relative_humidity_2m'] = humidity_var.Value()
-                    
-                    # weather_code (third variable)
-                    if current.VariablesLength() > 2:
-                        weather_var = current.Variables(2)
-                        current_vars['weather_code'] = weather_var.Value()
-                    
-                    # wind_speed_10m (fourth variable)
-                    if current.VariablesLength() > 3:
-                        wind_speed_var = current.Variables(3)
-                        current_vars['wind_speed_10m'] = wind_speed_var.Value()
-                    
-                    # wind_direction_10m (fifth variable)
-                    if current.VariablesLength() > 4:
-                        wind_dir_var = current.Variables(4)
-                        current_vars['wind_direction_10m'] = wind_dir_var.Value()
-                
-                processed_city = {
-                    'name': city['name'],
-                    'lat': city['lat'],
-                    'lon': city['lon'],
-                    'coordinates': {
-                        'latitude': float(response.Latitude()),
-                        'longitude': float(response.Longitude()),
-                        'elevation': float(response.Elevation())
-                    },
-                    'weather_data': {
-                        'temperature_2m': float(current_vars.get('temperature_2m')) if current_vars.get('temperature_2m') is not None else None,
-                        'relative_humidity_2m': float(current_vars.get('relative_humidity_2m')) if current_vars.get('relative_humidity_2m') is not None else None,
-                        'weather_code': int(current_vars.get('weather_code')) if current_vars.get('weather_code') is not None else None,
-                        'wind_speed_10m': float(current_vars.get('wind_speed_10m')) if current_vars.get('wind_speed_10m') is not None else None,
-                        'wind_direction_10m': float(current_vars.get('wind_direction_10m')) if current_vars.get('wind_direction_10m') is not None else None,
-                        'timestamp': int(current.Time()) if current.Time() is not None else None,
-                        'timezone': str(response.Timezone()).replace("b'", "").replace("'", "") if response.Timezone() is not None else None,
-                        'utc_offset_seconds': int(response.UtcOffsetSeconds()) if response.UtcOffsetSeconds() is not None else None,
-                        'fetched_at': datetime.now().isoformat()
-                    }
-                }
-                
-                processed_data.append(processed_city)
+        # Decode the whole batch into columns, build dicts only at the output edge
+        columns = decode_batch(responses[:len(cities)], CITY_VARIABLE_SET)
+        processed_data = columns_to_records(columns, cities)
         
         logging.info(f"Successfully processed {len(processed_data)} cities")
         return processed_data
@@ -151,24 +96,28 @@ def fetch_city_weather_data(openmeteo_client, cities):
 def save_city_weather_data(data, filename='city_weather_data.json'):
     """Save city weather data to JSON file"""
     try:
-        with open(filename, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2, ensure_ascii=False)
-        
-        file_size = len(json.dumps(data)) / 1024 / 1024
+        file_size = write_json(filename, data) / 1024 / 1024
         logging.info(f"Saved {len(data)} cities to {filename} ({file_size:.1f} MB)")
+        append_records(CITY, data)
         
-        # Also save a timestamped backup
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"city_weather_data_backup_{timestamp}.json"
-        with open(backup_filename, 'w', encoding='utf-8') as backup_file:
-            json.dump(data, backup_file, indent=2, ensure_ascii=False)
-        logging.info(f"Backup saved as {backup_filename}")
+        # Archive a deduplicated snapshot instead of a full timestamped backup
+        store = get_snapshot_store()
+        snapshot, stored = store.save_file('city_weather_data', filename, delta=True)
+        removed, _ = store.prune('city_weather_data')
+        logging.info(f"Snapshot {snapshot['sha256'][:12]} {'archived' if stored else 'unchanged, not stored again'}"
+                     f" ({removed} old snapshots pruned)")
         
         # Update file modification time to force cache refresh
         current_time = time.time()
         os.utime(filename, (current_time, current_time))
         logging.info(f"File modification time updated to force cache refresh")
         
+        # Regenerate the precompressed copies served by serve_local.py
+        write_compressed_sidecars(filename)
+        
+        # Rebuild the marker tiles the map loads per viewport
+        write_layer_tiles('city', filename)
+        
     except Exception as e:
         logging.error(f"Error saving data to {filename}: {e}")
 
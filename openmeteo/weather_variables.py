@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Open-Meteo Variable Registry
+Declares every variable the fetchers can request, per block (current, hourly,
+daily), and the variable sets used by each pipeline. Request parameters and
+the columnar extractor are generated from here, so adding a variable to a
+layer is a change to VARIABLE_SETS only.
+"""
+
+# dtype: 'float' values are decoded to float32 columns, 'int' values are
+# categorical codes stored as float32 and emitted as int, 'int64' values are
+# unix timestamps delivered through ValuesInt64 (daily sunrise/sunset)
+VARIABLE_REGISTRY = {
+    'current': {
+        'temperature_2m': {'unit': '°C', 'dtype': 'float'},
+        'relative_humidity_2m': {'unit': '%', 'dtype': 'float'},
+        'apparent_temperature': {'unit': '°C', 'dtype': 'float'},
+        'weather_code': {'unit': 'wmo code', 'dtype': 'int'},
+        'wind_speed_10m': {'unit': 'km/h', 'dtype': 'float'},
+        'wind_direction_10m': {'unit': '°', 'dtype': 'float'},
+        'wind_gusts_10m': {'unit': 'km/h', 'dtype': 'float'},
+        'precipitation': {'unit': 'mm', 'dtype': 'float'},
+        'rain': {'unit': 'mm', 'dtype': 'float'},
+        'pressure_msl': {'unit': 'hPa', 'dtype': 'float'},
+        'surface_pressure': {'unit': 'hPa', 'dtype': 'float'},
+        'cloud_cover': {'unit': '%', 'dtype': 'float'},
+        'is_day': {'unit': 'flag', 'dtype': 'int'},
+    },
+    'hourly': {
+        'temperature_2m': {'unit': '°C', 'dtype': 'float'},
+        'relative_humidity_2m': {'unit': '%', 'dtype': 'float'},
+        'weather_code': {'unit': 'wmo code', 'dtype': 'int'},
+        'wind_speed_10m': {'unit': 'km/h', 'dtype': 'float'},
+        'wind_direction_10m': {'unit': '°', 'dtype': 'float'},
+        'wind_gusts_10m': {'unit': 'km/h', 'dtype': 'float'},
+        'precipitation': {'unit': 'mm', 'dtype': 'float'},
+        'precipitation_probability': {'unit': '%', 'dtype': 'float'},
+        'pressure_msl': {'unit': 'hPa', 'dtype': 'float'},
+        'cloud_cover': {'unit': '%', 'dtype': 'float'},
+        'visibility': {'unit': 'm', 'dtype': 'float'},
+    },
+    'daily': {
+        'weather_code': {'unit': 'wmo code', 'dtype': 'int'},
+        'temperature_2m_max': {'unit': '°C', 'dtype': 'float'},
+        'temperature_2m_min': {'unit': '°C', 'dtype': 'float'},
+        'precipitation_sum': {'unit': 'mm', 'dtype': 'float'},
+        'precipitation_probability_max': {'unit': '%', 'dtype': 'float'},
+        'wind_speed_10m_max': {'unit': 'km/h', 'dtype': 'float'},
+        'wind_gusts_10m_max': {'unit': 'km/h', 'dtype': 'float'},
+        'wind_direction_10m_dominant': {'unit': '°', 'dtype': 'float'},
+        'sunrise': {'unit': 'unix time', 'dtype': 'int64'},
+        'sunset': {'unit': 'unix time', 'dtype': 'int64'},
+    },
+}
+
+# Variables requested by each pipeline, per block, in request order
+VARIABLE_SETS = {
+    'grid': {
+        'current': ['temperature_2m', 'relative_humidity_2m', 'weather_code', 'wind_speed_10m',
+                    'wind_direction_10m', 'wind_gusts_10m', 'precipitation', 'pressure_msl',
+                    'cloud_cover'],
+    },
+    'city': {
+        'current': ['temperature_2m', 'relative_humidity_2m', 'weather_code', 'wind_speed_10m',
+                    'wind_direction_10m', 'wind_gusts_10m', 'precipitation', 'pressure_msl',
+                    'cloud_cover'],
+    },
+    'forecast': {
+        'hourly': ['temperature_2m', 'relative_humidity_2m', 'weather_code', 'wind_speed_10m',
+                   'wind_direction_10m', 'wind_gusts_10m', 'precipitation', 'cloud_cover'],
+    },
+}
+
+BLOCKS = ('current', 'hourly', 'daily')
+
+
+def get_variable_set(name_or_set):
+    """Resolve a variable set by name (or pass a {block: [names]} dict through) and validate it"""
+    variable_set = VARIABLE_SETS[name_or_set] if isinstance(name_or_set, str) else name_or_set
+    for block, names in variable_set.items():
+        if block not in VARIABLE_REGISTRY:
+            raise ValueError(f"Unknown Open-Meteo block: {block}")
+        unknown = [name for name in names if name not in VARIABLE_REGISTRY[block]]
+        if unknown:
+            raise ValueError(f"Unknown {block} variables: {', '.join(unknown)}")
+    return variable_set
+
+
+def merge_variable_sets(*names_or_sets):
+    """Union of several variable sets, per block, in first-seen order"""
+    merged = {}
+    for variable_set in names_or_sets:
+        for block, names in get_variable_set(variable_set).items():
+            merged.setdefault(block, [])
+            merged[block].extend(name for name in names if name not in merged[block])
+    return get_variable_set(merged)
+
+
+def variable_dtype(block, name):
+    return VARIABLE_REGISTRY[block][name]['dtype']
+
+
+def integer_variables(block, names):
+    """Names in `names` that are emitted as integers"""
+    return [name for name in names if variable_dtype(block, name) in ('int', 'int64')]
+
+
+def build_params(variable_set, locations, timezone="Asia/Jakarta", **options):
+    """
+    Build Open-Meteo request parameters for `locations` from a variable set.
+
+    Extra keyword options (forecast_days, past_days, ...) are passed through.
+    """
+    variable_set = get_variable_set(variable_set)
+    params = {
+        "latitude": [loc['lat'] for loc in locations],
+        "longitude": [loc['lon'] for loc in locations],
+    }
+    for block in BLOCKS:
+        if variable_set.get(block):
+            params[block] = list(variable_set[block])
+    params["timezone"] = timezone
+    params.update(options)
+    return params
@@ -1,33 +1,54 @@
 import requests
 import json
-import re
+import os
+import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmkg_cache import get_response_cache
+from bmkg_client import get_bmkg_client
+from json_writer import write_json
+from nuxt_payload import decode, extract_ports, port_slug
+from port_collector import MAX_CONCURRENCY, collect_ports
+
+def request_slug_weather(slug):
+    """
+    Satu permintaan cuaca untuk satu slug tanpa retry.
+    Mengembalikan ((harbor_name, prakiraan) atau (None, None), status HTTP atau None).
+    """
+    api_url = f"https://maritim.bmkg.go.id/api/pelabuhan?slug={slug}"
+    try:
+        response = get_response_cache().get(get_bmkg_client(pool_size=MAX_CONCURRENCY), slug, api_url, timeout=15)
+    except requests.exceptions.RequestException:
+        return (None, None), None
+    if not response.ok:
+        return (None, None), response.status_code
+    try:
+        data = response.json()
+    except json.JSONDecodeError:
+        return (None, None), response.status_code
+    harbor_name = data.get('pelabuhan', slug.replace('-', ' ').title())
+    return (harbor_name, data.get('prakiraan', [])), response.status_code
 
 def fetch_weather_for_slug(slug, retries=2, delay=1):
     """
     Mengambil data cuaca untuk satu pelabuhan berdasarkan slug-nya menggunakan REST API.
     Termasuk mekanisme coba lagi (retry) untuk mengatasi error sementara.
     """
-    api_url = f"https://maritim.bmkg.go.id/api/pelabuhan?slug={slug}"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    
     for attempt in range(retries + 1):
-        try:
-            response = requests.get(api_url, headers=headers, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            harbor_name = data.get('pelabuhan', slug.replace('-', ' ').title())
-            return harbor_name, data.get('prakiraan', [])
-        except (requests.exceptions.RequestException, json.JSONDecodeError):
+        (harbor_name, weather_data), status = request_slug_weather(slug)
+        if harbor_name is not None:
+            return harbor_name, weather_data
+        if status is None or status == 429 or status >= 500:
             if attempt < retries:
                 time.sleep(delay)  # Menunggu sebelum mencoba lagi
                 continue
             else:
                 # Gagal setelah semua percobaan
                 return None, None
+        return None, None
 
 def generate_slug_from_name(name):
     """
@@ -36,63 +57,34 @@ def generate_slug_from_name(name):
     """
     if not isinstance(name, str):
         return ""
-    # Konversi ke huruf kecil
-    slug = name.lower()
-    # Ganti karakter non-alfanumerik dengan tanda hubung
-    slug = re.sub(r'[^a-z0-9]+', '-', slug)
-    # Hapus tanda hubung di awal atau akhir
-    slug = slug.strip('-')
-    return slug
+    return port_slug(name)
 
 def parse_bmkg_payload(payload):
     """
     Mem-parsing struktur data JSON yang kompleks dari BMKG untuk mengekstrak slug pelabuhan.
     """
-    all_slugs = set()
     try:
-        # Data utama adalah sebuah list (payload) yang berfungsi sebagai lookup table.
-        # Referensi ke daftar provinsi ada di indeks ke-4 dari payload.
-        province_references = payload[4]
-
-        for province_ref in province_references:
-            # Dapatkan objek provinsi dari payload menggunakan referensinya
-            province_obj = payload[province_ref]
-            
-            # Dapatkan referensi ke daftar pelabuhan untuk provinsi ini
-            ports_references = payload[province_obj['ports']]
-            
-            for port_ref in ports_references:
-                # Dapatkan objek pelabuhan
-                port_obj = payload[port_ref]
-                
-                # Dapatkan nama pelabuhan
-                port_name = payload[port_obj['name']]
-                
-                # Buat slug dari nama pelabuhan
-                slug = generate_slug_from_name(port_name)
-                if slug:
-                    all_slugs.add(slug)
-                    
-    except (IndexError, KeyError, TypeError) as e:
+        # Payload Nuxt (format devalue) di-decode dengan decoder bersama;
+        # setiap pelabuhan sudah membawa slug yang sama dengan indeks pelabuhan.
+        ports = extract_ports(decode(payload))
+    except (IndexError, KeyError, TypeError, AttributeError) as e:
         print(f"Error saat mem-parsing payload: {e}. Struktur data mungkin telah berubah.")
         return []
         
-    return list(all_slugs)
+    return list({port['slug'] for port in ports if port['slug']})
 
 def get_all_harbor_weather():
     """
     Fungsi utama untuk mengambil data cuaca dari semua pelabuhan yang tersedia.
     """
     payload_url = "https://maritim.bmkg.go.id/cuaca/pelabuhan/_payload.json?a72905da-75ea-4547-8cfd-60d9c71cc7f6"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    client = get_bmkg_client(pool_size=MAX_CONCURRENCY)
     
     all_weather_data = {}
     
     try:
         print("Mengambil daftar pelabuhan dari API _payload.json...")
-        response = requests.get(payload_url, headers=headers)
+        response = client.get(payload_url, timeout=30)
         response.raise_for_status()
         payload_data = response.json()
         
@@ -112,23 +104,19 @@ def get_all_harbor_weather():
         print("Gagal mem-parsing JSON dari _payload.json.")
         return None
 
-    # Menggunakan ThreadPoolExecutor untuk membuat permintaan API secara paralel
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_slug = {executor.submit(fetch_weather_for_slug, slug): slug for slug in slugs}
-        
-        print(f"Memulai pengambilan data cuaca untuk {len(slugs)} pelabuhan...")
-        
-        for i, future in enumerate(as_completed(future_to_slug)):
-            slug = future_to_slug[future]
-            try:
-                harbor_name, weather_data = future.result()
-                if harbor_name and weather_data:
-                    all_weather_data[harbor_name] = weather_data
-                    print(f"({i+1}/{len(slugs)}) Berhasil mengambil data untuk: {harbor_name}")
-                else:
-                    print(f"({i+1}/{len(slugs)}) Gagal atau tidak ada data untuk slug: {slug}")
-            except Exception as exc:
-                print(f"Slug {slug} menghasilkan error: {exc}")
+    # Concurrency menyesuaikan diri dengan server BMKG (AIMD), retry untuk 429/5xx ada di collector
+    print(f"Memulai pengambilan data cuaca untuk {len(slugs)} pelabuhan...")
+    
+    def report_progress(index, slug, result, done, total):
+        harbor_name, weather_data = result
+        if harbor_name and weather_data:
+            all_weather_data[harbor_name] = weather_data
+            print(f"({done}/{total}) Berhasil mengambil data untuk: {harbor_name}")
+        else:
+            print(f"({done}/{total}) Gagal atau tidak ada data untuk slug: {slug}")
+    
+    collect_ports(slugs, request_slug_weather, on_result=report_progress)
+    get_response_cache().print_report("Cache respons BMKG")
 
     return all_weather_data
 
@@ -143,8 +131,7 @@ if __name__ == "__main__":
         
         # Menyimpan hasil ke file JSON
         output_filename = "cuaca_semua_pelabuhan.json"
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        write_json(output_filename, all_data)
             
         print(f"\nData lengkap telah disimpan ke file: {output_filename}")
         
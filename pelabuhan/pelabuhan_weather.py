@@ -1,88 +1,65 @@
-import json
-import re
-import requests
 import os
+import sys
 
-def load_pelabuhan_data(file_path="pelabuhan.json"):
-    """Load port data from pelabuhan.json"""
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmkg_cache import SerializedRecord, get_response_cache, record_json
+from bmkg_client import get_bmkg_client
+from json_writer import write_json
+from nuxt_payload import load_entity_index, port_slug
+from port_collector import collect_ports
+from precompress import write_compressed_sidecars
+from tile_pyramid import write_layer_tiles
+from timeseries_store import PORT, append_records
+
+def load_pelabuhan_data():
+    """Ports with coordinates from the compiled port/area index (built from pelabuhan.json)"""
     try:
-        # Try to find the file in multiple possible locations
-        possible_paths = [
-            "pelabuhan.json",  # If running from pelabuhan folder
-            "pelabuhan/pelabuhan.json",  # If running from root directory
-            os.path.join(os.path.dirname(__file__), "pelabuhan.json")  # Absolute path
+        index = load_entity_index()
+        ports = [
+            {'id': port['id'], 'name': port['name'], 'lat': port['lat'], 'lon': port['lon']}
+            for port in index.ports
+            if port['lat'] is not None and port['lon'] is not None
         ]
-        
-        data = None
-        used_path = None
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    used_path = path
-                    break
-        
-        if data is None:
-            print(f"Error: Could not find pelabuhan.json in any of these locations:")
-            for path in possible_paths:
-                print(f"  - {path}")
-            return []
-        
-        print(f"Loaded data from: {used_path}")
-        
-        ports = []
-        
-        # The structure has sequential elements: ID, Port Name, Lat, Lon, {object}
-        # We need to find "Pelabuhan" strings and get the next two elements as coordinates
-        for i, item in enumerate(data):
-            if isinstance(item, str) and 'Pelabuhan' in item:
-                # Check if we have enough elements after this for coordinates
-                if i + 2 < len(data):
-                    lat = data[i + 1]
-                    lon = data[i + 2]
-                    
-                    # Verify these are numbers
-                    if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
-                        ports.append({
-                            'id': f"PORT_{len(ports)+1:03d}",
-                            'name': item,
-                            'lat': lat,
-                            'lon': lon
-                        })
-        
         print(f"Found {len(ports)} ports")
         return ports
-    except Exception as e:
+    except (OSError, ValueError) as e:
         print(f"Error: {e}")
         return []
 
 def create_slug(port_name):
     """Convert port name to slug for BMKG API"""
-    # Convert to lowercase and replace non-alphanumeric characters with hyphens
-    slug = re.sub(r'[^a-zA-Z0-9\s]', ' ', port_name)
-    slug = re.sub(r'\s+', '-', slug.strip()).lower()
-    return slug
+    return port_slug(port_name)
 
-def fetch_port_weather(port_name, port_lat, port_lon):
-    """Fetch weather data for a port"""
+def request_port_weather(port_name, port_lat, port_lon):
+    """Fetch weather data for a port; returns (result, HTTP status or None)"""
+    response = None
     try:
         slug = create_slug(port_name)
         api_url = f"https://maritim.bmkg.go.id/api/pelabuhan?slug={slug}"
         
-        print(f"Fetching: {port_name} -> {slug}")
+        cache = get_response_cache()
+        response = cache.get(get_bmkg_client(), slug, api_url, timeout=30)
         
-        response = requests.get(api_url, timeout=30)
-        
-        if response.status_code == 200:
+        if response.ok:
+            # Unchanged port: reuse the record serialized last time instead of parsing the body
+            input_key = f"{port_name}|{port_lat}|{port_lon}"
+            json_text = None if response.changed else cache.derived(slug, input_key)
+            if json_text is not None:
+                return SerializedRecord(json_text, port_name=port_name, slug=slug,
+                                        status='success'), response.status_code
+            
             weather_data = response.json()
-            return {
+            record = {
                 'port_name': port_name,
                 'slug': slug,
                 'coordinates': {'lat': port_lat, 'lon': port_lon},
                 'weather_data': weather_data,
                 'status': 'success'
             }
+            cache.store_derived(slug, input_key, record_json(record))
+            return record, response.status_code
         else:
             return {
                 'port_name': port_name,
@@ -91,9 +68,11 @@ def fetch_port_weather(port_name, port_lat, port_lon):
                 'weather_data': None,
                 'status': 'failed',
                 'error': f"HTTP {response.status_code}"
-            }
+            }, response.status_code
             
     except Exception as e:
+        # Status None (transport error, counted as congestion) only when no
+        # response came back; e.g. a body that is not JSON keeps its status
         return {
             'port_name': port_name,
             'slug': create_slug(port_name),
@@ -101,7 +80,12 @@ def fetch_port_weather(port_name, port_lat, port_lon):
             'weather_data': None,
             'status': 'error',
             'error': str(e)
-        }
+        }, response.status_code if response is not None else None
+
+def fetch_port_weather(port_name, port_lat, port_lon):
+    """Fetch weather data for a port"""
+    print(f"Fetching: {port_name} -> {create_slug(port_name)}")
+    return request_port_weather(port_name, port_lat, port_lon)[0]
 
 def main():
     print("Port Weather Data Fetcher")
@@ -113,35 +97,31 @@ def main():
         return
     
     print(f"Found {len(ports)} ports to process")
-    print("Estimated time: ~5-6 minutes (with 500ms delays)")
+    print("Concurrency adapts to the BMKG server (AIMD), starting at 2 parallel requests")
     print("Starting data collection...\n")
     
-    results = []
-    successful = 0
-    failed = 0
+    counts = {'successful': 0, 'failed': 0}
     
-    # Process all ports
-    for i, port in enumerate(ports, 1):
-        print(f"[{i:3d}/{len(ports)}] Processing: {port['name']}")
-        
-        result = fetch_port_weather(port['name'], port['lat'], port['lon'])
-        results.append(result)
-        
+    def report_progress(index, port, result, done, total):
         if result['status'] == 'success':
-            successful += 1
-            print(f"    Success")
+            counts['successful'] += 1
+            print(f"[{done:3d}/{total}] Success: {port['name']}")
         else:
-            failed += 1
-            print(f"    Failed: {result.get('error', 'Unknown error')}")
+            counts['failed'] += 1
+            print(f"[{done:3d}/{total}] Failed: {port['name']} - {result.get('error', 'Unknown error')}")
         
         # Progress update every 50 ports
-        if i % 50 == 0:
-            print(f"\nProgress: {i}/{len(ports)} ({i/len(ports)*100:.1f}%)")
-            print(f"   Successful: {successful}, Failed: {failed}\n")
-        
-        # Add delay to avoid overwhelming BMKG API
-        import time
-        time.sleep(0.5)  # 500ms delay between requests
+        if done % 50 == 0:
+            print(f"\nProgress: {done}/{total} ({done/total*100:.1f}%)")
+            print(f"   Successful: {counts['successful']}, Failed: {counts['failed']}\n")
+    
+    results, _ = collect_ports(
+        ports,
+        lambda port: request_port_weather(port['name'], port['lat'], port['lon']),
+        on_result=report_progress,
+    )
+    successful, failed = counts['successful'], counts['failed']
+    get_response_cache().print_report()
     
     # Final summary
     print("\n" + "=" * 50)
@@ -154,11 +134,14 @@ def main():
     
     # Save results
     filename = "pelabuhan_weather_data.json"
-    with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(results, file, indent=2, ensure_ascii=False)
+    file_size = write_json(filename, results)
+    append_records(PORT, results)
+    
+    write_compressed_sidecars(filename)
+    write_layer_tiles('port', filename)
     
     print(f"\nResults saved to: {filename}")
-    print(f"File size: {len(json.dumps(results))/1024/1024:.1f} MB")
+    print(f"File size: {file_size/1024/1024:.1f} MB")
     
     if successful > 0:
         print(f"\nReady to integrate {successful} ports into your weather map!")
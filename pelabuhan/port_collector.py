@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Adaptive-Concurrency Port Collector
+Runs one request per port with a concurrency limit that follows the BMKG
+origin instead of a fixed sleep or a fixed pool size (AIMD):
+
+- additive increase: +1 worker per window of healthy responses
+  (a window is as many completions as the current limit)
+- multiplicative decrease: limit x DECREASE_FACTOR on 429, 5xx, timeouts /
+  connection errors, or a latency spike (LATENCY_SPIKE_FACTOR x baseline),
+  at most once per window
+- 429 also pauses new requests for RATE_LIMIT_PAUSE seconds
+
+Congested requests are retried; other failures (e.g. 404 for an unknown
+slug, or a body that does not parse) are final and do not count against the
+origin. The latency baseline also follows slow responses, at a lower rate,
+so a lasting rise in origin latency stops counting as congestion. The run summary shows
+the concurrency/throughput curve.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bmkg_client import get_bmkg_client
+
+MIN_CONCURRENCY = 1
+INITIAL_CONCURRENCY = 2
+MAX_CONCURRENCY = 16
+DECREASE_FACTOR = 0.5
+
+# A response slower than this multiple of the healthy baseline is congestion
+LATENCY_SPIKE_FACTOR = 2.5
+# Healthy responses needed before latency spikes are judged
+LATENCY_WARMUP = 5
+LATENCY_EWMA_ALPHA = 0.1
+# Slow (latency spike) responses still move the baseline, more slowly: if the
+# origin's latency rises for good, the limit recovers after ~1/alpha requests
+LATENCY_SPIKE_EWMA_ALPHA = 0.05
+
+# Task exceptions that mean the origin could not be reached (congestion);
+# anything else a task raises is a final failure of that item
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, OSError)
+
+RATE_LIMIT_PAUSE = 2.0
+MAX_RETRIES = 2
+CURVE_BUCKET_SECONDS = 5.0
+
+
+def is_congestion(status, latency, baseline):
+    """True when a response says the origin is overloaded"""
+    if status is None or status == 429 or status >= 500:
+        return True
+    return baseline is not None and latency > LATENCY_SPIKE_FACTOR * baseline
+
+
+class AIMDController:
+    """Concurrency limit driven by response outcomes (single-threaded use)"""
+
+    def __init__(self, initial=INITIAL_CONCURRENCY, minimum=MIN_CONCURRENCY, maximum=MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.baseline = None
+        self.healthy_samples = 0
+        self.last_decrease = float('-inf')
+        self.paused_until = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def window(self):
+        return int(self.limit)
+
+    def on_response(self, status, latency, dispatched_at, now):
+        """Update the limit with one completed request; returns True if it was congestion"""
+        baseline = self.baseline if self.healthy_samples >= LATENCY_WARMUP else None
+        if is_congestion(status, latency, baseline):
+            if status is not None and status != 429 and status < 500:
+                # Answered, only slowly: let the baseline catch up with the origin
+                self.baseline += LATENCY_SPIKE_EWMA_ALPHA * (latency - self.baseline)
+            if status == 429:
+                self.paused_until = max(self.paused_until, now + RATE_LIMIT_PAUSE)
+            # Requests sent before the last cut saw the old limit; don't cut twice for them
+            if dispatched_at > self.last_decrease:
+                self.limit = max(self.minimum, self.limit * DECREASE_FACTOR)
+                self.last_decrease = now
+                self.decreases += 1
+            return True
+
+        self.healthy_samples += 1
+        if self.baseline is None:
+            self.baseline = latency
+        else:
+            self.baseline += LATENCY_EWMA_ALPHA * (latency - self.baseline)
+        if self.limit < self.maximum:
+            window = self.window
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self.increases += int(self.window > window)
+        return False
+
+
+def summarize_curve(samples, bucket_seconds=CURVE_BUCKET_SECONDS):
+    """
+    Bucket (elapsed, limit, congested) completion samples into
+    [{'start', 'end', 'limit_min', 'limit_max', 'requests_per_second', 'congested'}]
+    """
+    buckets = {}
+    for elapsed, limit, congested in samples:
+        bucket = buckets.setdefault(int(elapsed // bucket_seconds),
+                                    {'limits': [], 'completed': 0, 'congested': 0})
+        bucket['limits'].append(limit)
+        bucket['completed'] += 1
+        bucket['congested'] += int(congested)
+    curve = []
+    for index in sorted(buckets):
+        bucket = buckets[index]
+        curve.append({
+            'start': index * bucket_seconds,
+            'end': (index + 1) * bucket_seconds,
+            'limit_min': min(bucket['limits']),
+            'limit_max': max(bucket['limits']),
+            'requests_per_second': bucket['completed'] / bucket_seconds,
+            'congested': bucket['congested'],
+        })
+    return curve
+
+
+def print_run_summary(stats):
+    print(f"\n📈 Concurrency / throughput ({stats['completed']} requests in {stats['elapsed']:.1f}s, "
+          f"{stats['requests_per_second']:.1f} req/s, {stats['retries']} retries)")
+    print(f"   Limit: {stats['initial_limit']} -> peak {stats['peak_limit']} -> final {stats['final_limit']} "
+          f"({stats['increases']} increases, {stats['decreases']} decreases)")
+    peak = max((bucket['requests_per_second'] for bucket in stats['curve']), default=0) or 1
+    for bucket in stats['curve']:
+        bar = '█' * max(1, round(bucket['requests_per_second'] / peak * 30))
+        congested = f"  ⚠️ {bucket['congested']} congested" if bucket['congested'] else ""
+        span = f"{bucket['start']:.0f}-{bucket['end']:.0f}s"
+        print(f"   {span:>9}  limit {bucket['limit_min']:2d}-{bucket['limit_max']:<2d} "
+              f"{bucket['requests_per_second']:5.1f} req/s {bar}{congested}")
+
+
+def collect(items, task, max_concurrency=MAX_CONCURRENCY, initial_concurrency=INITIAL_CONCURRENCY,
+            max_retries=MAX_RETRIES, on_result=None):
+    """
+    Run `task(item)` for every item under an AIMD concurrency limit.
+
+    `task` returns (result, status) where status is the HTTP status code, or
+    None for a transport error. Returns (results in input order, stats).
+    `on_result(index, item, result, done, total)` is called as items finish.
+    """
+    controller = AIMDController(initial_concurrency, maximum=max_concurrency)
+    results = [None] * len(items)
+    pending = list(range(len(items)))
+    pending.reverse()  # pop() from the end keeps input order
+    attempts = [0] * len(items)
+    in_flight = {}
+    samples = []
+    done = retries = 0
+    start_time = time.monotonic()
+    peak_limit = controller.window
+
+    def timed(index):
+        started = time.monotonic()
+        failed = False
+        try:
+            result, status = task(items[index])
+        except TRANSPORT_ERRORS as e:
+            print(f"❌ Transport error for item {index}: {e}")
+            result, status = None, None
+        except Exception as e:
+            # Says nothing about the origin's load: final, not congestion
+            print(f"❌ Task error for item {index}: {e}")
+            result, status, failed = None, None, True
+        return result, status, failed, started, time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        while pending or in_flight:
+            now = time.monotonic()
+            if now >= controller.paused_until:
+                while pending and len(in_flight) < controller.window:
+                    index = pending.pop()
+                    attempts[index] += 1
+                    in_flight[executor.submit(timed, index)] = index
+
+            if not in_flight:
+                time.sleep(max(0.0, controller.paused_until - now))
+                continue
+            # While paused, wake up in time to resume dispatching
+            timeout = controller.paused_until - now if pending and controller.paused_until > now else None
+            finished, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                index = in_flight.pop(future)
+                result, status, failed, started, latency = future.result()
+                congested = not failed and controller.on_response(status, latency, started, time.monotonic())
+                peak_limit = max(peak_limit, controller.window)
+                samples.append((time.monotonic() - start_time, controller.window, congested))
+
+                # Slow but successful responses only slow the limit down; rejected ones are retried
+                if not failed and (status is None or status == 429 or status >= 500):
+                    if attempts[index] <= max_retries:
+                        retries += 1
+                        pending.append(index)
+                        continue
+                results[index] = result
+                done += 1
+                if on_result:
+                    on_result(index, items[index], result, done, len(items))
+
+    elapsed = time.monotonic() - start_time
+    stats = {
+        'completed': done,
+        'elapsed': elapsed,
+        'requests_per_second': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'retries': retries,
+        'initial_limit': int(initial_concurrency),
+        'peak_limit': peak_limit,
+        'final_limit': controller.window,
+        'increases': controller.increases,
+        'decreases': controller.decreases,
+        'baseline_latency': controller.baseline,
+        'curve': summarize_curve(samples),
+    }
+    return results, stats
+
+
+def collect_ports(items, task, max_concurrency=MAX_CONCURRENCY, on_result=None):
+    """collect() over the shared BMKG client, limited to its connection pool"""
+    client = get_bmkg_client(pool_size=max_concurrency)
+    if client.pool_size < max_concurrency:
+        print(f"⚠️  Concurrency capped at {client.pool_size} (BMKG connection pool size), not {max_concurrency}")
+        max_concurrency = client.pool_size
+    results, stats = collect(items, task, max_concurrency=max_concurrency, on_result=on_result)
+    print_run_summary(stats)
+    client.print_timing_report()
+    return results, stats
@@ -6,7 +6,10 @@ import time
 
 # Add pelabuhan folder to path for imports
 sys.path.append('pelabuhan')
+# Add project root to path to import shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from pelabuhan_weather import main as collect_weather_data
+from snapshot_store import get_snapshot_store
 
 def check_data_freshness():
     """Check if pelabuhan_weather_data.json is current (less than 24 hours old)"""
@@ -32,17 +35,16 @@ def check_data_freshness():
         return True
 
 def backup_old_data():
-    """Create a backup of the old data file"""
+    """Snapshot the old data file into the deduplicated snapshot store"""
     filename = "pelabuhan/pelabuhan_weather_data.json"
     if os.path.exists(filename):
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_name = f"pelabuhan/pelabuhan_weather_data_backup_{timestamp}.json"
-        
         try:
-            with open(filename, 'r', encoding='utf-8') as source:
-                with open(backup_name, 'w', encoding='utf-8') as backup:
-                    backup.write(source.read())
-            print(f"💾 Backup created: {backup_name}")
+            store = get_snapshot_store()
+            snapshot, stored = store.save_file('pelabuhan_weather_data', filename,
+                                               taken_at=os.path.getmtime(filename), delta=True)
+            removed, _ = store.prune('pelabuhan_weather_data')
+            state = "archived" if stored else "already archived"
+            print(f"💾 Snapshot {snapshot['sha256'][:12]} {state} ({removed} old snapshots pruned)")
         except Exception as e:
             print(f"⚠️  Warning: Could not create backup: {e}")
 
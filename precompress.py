@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Precompressed sidecar files for the data layers
+Writes <file>.gz (and <file>.br when the brotli package is installed) next to
+a data file so serve_local.py can send compressed bytes without compressing
+per request. Sidecars carry the mtime of their source file; the server only
+uses a sidecar whose mtime matches, so a stale sidecar is never served.
+
+Usage:
+    python precompress.py                 # regenerate sidecars for all data layers
+    python precompress.py path/to/file.json
+"""
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Data files written by the collectors and served to the map
+DATA_LAYER_FILES = [
+    'openmeteo/grid_weather_data_1degree.json',
+    'openmeteo/grid_weather_data_1degree.bin',
+    'openmeteo/city_weather_data.json',
+    'pelabuhan/pelabuhan_weather_data.json',
+    'pelabuhan/namaPelabuhan.json',
+    'maritime_weather/maritime_weather_data.json',
+]
+
+# Encoding name -> sidecar suffix, in server preference order
+SIDECAR_SUFFIXES = {
+    'br': '.br',
+    'gzip': '.gz',
+}
+
+# Files smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def _write_atomic(path, payload, mtime):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(payload)
+    os.utime(temp_path, (mtime, mtime))
+    os.replace(temp_path, path)
+
+
+def write_compressed_sidecars(path):
+    """(Re)generate the .gz/.br sidecars of `path`; returns {encoding: size}"""
+    written = {}
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        mtime = os.stat(path).st_mtime
+    except OSError as e:
+        print(f"⚠️  Could not read {path} for compression: {e}")
+        return written
+
+    if len(data) < MIN_COMPRESS_SIZE:
+        remove_compressed_sidecars(path)
+        return written
+
+    encoders = {'gzip': lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['br'] = lambda raw: brotli.compress(raw, quality=11)
+
+    for encoding, encode in encoders.items():
+        sidecar = path + SIDECAR_SUFFIXES[encoding]
+        try:
+            payload = encode(data)
+            _write_atomic(sidecar, payload, mtime)
+            written[encoding] = len(payload)
+        except OSError as e:
+            print(f"⚠️  Could not write {sidecar}: {e}")
+    return written
+
+
+def remove_compressed_sidecars(path):
+    for suffix in SIDECAR_SUFFIXES.values():
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def find_sidecar(path, encoding, source_mtime_ns):
+    """Path of a fresh sidecar for `encoding`, or None"""
+    sidecar = path + SIDECAR_SUFFIXES[encoding]
+    try:
+        stat = os.stat(sidecar)
+    except OSError:
+        return None
+    # Sidecars are stamped with the source mtime when written
+    if abs(stat.st_mtime_ns - source_mtime_ns) > 1_000_000:
+        return None
+    return sidecar, stat
+
+
+def main():
+    base = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(base, p) for p in DATA_LAYER_FILES]
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        written = write_compressed_sidecars(path)
+        sizes = ", ".join(f"{enc} {size / 1024:.1f} KB" for enc, size in written.items()) or "skipped"
+        print(f"🗜️  {os.path.relpath(path, base)} ({os.path.getsize(path) / 1024:.1f} KB) -> {sizes}")
+    if brotli is None:
+        print("ℹ️  Install 'brotli' to also generate .br sidecars")
+
+
+if __name__ == "__main__":
+    main()
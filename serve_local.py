@@ -2,55 +2,812 @@
 """
 Simple HTTP Server to serve local files and avoid CORS issues
 Run this script in your project directory, then open cuaca.html in your browser
+
+Usage:
+    python serve_local.py                       # development: opens the browser
+    python serve_local.py serve --workers 32    # production: threaded HTTP/1.1 keep-alive
+    python serve_local.py loadtest --requests 5000 --connections 16
+    python serve_local.py loadtest --connections 16 --idle-connections 200
 """
 
+import argparse
+import email.utils
+import gzip
+import http.client
 import http.server
-import socketserver
+import json
 import os
+import re
+import selectors
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
 import webbrowser
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from precompress import MIN_COMPRESS_SIZE, SIDECAR_SUFFIXES, find_sidecar
+from spatial_index import LayerIndexCache, parse_bbox
 
 # Configuration
 PORT = 8000
 DIRECTORY = os.getcwd()
+DEFAULT_WORKERS = 32
+KEEP_ALIVE_TIMEOUT = 15  # seconds an idle keep-alive connection is held open
+MAX_IDLE_CONNECTIONS = 512  # parked keep-alive connections; the oldest is closed beyond this
+SHUTDOWN_GRACE = 10  # seconds in-flight requests get to finish on shutdown
+
+# Data layers the map polls for updates (pinned in the hot cache, used by the load test)
+DATA_FILES = [
+    'openmeteo/grid_weather_data_1degree.json',
+    'openmeteo/city_weather_data.json',
+    'pelabuhan/pelabuhan_weather_data.json',
+]
+
+# Extensions whose responses must always be revalidated by the browser
+REVALIDATE_EXTENSIONS = ('.json', '.bin', '.npy')
+
+# Hot layer cache: data files served from memory instead of disk
+HOT_CACHE_BYTES = 64 * 1024 * 1024  # total memory budget across all entries
+HOT_FILE_MAX_BYTES = 8 * 1024 * 1024  # larger files always go through sendfile
+HOT_MIN_HITS = 3  # requests before a file that is not in DATA_FILES is cached
+
+# Bounding-box point query: /api/points?layer=grid&bbox=west,south,east,north&fields=a,b
+API_POINTS_PATH = '/api/points'
+API_MAX_LIMIT = 100000
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+def parse_accept_encoding(header):
+    """Set of content codings the client accepts (q=0 entries excluded)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        pieces = part.strip().split(';')
+        coding = pieces[0].strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+    return accepted
+
+def make_etag(stat, encoding=None):
+    """Strong validator from size + mtime; each content coding gets its own tag"""
+    tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    if encoding:
+        tag += f"-{encoding}"
+    return f'"{tag}"'
+
+def parse_range(header, size):
+    """(start, end) of a single satisfiable byte range, None to ignore, False if unsatisfiable"""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None  # multiple or malformed ranges: send the full entity
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+class MemoryBody:
+    """Response body served from an in-memory buffer (no copy for slices)"""
+
+    def __init__(self, buffer, start=0, length=None):
+        view = memoryview(buffer)
+        self.view = view[start:start + length] if length is not None else view[start:]
+
+    def close(self):
+        self.view.release()
+
+class FileBody:
+    """Response body streamed from an open file, via os.sendfile when possible"""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+
+    def close(self):
+        self.file.close()
+
+class HotLayerCache:
+    """
+    Keeps hot data layers in memory as ready-to-send byte buffers, one per
+    content coding. An entry is reused while the file's (device, inode,
+    mtime, size) are unchanged; invalidate() drops everything (SIGHUP).
+    Files larger than `max_file_bytes` or requested fewer than `min_hits`
+    times are left to the sendfile path.
+    """
+
+    def __init__(self, max_bytes=HOT_CACHE_BYTES, max_file_bytes=HOT_FILE_MAX_BYTES,
+                 min_hits=HOT_MIN_HITS, pinned=()):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.min_hits = min_hits
+        self.pinned = {os.path.abspath(p) for p in pinned}
+        self.entries = OrderedDict()
+        self.hits = {}
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    @staticmethod
+    def _identity(stat):
+        return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def invalidate(self, path=None):
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+                self.size = 0
+            else:
+                entry = self.entries.pop(os.path.abspath(path), None)
+                if entry:
+                    self.size -= entry['bytes']
+            self.stats['invalidations'] += 1
+
+    def get(self, path, stat):
+        """Cached entry for `path` if it is hot and still current, else None"""
+        path = os.path.abspath(path)
+        identity = self._identity(stat)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry['identity'] == identity:
+                self.entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry
+            if entry:
+                # File was replaced or rewritten since it was cached
+                self.entries.pop(path)
+                self.size -= entry['bytes']
+            if stat.st_size > self.max_file_bytes:
+                return None
+            hits = self.hits.get(path, 0) + 1
+            self.hits[path] = hits
+            if path not in self.pinned and hits < self.min_hits:
+                return None
+
+        entry = self._load(path, identity)
+        if entry is None:
+            return None
+        with self.lock:
+            self.entries[path] = entry
+            self.size += entry['bytes']
+            self.stats['loads'] += 1
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted['bytes']
+        return entry
+
+    def _load(self, path, identity):
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if self._identity(stat) != identity:
+            return None  # changed while reading; serve from disk this time
+
+        representations = {None: data}
+        if len(data) >= MIN_COMPRESS_SIZE:
+            for encoding in SIDECAR_SUFFIXES:
+                found = find_sidecar(path, encoding, stat.st_mtime_ns)
+                if found:
+                    try:
+                        with open(found[0], 'rb') as file:
+                            representations[encoding] = file.read()
+                    except OSError:
+                        pass
+            if 'gzip' not in representations:
+                representations['gzip'] = gzip.compress(data, compresslevel=6, mtime=0)
+        return {
+            'identity': identity,
+            'stat': stat,
+            'representations': representations,
+            'bytes': sum(len(body) for body in representations.values()),
+        }
 
 class CORSHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between requests; every response
+    # therefore needs an accurate Content-Length
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEP_ALIVE_TIMEOUT
+
+    def handle(self):
+        # Serve the requests that have arrived, then return: an idle
+        # keep-alive connection is parked by the server (IdleConnections)
+        # instead of holding this worker until the client speaks again
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._input_buffered():
+            self.handle_one_request()
+
+    def _input_buffered(self):
+        """True if a pipelined request is already in rfile's buffer"""
+        self.connection.settimeout(0)
+        try:
+            # Returns the buffer without blocking; b'' if it is empty
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
     def end_headers(self):
         # Add CORS headers to allow cross-origin requests
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Cache-Control, Pragma, If-None-Match, If-Modified-Since, Range')
+        self.send_header('Access-Control-Expose-Headers', 'ETag, Last-Modified, Content-Length, Content-Range')
         super().end_headers()
-    
+
     def do_OPTIONS(self):
         # Handle preflight requests
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
 
-def main():
+    def log_message(self, format, *args):
+        if not getattr(self.server, 'quiet', False):
+            super().log_message(format, *args)
+
+    def _not_modified(self, etag, stat):
+        """Evaluate If-None-Match / If-Modified-Since against the current file"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            if if_none_match.strip() == '*':
+                return True
+            candidates = [tag.strip() for tag in if_none_match.split(',')]
+            # Weak comparison is allowed for If-None-Match
+            return etag in candidates or f"W/{etag}" in candidates
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(stat.st_mtime) <= int(since)
+        return False
+
+    def _select_representation(self, path, stat, cached=None):
+        """Pick the best content coding the client accepts that we have"""
+        accepted = parse_accept_encoding(self.headers.get('Accept-Encoding'))
+        for encoding in SIDECAR_SUFFIXES:
+            if encoding not in accepted:
+                continue
+            if cached is not None:
+                if encoding in cached['representations']:
+                    return encoding, None, len(cached['representations'][encoding])
+                continue
+            found = find_sidecar(path, encoding, stat.st_mtime_ns)
+            if found:
+                return encoding, found[0], found[1].st_size
+        return None, path, stat.st_size
+
+    def _send_json(self, status, payload, etag=None):
+        """Send a JSON API response (gzip when accepted); returns the body"""
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        encoding = None
+        if len(body) >= MIN_COMPRESS_SIZE and 'gzip' in parse_accept_encoding(self.headers.get('Accept-Encoding')):
+            body = gzip.compress(body, compresslevel=5, mtime=0)
+            encoding = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        return MemoryBody(body)
+
+    def _send_points(self, query):
+        """Points of one layer inside a bbox, reduced to the requested fields"""
+        params = parse_qs(query)
+        layer = params.get('layer', [''])[0]
+        layer_index = self.server.layer_index
+        if layer not in layer_index.layers:
+            return self._send_json(400, {'error': f"layer must be one of: {', '.join(layer_index.layers)}"})
+        try:
+            bbox = parse_bbox(params.get('bbox', [''])[0])
+            limit = int(params['limit'][0]) if 'limit' in params else None
+        except ValueError as e:
+            return self._send_json(400, {'error': str(e)})
+        if limit is not None and not 0 <= limit <= API_MAX_LIMIT:
+            return self._send_json(400, {'error': f"limit must be between 0 and {API_MAX_LIMIT}"})
+        fields = None
+        if 'fields' in params:
+            fields = [field.strip() for field in params['fields'][0].split(',') if field.strip()]
+
+        try:
+            index, stat = layer_index.get(layer)
+        except FileNotFoundError as e:
+            return self._send_json(404, {'error': str(e)})
+        except (OSError, ValueError) as e:
+            return self._send_json(500, {'error': f"Could not load layer '{layer}': {e}"})
+
+        # Same data + same query -> same response
+        etag = make_etag(stat).rstrip('"') + f'-{zlib.crc32(query.encode("utf-8")):x}"'
+        if self._not_modified(etag, stat):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return None
+
+        points = index.select(bbox, fields, limit)
+        return self._send_json(200, {
+            'layer': layer,
+            'bbox': list(bbox),
+            'total': len(index),
+            'count': len(points),
+            'fields': fields if fields is not None else index.fields,
+            'points': points,
+        }, etag=etag)
+
+    def send_head(self):
+        """Serve files with validators, precompressed variants and byte ranges"""
+        request_url = urlsplit(self.path)
+        if request_url.path == API_POINTS_PATH:
+            return self._send_points(request_url.query)
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or self.path.endswith('/') or not os.path.isfile(path):
+            return super().send_head()
+
+        try:
+            source_stat = os.stat(path)
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        hot_cache = getattr(self.server, 'hot_cache', None)
+        cached = hot_cache.get(path, source_stat) if hot_cache else None
+        if cached is not None:
+            source_stat = cached['stat']
+
+        encoding, body_path, size = self._select_representation(path, source_stat, cached)
+        etag = make_etag(source_stat, encoding)
+        last_modified = self.date_time_string(source_stat.st_mtime)
+
+        def send_common_headers():
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Accept-Ranges', 'bytes')
+            if path.endswith(REVALIDATE_EXTENSIONS):
+                self.send_header('Cache-Control', 'no-cache')
+
+        if self._not_modified(etag, source_stat):
+            self.send_response(304)
+            send_common_headers()
+            self.end_headers()
+            return None
+
+        file = None
+        if cached is None:
+            try:
+                file = open(body_path, 'rb')
+            except OSError:
+                self.send_error(404, "File not found")
+                return None
+
+        byte_range = None
+        range_header = self.headers.get('Range')
+        if range_header:
+            # If-Range: only honour the range if the client's copy is current
+            if_range = self.headers.get('If-Range')
+            if not if_range or if_range.strip() in (etag, last_modified):
+                byte_range = parse_range(range_header, size)
+
+        if byte_range is False:
+            if file:
+                file.close()
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.send_header('Content-Length', '0')
+            send_common_headers()
+            self.end_headers()
+            return None
+
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            start, length = 0, size
+            self.send_response(200)
+
+        if cached is not None:
+            body = MemoryBody(cached['representations'][encoding], start, length)
+        else:
+            body = FileBody(file, start, length)
+
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(length))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        send_common_headers()
+        self.end_headers()
+        return body
+
+    def copyfile(self, source, outputfile):
+        """Write a response body: memory buffers directly, files via sendfile"""
+        if isinstance(source, MemoryBody):
+            outputfile.write(source.view)
+            return
+        if not isinstance(source, FileBody):
+            return super().copyfile(source, outputfile)
+
+        # socket.sendfile uses os.sendfile where available (falling back to
+        # send() elsewhere) and waits for the socket to drain instead of
+        # failing with EAGAIN: the keep-alive timeout makes the socket
+        # non-blocking at the fd level
+        self.connection.sendfile(source.file, source.start, source.length)
+
+class IdleConnections:
+    """
+    Keep-alive connections between requests, watched by one selector thread.
+    A connection goes back to the worker pool only once it is readable (next
+    request or close), so idle clients never occupy workers. Connections idle
+    for longer than `timeout`, and the oldest ones beyond `max_idle`, are closed.
+    """
+
+    def __init__(self, dispatch, close, timeout=KEEP_ALIVE_TIMEOUT, max_idle=MAX_IDLE_CONNECTIONS):
+        self.dispatch = dispatch
+        self.close_connection = close
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.selector = selectors.DefaultSelector()
+        self.parked = OrderedDict()  # socket -> (client_address, parked at)
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.running = True
+        # Parking happens on worker threads; the selector is only touched by
+        # the watcher thread, which the wakeup socket interrupts
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self.selector.register(self._wakeup_reader, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self._watch, name='http-idle', daemon=True)
+        self.thread.start()
+
+    def __len__(self):
+        return len(self.parked)
+
+    def park(self, sock, client_address):
+        with self.lock:
+            if not self.running:
+                self.close_connection(sock)
+                return
+            self.pending.append((sock, client_address))
+        try:
+            self._wakeup_writer.send(b'\0')
+        except OSError:
+            pass  # wakeup buffer full: the watcher is about to run anyway
+
+    def _register_pending(self, now):
+        with self.lock:
+            pending, self.pending = self.pending, deque()
+        for sock, client_address in pending:
+            try:
+                self.selector.register(sock, selectors.EVENT_READ, client_address)
+            except (ValueError, OSError):
+                self.close_connection(sock)  # closed by the client meanwhile
+                continue
+            self.parked[sock] = (client_address, now)
+        while len(self.parked) > self.max_idle:
+            self._drop(next(iter(self.parked)))
+
+    def _drop(self, sock):
+        self.parked.pop(sock, None)
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        self.close_connection(sock)
+
+    def _watch(self):
+        while self.running:
+            events = self.selector.select(timeout=1.0)
+            now = time.monotonic()
+            for key, _ in events:
+                if key.fileobj is self._wakeup_reader:
+                    try:
+                        while self._wakeup_reader.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                sock = key.fileobj
+                self.selector.unregister(sock)
+                self.parked.pop(sock, None)
+                self.dispatch(sock, key.data)
+            self._register_pending(now)
+            expired = [sock for sock, (_, parked_at) in self.parked.items() if now - parked_at > self.timeout]
+            for sock in expired:
+                self._drop(sock)
+
+    def close(self):
+        """Stop watching and close every parked connection"""
+        with self.lock:
+            self.running = False
+        try:
+            self._wakeup_writer.send(b'\0')
+        except OSError:
+            pass
+        self.thread.join(2)
+        self._register_pending(time.monotonic())
+        for sock in list(self.parked):
+            self._drop(sock)
+        self.selector.close()
+        self._wakeup_reader.close()
+        self._wakeup_writer.close()
+
+
+class ThreadPoolHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """HTTP server that handles requests on a bounded worker pool"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, quiet=False,
+                 hot_cache=None, layer_index=None, max_idle=MAX_IDLE_CONNECTIONS):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.quiet = quiet
+        self.hot_cache = hot_cache
+        self.layer_index = layer_index or LayerIndexCache(DIRECTORY)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-worker')
+        self.idle = IdleConnections(self._dispatch, self.shutdown_request, max_idle=max_idle)
+
+    def process_request(self, request, client_address):
+        self._dispatch(request, client_address)
+
+    def _dispatch(self, request, client_address):
+        try:
+            self.executor.submit(self.process_connection, request, client_address)
+        except RuntimeError:
+            self.shutdown_request(request)  # executor already shut down
+
+    def process_connection(self, request, client_address):
+        """Serve the waiting request(s), then park the connection or close it"""
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+            self.shutdown_request(request)
+            return
+        if handler.close_connection:
+            self.shutdown_request(request)
+        else:
+            self.idle.park(request, client_address)
+
+    def graceful_close(self, grace=SHUTDOWN_GRACE):
+        """Stop accepting connections and let in-flight requests finish"""
+        self.server_close()
+        self.idle.close()
+        waiter = threading.Thread(target=self.executor.shutdown, kwargs={'wait': True}, daemon=True)
+        waiter.start()
+        waiter.join(grace)
+
+def run_server(port=PORT, workers=DEFAULT_WORKERS, open_browser=True, quiet=False,
+               hot_cache_bytes=HOT_CACHE_BYTES):
+    """Serve DIRECTORY until Ctrl+C / SIGTERM, then shut down gracefully"""
     # Change to the project directory
     os.chdir(DIRECTORY)
-    
-    # Create server
-    with socketserver.TCPServer(("", PORT), CORSHTTPRequestHandler) as httpd:
-        print(f"🚀 Server started at http://localhost:{PORT}")
-        print(f"📁 Serving files from: {DIRECTORY}")
-        print(f"🌐 Open your browser and go to: http://localhost:{PORT}/gis_cuaca.html")
-        print(f"⏹️  Press Ctrl+C to stop the server")
-        print("-" * 50)
-        
+
+    hot_cache = HotLayerCache(max_bytes=hot_cache_bytes, pinned=DATA_FILES) if hot_cache_bytes > 0 else None
+    layer_index = LayerIndexCache(DIRECTORY)
+    httpd = ThreadPoolHTTPServer(("", port), CORSHTTPRequestHandler, workers=workers, quiet=quiet,
+                                 hot_cache=hot_cache, layer_index=layer_index)
+    print(f"🚀 Server started at http://localhost:{port}")
+    print(f"📁 Serving files from: {DIRECTORY}")
+    print(f"🧵 Workers: {workers} | HTTP/1.1 keep-alive ({KEEP_ALIVE_TIMEOUT}s idle timeout)")
+    if hot_cache:
+        print(f"🔥 Hot layer cache: {hot_cache_bytes / 1024 / 1024:.0f} MB (SIGHUP flushes it)")
+    print(f"📍 Point queries: http://localhost:{port}{API_POINTS_PATH}?layer=grid&bbox=west,south,east,north")
+    print(f"🌐 Open your browser and go to: http://localhost:{port}/gis_cuaca.html")
+    print(f"⏹️  Press Ctrl+C to stop the server")
+    print("-" * 50)
+
+    def request_shutdown(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it from another thread
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_shutdown)
+    def flush_caches(signum, frame):
+        if hot_cache:
+            hot_cache.invalidate()
+        layer_index.invalidate()
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, flush_caches)
+
+    if open_browser:
         # Try to open the browser automatically
         try:
-            webbrowser.open(f'http://localhost:{PORT}/gis_cuaca.html')
+            webbrowser.open(f'http://localhost:{port}/gis_cuaca.html')
         except:
             print("Could not open browser automatically. Please open manually.")
-        
-        # Start serving
+
+    # Start serving
+    httpd.serve_forever()
+    print("\n🛑 Server stopping, waiting for in-flight requests...")
+    httpd.graceful_close()
+    print("🛑 Server stopped")
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run_load_test(base_url, paths, total_requests=2000, connections=16, idle_connections=0):
+    """
+    Hammer `paths` over keep-alive connections and report req/s and latency.
+    `idle_connections` extra clients make one request each and then sit idle
+    on their keep-alive connection for the whole run (browser tabs), which
+    must not slow the active ones down.
+    """
+    parts = urlsplit(base_url)
+    host = parts.hostname or 'localhost'
+    port = parts.port or 80
+    prefix = parts.path.rstrip('/')
+
+    latencies = []
+    errors = [0]
+    bytes_received = [0]
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker():
+        connection = http.client.HTTPConnection(host, port, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        local_bytes = 0
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            path = f"{prefix}/{paths[index % len(paths)]}"
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                body = response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                local_bytes += len(body)
+                if response.will_close:
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(host, port, timeout=30)
+            local_latencies.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+            bytes_received[0] += local_bytes
+
+    print(f"🔥 Load test: {total_requests} requests over {connections} keep-alive connections"
+          + (f", {idle_connections} idle connections held open" if idle_connections else ""))
+    for path in paths:
+        print(f"   - {prefix}/{path}")
+
+    idle = []
+    for _ in range(idle_connections):
+        connection = http.client.HTTPConnection(host, port, timeout=30)
         try:
-            httpd.serve_forever()
-        except KeyboardInterrupt:
-            print("\n🛑 Server stopped by user")
-            httpd.shutdown()
+            connection.request('GET', f"{prefix}/{paths[0]}")
+            connection.getresponse().read()
+            idle.append(connection)
+        except (OSError, http.client.HTTPException):
+            errors[0] += 1
+            connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(connections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # The idle connections should still be usable (unless the server closed
+    # them for exceeding its idle limits)
+    idle_reused = 0
+    for connection in idle:
+        try:
+            connection.request('GET', f"{prefix}/{paths[0]}")
+            connection.getresponse().read()
+            idle_reused += 1
+        except (OSError, http.client.HTTPException):
+            pass
+        connection.close()
+
+    latencies.sort()
+    results = {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'elapsed': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'megabytes': bytes_received[0] / 1024 / 1024,
+        'idle_connections': len(idle),
+        'idle_reused': idle_reused,
+    }
+    print("-" * 50)
+    print(f"✅ Requests: {results['requests']} ({results['errors']} errors) in {elapsed:.2f}s")
+    print(f"🚀 Throughput: {results['requests_per_second']:.1f} req/s "
+          f"({results['megabytes'] / elapsed if elapsed > 0 else 0:.1f} MB/s)")
+    print(f"⏱️  Latency: p50 {results['p50_ms']:.1f} ms | p99 {results['p99_ms']:.1f} ms")
+    if idle:
+        print(f"💤 Idle connections still open afterwards: {idle_reused}/{len(idle)}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Local weather map server")
+    subparsers = parser.add_subparsers(dest='command')
+
+    serve_parser = subparsers.add_parser('serve', help="production mode: no browser, quiet logs")
+    serve_parser.add_argument('--port', type=int, default=PORT)
+    serve_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    serve_parser.add_argument('--verbose', action='store_true', help="log every request")
+    serve_parser.add_argument('--hot-cache-mb', type=int, default=HOT_CACHE_BYTES // (1024 * 1024),
+                              help="memory budget for hot data layers (0 disables)")
+
+    load_parser = subparsers.add_parser('loadtest', help="benchmark a running server")
+    load_parser.add_argument('--url', default=f"http://localhost:{PORT}")
+    load_parser.add_argument('--requests', type=int, default=2000)
+    load_parser.add_argument('--connections', type=int, default=16)
+    load_parser.add_argument('--idle-connections', type=int, default=0,
+                             help="keep-alive connections held open idle during the run")
+    load_parser.add_argument('paths', nargs='*', help="paths to request (default: data layers)")
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        run_server(port=args.port, workers=args.workers, open_browser=False, quiet=not args.verbose,
+                   hot_cache_bytes=args.hot_cache_mb * 1024 * 1024)
+    elif args.command == 'loadtest':
+        paths = args.paths or [p for p in DATA_FILES if Path(DIRECTORY, p).exists()] or DATA_FILES
+        results = run_load_test(args.url, paths, total_requests=args.requests, connections=args.connections,
+                                idle_connections=args.idle_connections)
+        return 1 if results['errors'] else 0
+    else:
+        run_server()
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Content-addressed snapshot archive for the collectors' data files
+Replaces the timestamped full-copy backups. Every snapshot is hashed
+(SHA-256) and its bytes are stored once per dataset. A snapshot identical to
+the latest one is not stored again, and an older identical body is reused.
+Bodies are compressed with zstd (when the zstandard package is installed)
+or gzip. With delta=True a body is stored as a line delta against the
+previous snapshot whenever that is smaller, with at most MAX_DELTA_CHAIN
+deltas between full copies.
+
+Layout (BMKG_SNAPSHOT_PATH overrides the root):
+    snapshots/<dataset>/catalog.json               snapshots and stored objects
+    snapshots/<dataset>/objects/<sha256>.<kind>.<codec>
+
+prune() applies a retention policy: the newest snapshot of each of the last
+N hours / days / weeks is kept (plus the latest), and objects no kept
+snapshot needs are deleted.
+
+Usage:
+    from snapshot_store import get_snapshot_store
+    store = get_snapshot_store()
+    store.save_file('city_weather_data', 'city_weather_data.json', delta=True)
+    store.prune('city_weather_data')
+    store.restore('city_weather_data', 'city_weather_data.json', at='2025-08-28T09:53')
+
+    python snapshot_store.py                                  # datasets, snapshots and disk use
+    python snapshot_store.py restore <dataset> <path> [at]   # at: sha256 prefix or ISO time
+    python snapshot_store.py prune [dataset]
+    python snapshot_store.py import <dataset> <backup files...>
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from json_writer import AtomicFile, write_json
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SNAPSHOT_PATH = os.environ.get('BMKG_SNAPSHOT_PATH', os.path.join(PROJECT_ROOT, 'snapshots'))
+
+# Newest snapshot kept per bucket, for the most recent N buckets
+DEFAULT_RETENTION = {'hourly': 24, 'daily': 14, 'weekly': 8}
+MAX_DELTA_CHAIN = 10
+# Lines per window when looking for runs shared with the previous snapshot
+DELTA_WINDOW = 4
+
+FULL = 'full'
+DELTA = 'delta'
+ZSTD = 'zst'
+GZIP = 'gz'
+
+BACKUP_TIMESTAMP_RE = re.compile(r'(\d{8}_\d{6})')
+
+
+def _compress(raw, codec):
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=19).compress(raw)
+    return gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def _decompress(data, codec):
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst snapshots")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def make_delta(base, raw):
+    """
+    Line delta turning `base` into `raw`: a JSON list of [start, count] copies
+    from base lines and inserted text (bytes as latin-1, which round-trips).
+    Runs are found rsync-style through an index of DELTA_WINDOW-line windows
+    of `base`, so this stays linear in the number of lines.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = raw.splitlines(keepends=True)
+    windows = {}
+    for i in range(len(base_lines) - DELTA_WINDOW + 1):
+        windows.setdefault(tuple(base_lines[i:i + DELTA_WINDOW]), i)
+
+    ops = []
+    inserted = []
+    expected = 0  # where the base would continue if only the last lines changed
+    j = 0
+    while j < len(lines):
+        window = tuple(lines[j:j + DELTA_WINDOW])
+        if len(window) == DELTA_WINDOW and tuple(base_lines[expected:expected + DELTA_WINDOW]) == window:
+            start = expected
+        else:
+            start = windows.get(window)
+        if start is None:
+            inserted.append(lines[j])
+            j += 1
+            expected += 1
+            continue
+        if inserted:
+            ops.append(b''.join(inserted).decode('latin-1'))
+            inserted = []
+        count = len(window)
+        while (start + count < len(base_lines) and j + count < len(lines)
+               and base_lines[start + count] == lines[j + count]):
+            count += 1
+        ops.append([start, count])
+        j += count
+        expected = start + count
+    if inserted:
+        ops.append(b''.join(inserted).decode('latin-1'))
+    return json.dumps(ops, separators=(',', ':')).encode('ascii')
+
+
+def apply_delta(base, delta):
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op.encode('latin-1'))
+        else:
+            start, count = op
+            parts.extend(base_lines[start:start + count])
+    return b''.join(parts)
+
+
+def _bucket_keys(moment):
+    return {
+        'hourly': moment.strftime('%Y-%m-%d %H'),
+        'daily': moment.strftime('%Y-%m-%d'),
+        'weekly': '%d-W%02d' % moment.isocalendar()[:2],
+    }
+
+
+def retained(snapshots, policy=DEFAULT_RETENTION, now=None):
+    """
+    The snapshots a retention policy keeps: the latest, plus the newest one
+    in each of the last policy[period] hours / days / weeks
+    """
+    if not snapshots:
+        return []
+    now = datetime.fromtimestamp(now if now is not None else time.time())
+    cutoffs = {
+        'hourly': now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=policy.get('hourly', 0) - 1),
+        'daily': now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=policy.get('daily', 0) - 1),
+        'weekly': (now.replace(hour=0, minute=0, second=0, microsecond=0)
+                   - timedelta(days=now.weekday(), weeks=policy.get('weekly', 0) - 1)),
+    }
+    keep = {id(snapshots[-1])}
+    seen = {period: set() for period in cutoffs}
+    for snapshot in reversed(snapshots):  # newest first
+        moment = datetime.fromtimestamp(snapshot['taken_at'])
+        for period, key in _bucket_keys(moment).items():
+            if policy.get(period, 0) > 0 and moment >= cutoffs[period] and key not in seen[period]:
+                seen[period].add(key)
+                keep.add(id(snapshot))
+    return [snapshot for snapshot in snapshots if id(snapshot) in keep]
+
+
+class SnapshotStore:
+    """Deduplicated, compressed snapshots of data files, one catalog per dataset"""
+
+    def __init__(self, root=DEFAULT_SNAPSHOT_PATH, codec=None):
+        self.root = root
+        self.codec = codec or (ZSTD if zstandard is not None else GZIP)
+        self._lock = threading.Lock()
+
+    def _dataset_path(self, dataset, *parts):
+        if not re.fullmatch(r'[\w.-]+', dataset):
+            raise ValueError(f"Invalid dataset name: {dataset!r}")
+        return os.path.join(self.root, dataset, *parts)
+
+    def _catalog(self, dataset):
+        path = self._dataset_path(dataset, 'catalog.json')
+        if not os.path.exists(path):
+            return {'snapshots': [], 'objects': {}}
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def _save_catalog(self, dataset, catalog):
+        write_json(self._dataset_path(dataset, 'catalog.json'), catalog)
+
+    def datasets(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.exists(os.path.join(self.root, name, 'catalog.json')))
+
+    def snapshots(self, dataset):
+        """[{sha256, taken_at, time, size}] oldest first"""
+        return self._catalog(dataset)['snapshots']
+
+    def _read_object(self, dataset, objects, sha256):
+        entry = objects[sha256]
+        with open(self._dataset_path(dataset, 'objects', entry['file']), 'rb') as file:
+            raw = _decompress(file.read(), entry['codec'])
+        if entry['kind'] == DELTA:
+            raw = apply_delta(self._read_object(dataset, objects, entry['base']), raw)
+        return raw
+
+    def _write_object(self, dataset, objects, sha256, raw, base, delta):
+        stored, kind, chain = _compress(raw, self.codec), FULL, 0
+        if delta and base is not None and objects[base]['chain'] < MAX_DELTA_CHAIN:
+            base_raw = self._read_object(dataset, objects, base)
+            delta_stored = _compress(make_delta(base_raw, raw), self.codec)
+            if len(delta_stored) < len(stored):
+                stored, kind, chain = delta_stored, DELTA, objects[base]['chain'] + 1
+        filename = f"{sha256}.{kind}.{self.codec}"
+        os.makedirs(self._dataset_path(dataset, 'objects'), exist_ok=True)
+        with AtomicFile(self._dataset_path(dataset, 'objects', filename), binary=True) as file:
+            file.write(stored)
+        objects[sha256] = {'file': filename, 'kind': kind, 'codec': self.codec,
+                           'base': base if kind == DELTA else None, 'chain': chain,
+                           'size': len(raw), 'stored_size': len(stored)}
+
+    def save(self, dataset, raw, taken_at=None, delta=False):
+        """
+        Snapshot `raw` bytes; returns (snapshot, stored) where `stored` is
+        False when the bytes were already archived (nothing new was written)
+        """
+        sha256 = hashlib.sha256(raw).hexdigest()
+        taken_at = taken_at if taken_at is not None else time.time()
+        with self._lock:
+            catalog = self._catalog(dataset)
+            snapshots, objects = catalog['snapshots'], catalog['objects']
+            if snapshots and snapshots[-1]['sha256'] == sha256:
+                return snapshots[-1], False
+            stored = sha256 not in objects
+            if stored:
+                base = snapshots[-1]['sha256'] if snapshots else None
+                self._write_object(dataset, objects, sha256, raw, base, delta)
+            snapshot = {'sha256': sha256, 'taken_at': taken_at,
+                        'time': datetime.fromtimestamp(taken_at).isoformat(timespec='seconds'),
+                        'size': len(raw)}
+            snapshots.append(snapshot)
+            snapshots.sort(key=lambda entry: entry['taken_at'])
+            self._save_catalog(dataset, catalog)
+            return snapshot, stored
+
+    def save_file(self, dataset, path, taken_at=None, delta=False):
+        with open(path, 'rb') as file:
+            return self.save(dataset, file.read(), taken_at, delta)
+
+    def find(self, dataset, at=None):
+        """
+        The snapshot for `at`: None for the latest, a sha256 prefix, or an ISO
+        time (the newest snapshot taken at or before it)
+        """
+        snapshots = self.snapshots(dataset)
+        if not snapshots:
+            raise LookupError(f"No snapshots of {dataset}")
+        if at is None:
+            return snapshots[-1]
+        at = str(at)
+        matches = [snapshot for snapshot in snapshots if snapshot['sha256'].startswith(at.lower())]
+        if matches and re.fullmatch(r'[0-9a-fA-F]{6,64}', at):
+            return matches[-1]
+        try:
+            moment = datetime.fromisoformat(at).timestamp()
+        except ValueError:
+            raise LookupError(f"No snapshot of {dataset} matches {at!r}") from None
+        earlier = [snapshot for snapshot in snapshots if snapshot['taken_at'] <= moment]
+        if not earlier:
+            raise LookupError(f"No snapshot of {dataset} at or before {at}")
+        return earlier[-1]
+
+    def load(self, dataset, at=None):
+        """Bytes of a snapshot (see find), checked against its hash"""
+        snapshot = self.find(dataset, at)
+        raw = self._read_object(dataset, self._catalog(dataset)['objects'], snapshot['sha256'])
+        if hashlib.sha256(raw).hexdigest() != snapshot['sha256']:
+            raise ValueError(f"Snapshot {snapshot['sha256'][:12]} of {dataset} is corrupt")
+        return raw
+
+    def restore(self, dataset, path, at=None):
+        """Atomically replace `path` with a snapshot; returns the snapshot"""
+        snapshot = self.find(dataset, at)
+        raw = self.load(dataset, snapshot['sha256'])
+        with AtomicFile(path, binary=True) as file:
+            file.write(raw)
+        return snapshot
+
+    def prune(self, dataset, policy=DEFAULT_RETENTION, now=None):
+        """Apply a retention policy; returns (snapshots removed, bytes freed)"""
+        with self._lock:
+            catalog = self._catalog(dataset)
+            snapshots, objects = catalog['snapshots'], catalog['objects']
+            kept = retained(snapshots, policy, now)
+
+            # Objects the kept snapshots need, including the bases of their deltas
+            needed = set()
+            for snapshot in kept:
+                sha256 = snapshot['sha256']
+                while sha256 is not None and sha256 not in needed:
+                    needed.add(sha256)
+                    sha256 = objects[sha256]['base']
+
+            freed = 0
+            for sha256 in [sha256 for sha256 in objects if sha256 not in needed]:
+                entry = objects.pop(sha256)
+                try:
+                    os.remove(self._dataset_path(dataset, 'objects', entry['file']))
+                    freed += entry['stored_size']
+                except FileNotFoundError:
+                    pass
+            removed = len(snapshots) - len(kept)
+            catalog['snapshots'] = kept
+            self._save_catalog(dataset, catalog)
+            return removed, freed
+
+    def summary(self, dataset):
+        catalog = self._catalog(dataset)
+        objects = catalog['objects'].values()
+        return {
+            'snapshots': len(catalog['snapshots']),
+            'objects': len(catalog['objects']),
+            'deltas': sum(1 for entry in objects if entry['kind'] == DELTA),
+            'logical_bytes': sum(snapshot['size'] for snapshot in catalog['snapshots']),
+            'stored_bytes': sum(entry['stored_size'] for entry in objects),
+        }
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_snapshot_store(root=None):
+    """The process-wide SnapshotStore"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = SnapshotStore(root or DEFAULT_SNAPSHOT_PATH)
+        return _shared_store
+
+
+def backup_timestamp(path):
+    """Epoch time of a *_backup_YYYYmmdd_HHMMSS.json file name, else its mtime"""
+    match = BACKUP_TIMESTAMP_RE.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+    return os.path.getmtime(path)
+
+
+def import_backups(store, dataset, paths):
+    """Archive old full-copy backups (oldest first) and delete each once it restores byte-identical"""
+    for path in sorted(paths, key=backup_timestamp):
+        with open(path, 'rb') as file:
+            raw = file.read()
+        snapshot, stored = store.save(dataset, raw, backup_timestamp(path), delta=True)
+        if store.load(dataset, snapshot['sha256']) != raw:
+            print(f"❌ {path}: archived copy does not match, kept")
+            continue
+        os.remove(path)
+        print(f"📦 {path} -> {snapshot['sha256'][:12]} ({'stored' if stored else 'duplicate'}), removed")
+
+
+def main():
+    store = get_snapshot_store()
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ('list', [])
+    if command == 'restore' and len(args) >= 2:
+        snapshot = store.restore(args[0], args[1], args[2] if len(args) > 2 else None)
+        print(f"♻️  Restored {args[0]} {snapshot['sha256'][:12]} ({snapshot['time']}) -> {args[1]}")
+    elif command == 'prune':
+        for dataset in args or store.datasets():
+            removed, freed = store.prune(dataset)
+            print(f"🧹 {dataset}: removed {removed} snapshots, freed {freed / 1024:.1f} KB")
+    elif command == 'import' and len(args) >= 2:
+        import_backups(store, args[0], args[1:])
+    elif command == 'list':
+        print(f"🗄️  Snapshots in {store.root} ({store.codec})")
+        for dataset in store.datasets():
+            summary = store.summary(dataset)
+            print(f"   {dataset}: {summary['snapshots']} snapshots, {summary['objects']} objects "
+                  f"({summary['deltas']} deltas), {summary['logical_bytes'] / 1024 / 1024:.1f} MB -> "
+                  f"{summary['stored_bytes'] / 1024:.1f} KB on disk")
+            for snapshot in store.snapshots(dataset)[-5:]:
+                print(f"      {snapshot['time']}  {snapshot['sha256'][:12]}  {snapshot['size'] / 1024:.1f} KB")
+        if zstandard is None:
+            print("ℹ️  Install 'zstandard' to store new snapshots with zstd instead of gzip")
+    else:
+        print(__doc__)
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
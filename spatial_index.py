@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+In-memory spatial index over the map's point layers
+Loads the grid, city and port JSON snapshots into flat point records and a
+uniform cell index, so the server can answer "which points are inside this
+bounding box" without the browser downloading whole layers.
+A layer is re-read only when its file changes on disk.
+
+Usage:
+    python spatial_index.py grid 105,-8,115,-5 temperature_2m,wind_speed_10m
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Layer name -> candidate files, first existing one wins (paths are relative
+# to the project root)
+LAYER_SOURCES = {
+    'grid': ['openmeteo/grid_weather_data_1degree.json'],
+    'grid_adaptive': ['openmeteo/grid_weather_data_adaptive.json'],
+    'city': ['openmeteo/city_weather_data.json'],
+    'port': ['pelabuhan/pelabuhan_weather_data.json', 'pelabuhan/namaPelabuhan.json'],
+    # 'maritime' is deferred: maritime_weather_data.json, maritime_areas.json and
+    # perairan.json only carry area ids, names and slugs, and the map draws no
+    # area geometry, so there is no position to index until one is recorded
+}
+
+# Always returned, whatever `fields` asks for
+BASE_FIELDS = ('name', 'lat', 'lon')
+
+DEFAULT_CELL_SIZE = 1.0  # degrees; roughly one 1° grid point per cell
+
+
+def _scalar_items(mapping):
+    return {k: v for k, v in (mapping or {}).items()
+            if v is None or isinstance(v, (str, int, float, bool))}
+
+
+def _coordinates(record):
+    """(lat, lon) of a record in any of the layer formats, or None"""
+    if 'lat' in record and 'lon' in record:
+        return record['lat'], record['lon']
+    coordinates = record.get('coordinates') or {}
+    for lat_key, lon_key in (('lat', 'lon'), ('latitude', 'longitude')):
+        if lat_key in coordinates and lon_key in coordinates:
+            return coordinates[lat_key], coordinates[lon_key]
+    if 'latitude' in record and 'longitude' in record:
+        return record['latitude'], record['longitude']
+    return None
+
+
+def flatten_record(record, name=None):
+    """
+    Flat {field: scalar} view of one layer record: top-level scalars plus the
+    scalar values of weather_data. Returns None if it has no coordinates.
+    """
+    position = _coordinates(record)
+    if position is None:
+        return None
+    try:
+        lat, lon = float(position[0]), float(position[1])
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lon)):
+        return None
+
+    flat = _scalar_items(record)
+    weather = record.get('weather_data')
+    if isinstance(weather, dict):
+        for key, value in _scalar_items(weather).items():
+            flat.setdefault(key, value)
+    flat['name'] = name or record.get('name') or record.get('port_name')
+    flat['lat'] = lat
+    flat['lon'] = lon
+    return flat
+
+
+def layer_points(data):
+    """Flat point records from a parsed layer file (list or name -> record dict)"""
+    if isinstance(data, dict):
+        items = [flatten_record(record, name) for name, record in data.items() if isinstance(record, dict)]
+    else:
+        items = [flatten_record(record) for record in data if isinstance(record, dict)]
+    return [item for item in items if item is not None]
+
+
+class PointIndex:
+    """
+    Uniform-cell index over point records. Points are sorted by cell key
+    (row-major), so the points of consecutive cells in one row form one
+    contiguous slice and a bbox query touches one slice per row.
+    """
+
+    def __init__(self, points, cell_size=DEFAULT_CELL_SIZE):
+        self.points = points
+        self.cell_size = cell_size
+        self.lats = np.array([p['lat'] for p in points], dtype=np.float64)
+        self.lons = np.array([p['lon'] for p in points], dtype=np.float64)
+        self.fields = sorted({key for p in points for key in p})
+
+        if not points:
+            self.lat0 = self.lon0 = 0.0
+            self.rows = self.cols = 1
+            self.order = np.zeros(0, dtype=np.intp)
+            self.starts = np.zeros(2, dtype=np.intp)
+            return
+
+        self.lat0 = math.floor(self.lats.min() / cell_size) * cell_size
+        self.lon0 = math.floor(self.lons.min() / cell_size) * cell_size
+        rows = ((self.lats - self.lat0) // cell_size).astype(np.intp)
+        cols = ((self.lons - self.lon0) // cell_size).astype(np.intp)
+        self.rows = int(rows.max()) + 1
+        self.cols = int(cols.max()) + 1
+        keys = rows * self.cols + cols
+        self.order = np.argsort(keys, kind='stable')
+        self.starts = np.searchsorted(keys[self.order], np.arange(self.rows * self.cols + 1))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell_range(self, low, high, origin, count):
+        first = int((low - origin) // self.cell_size)
+        last = int((high - origin) // self.cell_size)
+        return max(first, 0), min(last, count - 1)
+
+    def query(self, west, south, east, north):
+        """Indices (into self.points, in layer order) of points inside the bbox"""
+        if not self.points:
+            return np.zeros(0, dtype=np.intp)
+        row_first, row_last = self._cell_range(south, north, self.lat0, self.rows)
+        col_first, col_last = self._cell_range(west, east, self.lon0, self.cols)
+        if row_first > row_last or col_first > col_last:
+            return np.zeros(0, dtype=np.intp)
+
+        slices = []
+        for row in range(row_first, row_last + 1):
+            begin = self.starts[row * self.cols + col_first]
+            end = self.starts[row * self.cols + col_last + 1]
+            if end > begin:
+                slices.append(self.order[begin:end])
+        if not slices:
+            return np.zeros(0, dtype=np.intp)
+
+        candidates = np.concatenate(slices)
+        # Edge cells are only partially covered; filter exactly
+        lats = self.lats[candidates]
+        lons = self.lons[candidates]
+        inside = (lats >= south) & (lats <= north) & (lons >= west) & (lons <= east)
+        return np.sort(candidates[inside])
+
+    def select(self, bbox, fields=None, limit=None):
+        """Records inside `bbox` reduced to BASE_FIELDS + `fields` (all fields if None)"""
+        indices = self.query(*bbox)
+        if limit is not None:
+            indices = indices[:limit]
+        if fields is None:
+            return [self.points[i] for i in indices]
+        keys = list(dict.fromkeys(list(BASE_FIELDS) + list(fields)))
+        return [{key: self.points[i].get(key) for key in keys} for i in indices]
+
+
+def parse_bbox(value):
+    """'west,south,east,north' (Leaflet's toBBoxString order) -> floats"""
+    try:
+        west, south, east, north = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError("bbox must be 'west,south,east,north'")
+    # inf would overflow the cell range arithmetic in PointIndex.query
+    if not all(math.isfinite(v) for v in (west, south, east, north)):
+        raise ValueError("bbox values must be finite numbers")
+    if west > east or south > north:
+        raise ValueError("bbox must have west <= east and south <= north")
+    return west, south, east, north
+
+
+class LayerIndexCache:
+    """
+    Spatial indexes of the layer files, built on first use and rebuilt when
+    the file's (device, inode, mtime, size) change.
+    """
+
+    def __init__(self, root='.', sources=None, cell_size=DEFAULT_CELL_SIZE):
+        self.root = root
+        self.sources = sources or LAYER_SOURCES
+        self.cell_size = cell_size
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @property
+    def layers(self):
+        return list(self.sources)
+
+    def _source_path(self, layer):
+        for relative in self.sources[layer]:
+            path = os.path.join(self.root, relative)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, layer):
+        """(index, stat) for `layer`; raises KeyError / FileNotFoundError"""
+        if layer not in self.sources:
+            raise KeyError(layer)
+        path = self._source_path(layer)
+        if path is None:
+            raise FileNotFoundError(f"No data file for layer '{layer}'")
+        stat = os.stat(path)
+        identity = (path, stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        with self.lock:
+            entry = self.entries.get(layer)
+            if entry and entry[0] == identity:
+                return entry[1], entry[2]
+
+        # Build outside the lock; a concurrent rebuild of the same file is harmless
+        with open(path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        index = PointIndex(layer_points(data), self.cell_size)
+        with self.lock:
+            self.entries[layer] = (identity, index, stat)
+        return index, stat
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__.strip().splitlines()[-1].strip())
+        return 1
+    layer, bbox = sys.argv[1], parse_bbox(sys.argv[2])
+    fields = sys.argv[3].split(',') if len(sys.argv) > 3 else None
+    cache = LayerIndexCache(os.path.dirname(os.path.abspath(__file__)))
+    index, _ = cache.get(layer)
+    points = index.select(bbox, fields)
+    print(f"📍 {layer}: {len(points)} of {len(index)} points inside {bbox}")
+    for point in points[:20]:
+        print(f"   {json.dumps(point, ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Pre-rendered point tile pyramid for the map layers
+Writes tiles/<layer>/<z>/<x>/<y>.json (XYZ / Web Mercator, like the
+basemaps) after each data refresh, so the browser only builds markers for
+the tiles in view. Points closer than CLUSTER_PIXELS on screen are merged
+into one feature: the point nearest to the cluster centroid is kept and
+carries the cluster size in `count`. The pyramid ends at the first zoom
+without merges (at most MAX_ZOOM); clients reuse that level when zoomed in
+further.
+
+Tile format (compact, one row per feature):
+    {"layer": "grid", "z": 5, "x": 25, "y": 16,
+     "fields": ["lat", "lon", "count", "name", "temperature_2m", ...],
+     "features": [[-6.0, 106.0, 4, "-6.0, 106.0", 28.4, ...], ...]}
+tiles/<layer>/meta.json lists the zoom range, fields and existing tiles.
+
+Usage:
+    python tile_pyramid.py              # rebuild all layers
+    python tile_pyramid.py grid city
+"""
+
+import json
+import math
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from precompress import write_compressed_sidecars
+from spatial_index import LAYER_SOURCES, layer_points
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+TILES_DIRECTORY = os.path.join(PROJECT_ROOT, 'tiles')
+
+TILE_LAYERS = ('grid', 'city', 'port')
+MIN_ZOOM = 4
+MAX_ZOOM = 12  # features are never merged at this zoom
+TILE_SIZE = 256
+CLUSTER_PIXELS = 48  # marker icons are 32 px; keep some space between them
+TILE_FORMAT_VERSION = 1
+
+# Per-point metadata the markers and popups never use
+EXCLUDED_FIELDS = ('timezone', 'utc_offset_seconds', 'fetched_at', 'latitude', 'longitude', 'status')
+MAX_MERCATOR_LAT = 85.0511287798
+
+
+def world_pixels(lats, lons, zoom):
+    """Web Mercator pixel coordinates of lat/lon arrays at `zoom`"""
+    scale = TILE_SIZE * (2 ** zoom)
+    lats = np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    x = (lons + 180.0) / 360.0 * scale
+    sin_lat = np.sin(np.radians(lats))
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def cluster_points(x, y, cell_pixels):
+    """
+    Merge points sharing a cell_pixels x cell_pixels screen cell.
+    Returns (representative indices, cluster sizes), in input order.
+    """
+    keys = np.floor(x / cell_pixels).astype(np.int64) * (1 << 32) + np.floor(y / cell_pixels).astype(np.int64)
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    centroid_x = np.bincount(inverse, weights=x) / counts
+    centroid_y = np.bincount(inverse, weights=y) / counts
+    distance = (x - centroid_x[inverse]) ** 2 + (y - centroid_y[inverse]) ** 2
+    # Sort by cluster, then distance: the first entry of each cluster is its representative
+    order = np.lexsort((distance, inverse))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = inverse[order][1:] != inverse[order][:-1]
+    representatives = order[first]
+    sizes = counts[inverse[representatives]]
+    keep = np.argsort(representatives)
+    return representatives[keep], sizes[keep]
+
+
+def tile_fields(points):
+    fields = []
+    for point in points:
+        for key in point:
+            if key not in fields and key not in EXCLUDED_FIELDS and key not in ('lat', 'lon'):
+                fields.append(key)
+    return ['lat', 'lon', 'count'] + fields
+
+
+def _json_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def build_tiles(points, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """
+    {(z, x, y): [feature rows]} for every non-empty tile, the field list and
+    the effective max zoom: the pyramid stops at the first zoom where no
+    points are merged, since deeper levels would only repeat it.
+    """
+    fields = tile_fields(points)
+    value_fields = fields[3:]
+    rows = [[_json_value(point.get(field)) for field in value_fields] for point in points]
+    lats = np.array([p['lat'] for p in points], dtype=np.float64)
+    lons = np.array([p['lon'] for p in points], dtype=np.float64)
+
+    tiles = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        x, y = world_pixels(lats, lons, zoom)
+        if zoom < max_zoom:
+            indices, sizes = cluster_points(x, y, CLUSTER_PIXELS)
+            if len(indices) == len(points):
+                max_zoom = zoom
+        else:
+            indices, sizes = np.arange(len(points)), np.ones(len(points), dtype=np.int64)
+        tile_x = (x[indices] // TILE_SIZE).astype(np.int64)
+        tile_y = (y[indices] // TILE_SIZE).astype(np.int64)
+        for index, size, tx, ty in zip(indices.tolist(), sizes.tolist(), tile_x.tolist(), tile_y.tolist()):
+            feature = [points[index]['lat'], points[index]['lon'], size] + rows[index]
+            tiles.setdefault((zoom, tx, ty), []).append(feature)
+        if zoom == max_zoom:
+            break
+    return tiles, fields, max_zoom
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(payload, file, ensure_ascii=False, separators=(',', ':'))
+    write_compressed_sidecars(path)
+
+
+def _remove_stale_versions(parent, name, keep=()):
+    for entry in os.listdir(parent):
+        if entry.startswith(f".{name}.v") and entry not in keep or entry == f".{name}.old":
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+def replace_directory(temp_directory, final_directory):
+    """
+    Put a freshly written tile tree in place of `final_directory` without a
+    moment where it is missing. The tree becomes the versioned directory
+    .<name>.v<ns> and `final_directory` is a relative symlink to it, switched
+    by renaming a new link over the old one, so a request sees either the
+    old tree or the new one. The version it replaced is kept until the next
+    switch, for requests that followed the old link just before it changed;
+    older ones are removed. Where symlinks cannot be created
+    (Windows without the privilege) it falls back to two renames, and
+    `final_directory` is missing between them.
+    """
+    parent, name = os.path.split(final_directory)
+    version = f".{name}.v{time.time_ns()}"
+    os.replace(temp_directory, os.path.join(parent, version))
+
+    link = os.path.join(parent, f".{name}.link")
+    try:
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(version, link, target_is_directory=True)
+    except (OSError, NotImplementedError):
+        old_directory = os.path.join(parent, f".{name}.old")
+        shutil.rmtree(old_directory, ignore_errors=True)
+        if os.path.lexists(final_directory):
+            os.replace(final_directory, old_directory)
+        os.replace(os.path.join(parent, version), final_directory)
+        _remove_stale_versions(parent, name)
+        return
+
+    previous = None
+    if os.path.islink(final_directory):
+        previous = os.readlink(final_directory)
+    elif os.path.isdir(final_directory):
+        # A plain directory from before versioned trees: moved aside once
+        os.replace(final_directory, os.path.join(parent, f".{name}.old"))
+    os.replace(link, final_directory)
+    _remove_stale_versions(parent, name, keep=(version, previous))
+
+
+def write_layer_tiles(layer, source_path=None, output_directory=TILES_DIRECTORY,
+                      min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """
+    Rebuild the tile pyramid of `layer` from its JSON snapshot. Tiles are
+    written to a temporary directory that then replaces tiles/<layer>/.
+    Returns the meta dict, or None if the source could not be read.
+    """
+    if source_path is None:
+        candidates = [os.path.join(PROJECT_ROOT, p) for p in LAYER_SOURCES[layer]]
+        source_path = next((p for p in candidates if os.path.exists(p)), None)
+    try:
+        with open(source_path, 'r', encoding='utf-8') as file:
+            points = layer_points(json.load(file))
+    except (TypeError, OSError, ValueError) as e:
+        print(f"⚠️  Could not build {layer} tiles from {source_path}: {e}")
+        return None
+
+    tiles, fields, max_zoom = build_tiles(points, min_zoom, max_zoom)
+    generated_at = datetime.now().isoformat()
+    final_directory = os.path.join(output_directory, layer)
+    temp_directory = os.path.join(output_directory, f".{layer}.tmp")
+    shutil.rmtree(temp_directory, ignore_errors=True)
+
+    tile_index = {}
+    for (zoom, x, y), features in sorted(tiles.items()):
+        _write_json(os.path.join(temp_directory, str(zoom), str(x), f"{y}.json"), {
+            'layer': layer, 'z': zoom, 'x': x, 'y': y, 'fields': fields, 'features': features,
+        })
+        tile_index.setdefault(str(zoom), []).append(f"{x}/{y}")
+
+    meta = {
+        'format_version': TILE_FORMAT_VERSION,
+        'layer': layer,
+        'generated_at': generated_at,
+        'source': os.path.relpath(os.path.abspath(source_path), PROJECT_ROOT).replace(os.sep, '/'),
+        'min_zoom': min_zoom,
+        'max_zoom': max_zoom,
+        'tile_size': TILE_SIZE,
+        'cluster_pixels': CLUSTER_PIXELS,
+        'point_count': len(points),
+        'fields': fields,
+        'tiles': tile_index,
+    }
+    _write_json(os.path.join(temp_directory, 'meta.json'), meta)
+
+    replace_directory(temp_directory, final_directory)
+
+    print(f"🧱 {layer} tiles: {len(points)} points -> {len(tiles)} tiles "
+          f"(z{min_zoom}-{max_zoom}) in {os.path.relpath(final_directory, PROJECT_ROOT)}/")
+    return meta
+
+
+def main():
+    layers = sys.argv[1:] or list(TILE_LAYERS)
+    unknown = [layer for layer in layers if layer not in LAYER_SOURCES]
+    if unknown:
+        print(f"Unknown layer(s): {', '.join(unknown)}; choose from {', '.join(TILE_LAYERS)}")
+        return 1
+    for layer in layers:
+        write_layer_tiles(layer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Historical time-series store for every grid, city, port and maritime fetch
+The collectors overwrite their JSON files; this keeps every value they
+fetched in SQLite, one row per (source, location, field, valid time):
+
+- every (source, location, field) is a series with an integer id, and
+  observations is a WITHOUT ROWID table clustered on (series_id, valid_time),
+  so the text keys are stored once and each value costs a few bytes
+- a point's series over [t0, t1] is one primary-key range read per field
+  (series)
+- one field at time T across all points walks series_by_field and reads one
+  primary-key range per point (snapshot); neither query scans the table
+- a later fetch of the same location/field/valid time replaces the value
+
+Times are UTC epoch seconds. Numbers go to `value`, text (wave class,
+weather condition, wind direction...) to `text`.
+
+Usage:
+    from timeseries_store import GRID, append_records, get_timeseries_store
+    append_records(GRID, records)                  # after each fetch
+    store = get_timeseries_store()
+    store.series(GRID, '-6.0, 106.0', '2025-08-01', '2025-09-01', ['temperature_2m'])
+    store.snapshot(GRID, 'temperature_2m', '2025-08-28T09:00')
+
+    python timeseries_store.py                     # sources, rows and time span
+    python timeseries_store.py import              # load the current JSON files
+
+The database lives in timeseries.sqlite at the project root
+(BMKG_TIMESERIES_PATH overrides it).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TIMESERIES_PATH = os.environ.get('BMKG_TIMESERIES_PATH', os.path.join(PROJECT_ROOT, 'timeseries.sqlite'))
+
+GRID = 'grid'
+CITY = 'city'
+PORT = 'port'
+MARITIME = 'maritime'
+
+# Output file of each collector (for `import`)
+SOURCE_FILES = {
+    GRID: 'openmeteo/grid_weather_data_1degree.json',
+    CITY: 'openmeteo/city_weather_data.json',
+    PORT: 'pelabuhan/pelabuhan_weather_data.json',
+    MARITIME: 'maritime_weather/maritime_weather_data.json',
+}
+
+# weather_data keys that describe the record rather than the weather
+OPENMETEO_META = {'timestamp', 'timezone', 'utc_offset_seconds', 'fetched_at'}
+PORT_META = {'time', 'valid_from', 'valid_to', 'time_desc', 'weather_icon', 'icon'}
+MARITIME_META = {'area_name', 'source', 'parsed_at', 'time', 'current_time', 'is_current',
+                 'weather_icon', 'structured_data'}
+
+# Times on the maritime HTML pages are local (WIB); payload times are UTC
+WIB = timezone(timedelta(hours=7))
+INDONESIAN_MONTHS = {'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'mei': 5, 'jun': 6, 'jul': 7,
+                     'agu': 8, 'agt': 8, 'sep': 9, 'okt': 10, 'nov': 11, 'des': 12}
+ISO_TIME_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})[ T](\d{2}):(\d{2})')
+PAGE_TIME_RE = re.compile(r'(\d{1,2})\s+([A-Za-z]{3})\w*\s+(\d{2,4}),?\s+(\d{1,2})[.:](\d{2})')
+NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    location_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    UNIQUE (source, location_id, field)
+);
+CREATE INDEX IF NOT EXISTS series_by_field ON series (source, field, location_id);
+CREATE TABLE IF NOT EXISTS observations (
+    series_id INTEGER NOT NULL,
+    valid_time INTEGER NOT NULL,
+    value REAL,
+    text TEXT,
+    fetched_at INTEGER NOT NULL,
+    PRIMARY KEY (series_id, valid_time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS locations (
+    source TEXT NOT NULL,
+    location_id TEXT NOT NULL,
+    name TEXT,
+    lat REAL,
+    lon REAL,
+    PRIMARY KEY (source, location_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetches (
+    source TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    records INTEGER NOT NULL,
+    rows INTEGER NOT NULL
+);
+"""
+
+
+def to_epoch(moment):
+    """UTC epoch seconds of an epoch number, datetime or ISO string (naive means UTC)"""
+    if moment is None or isinstance(moment, (int, float)):
+        return moment
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def parse_time(text, local=WIB):
+    """Epoch seconds of 'YYYY-MM-DD HH:MM' (UTC) or '15 Agu 25, 08.00' (page time in `local`)"""
+    if not isinstance(text, str):
+        return None
+    match = ISO_TIME_RE.search(text)
+    if match:
+        return int(datetime(*map(int, match.groups()), tzinfo=timezone.utc).timestamp())
+    match = PAGE_TIME_RE.search(text)
+    if match:
+        day, month, year, hour, minute = match.groups()
+        month = INDONESIAN_MONTHS.get(month.lower())
+        if month:
+            year = int(year) + (2000 if len(year) == 2 else 0)
+            return int(datetime(year, month, int(day), int(hour), int(minute), tzinfo=local).timestamp())
+    return None
+
+
+def cell(value):
+    """(value, text) columns of a field value; None for values that are not stored"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value), None
+    if isinstance(value, str) and value.strip():
+        value = value.strip()
+        if NUMBER_RE.fullmatch(value):
+            return float(value), None
+        return None, value
+    return None
+
+
+def _full_record(record):
+    # Ports reused from the response cache carry their JSON text (bmkg_cache.SerializedRecord)
+    json_text = getattr(record, 'json_text', None)
+    return json.loads(json_text) if json_text is not None else record
+
+
+def _fields(values, meta):
+    for field, value in values.items():
+        if field not in meta:
+            columns = cell(value)
+            if columns is not None:
+                yield field, columns
+
+
+def openmeteo_rows(record):
+    """(location, [(valid_time, field, value, text)]) of a grid/city record"""
+    weather = record.get('weather_data') or {}
+    valid_time = weather.get('timestamp')
+    if valid_time is None:
+        return None, []
+    location = (record['name'], record['name'], record.get('lat'), record.get('lon'))
+    return location, [(int(valid_time), field, value, text) for field, (value, text) in _fields(weather, OPENMETEO_META)]
+
+
+def port_rows(record):
+    """Every forecast slot of a port record (forecast_day1, forecast_day2, ...)"""
+    weather = record.get('weather_data') or {}
+    coordinates = record.get('coordinates') or {}
+    location = (record['slug'], record['port_name'], coordinates.get('lat'), coordinates.get('lon'))
+    rows = []
+    if not isinstance(weather, dict):
+        return location, rows
+    for key, entries in weather.items():
+        if not key.startswith('forecast') or not isinstance(entries, list):
+            continue
+        for entry in entries:
+            valid_time = parse_time(entry.get('time') or entry.get('valid_from')) if isinstance(entry, dict) else None
+            if valid_time is not None:
+                rows.extend((valid_time, field, value, text) for field, (value, text) in _fields(entry, PORT_META))
+    return location, rows
+
+
+def maritime_rows(record):
+    """The current conditions of a maritime area, at the page's current slot (else parse time)"""
+    weather = record.get('weather_data') or {}
+    location = (record['slug'], record['area_name'], None, None)
+    if not isinstance(weather, dict):
+        return location, []
+    valid_time = None
+    for key in ('current_time', 'time'):
+        # HTML pages show local time; payload times are ISO UTC
+        valid_time = valid_time or parse_time(weather.get(key))
+    if valid_time is None:
+        parsed_at = weather.get('parsed_at')
+        valid_time = to_epoch(datetime.fromisoformat(parsed_at).astimezone()) if parsed_at else None
+    if valid_time is None:
+        return location, []
+    return location, [(valid_time, field, value, text) for field, (value, text) in _fields(weather, MARITIME_META)]
+
+
+ROW_EXTRACTORS = {
+    GRID: openmeteo_rows,
+    CITY: openmeteo_rows,
+    PORT: port_rows,
+    MARITIME: maritime_rows,
+}
+
+
+class TimeSeriesStore:
+    """SQLite time-series store, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_TIMESERIES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._series_ids = {}
+
+    def _series_id(self, source, location_id, field):
+        key = (source, location_id, field)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            row = self._db.execute('SELECT series_id FROM series WHERE source = ? AND location_id = ? AND field = ?',
+                                   key).fetchone()
+            series_id = row[0] if row else self._db.execute(
+                'INSERT INTO series (source, location_id, field) VALUES (?, ?, ?)', key).lastrowid
+            self._series_ids[key] = series_id
+        return series_id
+
+    def append(self, source, records, fetched_at=None):
+        """Store every value of a fetch's records; returns the number of values written"""
+        extract = ROW_EXTRACTORS[source]
+        fetched_at = int(fetched_at if fetched_at is not None else time.time())
+        extracted = []
+        for record in records:
+            if not record or record.get('status', 'success') != 'success':
+                continue
+            location, values = extract(_full_record(record))
+            if values:
+                extracted.append((location, values))
+        with self._lock:
+            try:
+                with self._db:
+                    rows = []
+                    for location, values in extracted:
+                        rows.extend((self._series_id(source, location[0], field), valid_time, value, text, fetched_at)
+                                    for valid_time, field, value, text in values)
+                    self._db.executemany(
+                        'INSERT INTO locations (source, location_id, name, lat, lon) VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT (source, location_id) DO UPDATE SET name = excluded.name, '
+                        'lat = COALESCE(excluded.lat, lat), lon = COALESCE(excluded.lon, lon)',
+                        [(source,) + location for location, _ in extracted])
+                    self._db.executemany(
+                        'INSERT OR REPLACE INTO observations (series_id, valid_time, value, text, fetched_at) '
+                        'VALUES (?, ?, ?, ?, ?)', rows)
+                    self._db.execute('INSERT INTO fetches (source, fetched_at, records, rows) VALUES (?, ?, ?, ?)',
+                                     (source, fetched_at, len(extracted), len(rows)))
+            except sqlite3.Error:
+                self._series_ids.clear()  # ids created in the rolled back transaction are gone
+                raise
+        return len(rows)
+
+    def series(self, source, location_id, t0=None, t1=None, fields=None):
+        """
+        Columns of one location over [t0, t1]:
+        {'valid_time': [...], field: [...] for each field}, aligned on valid_time
+        (None where a field has no value at that time)
+        """
+        t0 = to_epoch(t0) if t0 is not None else -2 ** 62
+        t1 = to_epoch(t1) if t1 is not None else 2 ** 62
+        with self._lock:
+            result = self._db.execute(
+                'SELECT s.field, o.valid_time, o.value, o.text FROM series AS s '
+                'JOIN observations AS o ON o.series_id = s.series_id AND o.valid_time BETWEEN ? AND ? '
+                'WHERE s.source = ? AND s.location_id = ?',
+                (t0, t1, source, location_id)).fetchall()
+        if fields is None:
+            fields = sorted({field for field, _, _, _ in result})
+        times = sorted({valid_time for _, valid_time, _, _ in result})
+        position = {valid_time: index for index, valid_time in enumerate(times)}
+        columns = {'valid_time': times}
+        for field in fields:
+            columns[field] = [None] * len(times)
+        for field, valid_time, value, text in result:
+            if field in columns:
+                columns[field][position[valid_time]] = value if text is None else text
+        return columns
+
+    def snapshot(self, source, field, at, tolerance=3600):
+        """
+        Columns of one field across all locations at time `at`: for each
+        location its latest value within [at - tolerance, at]
+        {'location_id', 'name', 'lat', 'lon', 'valid_time', field}
+        """
+        at = to_epoch(at)
+        with self._lock:
+            result = self._db.execute(
+                'SELECT s.location_id, l.name, l.lat, l.lon, MAX(o.valid_time), o.value, o.text '
+                'FROM series AS s INDEXED BY series_by_field '
+                'JOIN observations AS o ON o.series_id = s.series_id AND o.valid_time BETWEEN ? AND ? '
+                'LEFT JOIN locations AS l ON l.source = s.source AND l.location_id = s.location_id '
+                'WHERE s.source = ? AND s.field = ? '
+                'GROUP BY s.location_id ORDER BY s.location_id',
+                (at - tolerance, at, source, field)).fetchall()
+        columns = {'location_id': [], 'name': [], 'lat': [], 'lon': [], 'valid_time': [], field: []}
+        for location_id, name, lat, lon, valid_time, value, text in result:
+            for key, item in (('location_id', location_id), ('name', name), ('lat', lat), ('lon', lon),
+                              ('valid_time', valid_time), (field, value if text is None else text)):
+                columns[key].append(item)
+        return columns
+
+    def fields(self, source):
+        """Field names stored for a source"""
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                'SELECT DISTINCT field FROM series INDEXED BY series_by_field WHERE source = ? ORDER BY field',
+                (source,))]
+
+    def locations(self, source):
+        """[{location_id, name, lat, lon}] of a source"""
+        with self._lock:
+            result = self._db.execute(
+                'SELECT location_id, name, lat, lon FROM locations WHERE source = ? ORDER BY location_id',
+                (source,)).fetchall()
+        return [dict(zip(('location_id', 'name', 'lat', 'lon'), row)) for row in result]
+
+    def summary(self):
+        """{source: {fetches, rows, first_fetch, last_fetch}} from the fetch log"""
+        with self._lock:
+            result = self._db.execute(
+                'SELECT source, COUNT(*), SUM(rows), MIN(fetched_at), MAX(fetched_at) FROM fetches GROUP BY source'
+            ).fetchall()
+        return {source: {'fetches': count, 'rows': rows, 'first_fetch': first, 'last_fetch': last}
+                for source, count, rows, first, last in result}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_timeseries_store(path=None):
+    """The process-wide TimeSeriesStore (opened on first use)"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = TimeSeriesStore(path or DEFAULT_TIMESERIES_PATH)
+        return _shared_store
+
+
+def append_records(source, records, fetched_at=None):
+    """Append a fetch to the shared store; history is best effort and never fails a collector"""
+    try:
+        started = time.perf_counter()
+        rows = get_timeseries_store().append(source, records, fetched_at)
+        print(f"📚 History: {rows} {source} values appended ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        return rows
+    except Exception as e:
+        print(f"⚠️  Could not append {source} history: {e}")
+        return 0
+
+
+def main():
+    store = get_timeseries_store()
+    if sys.argv[1:2] == ['import']:
+        for source, relative_path in SOURCE_FILES.items():
+            path = os.path.join(PROJECT_ROOT, relative_path)
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as file:
+                    append_records(source, json.load(file), os.path.getmtime(path))
+    print(f"🗃️  Time series in {store.path}")
+    for source, summary in store.summary().items():
+        first = datetime.fromtimestamp(summary['first_fetch']).strftime('%Y-%m-%d %H:%M')
+        last = datetime.fromtimestamp(summary['last_fetch']).strftime('%Y-%m-%d %H:%M')
+        print(f"   {source}: {summary['fetches']} fetches, {summary['rows']} values, {first} -> {last}")
+
+
+if __name__ == "__main__":
+    main()